@@ -5,6 +5,23 @@ echo ""
 ps aux | grep "caddy" | grep -v grep
 ps aux | grep "python3 ./keep-fetching.py" | grep -v grep
 ps aux | grep "python3 ./bucle.py" | grep -v grep
+ps aux | grep "exchange.account_mirror" | grep -v grep
+ps aux | grep "exchange.server_clock" | grep -v grep
+ps aux | grep "python3 ./series_server.py" | grep -v grep
+ps aux | grep "exchange.push_hub" | grep -v grep
+ps aux | grep "exchange.trade_bars" | grep -v grep
+ps aux | grep "exchange.stop_monitor" | grep -v grep
+ps aux | grep "exchange.metrics" | grep -v grep
 echo ""
 echo "http.server, keep-fetching, bucle are the 3 processes"
 echo "that make up a successfully running server"
+echo "(account_mirror and server_clock are optional, scripts fall back to REST without them;
+series_server is optional, without it the dashboard downloads series.bin;
+push_hub is optional, without it the dashboards update on reload only;
+stop_monitor is optional, without it the stop is only tested on recompute;
+metrics is optional, without it the freshness check below cannot run)"
+
+echo ""
+echo "Data freshness and recompute health (exchange.metrics):"
+echo ""
+cd "$(dirname "$0")/src/python" && python3 -m exchange.metrics --check
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Check and time the compiled kernels (kernels.py) against the Python loops.
+
+Each case runs a caller twice over the same synthetic random walk: once with
+kernels.JIT off (the Python loop, as without numba) and once with it on (the
+kernel), checks that both produce identical output, and reports the speedup.
+The compilation (or the load from the numba cache) is timed separately.
+Without numba the kernels run uncompiled, so the check still applies but the
+speedup is meaningless. Exits with status 1 when any output differs.
+
+Usage (from src/dist):
+    python3 ./bench_kernels.py
+    python3 ./bench_kernels.py --rows 5000000 --chunk-rows 200000 --sl 0.2
+"""
+
+import argparse
+import heapq
+import io
+import sys
+import time
+
+import numpy as np
+
+import kernels
+from compute_final_portfolio import process_event_arrays, process_events
+from compute_final_portfolio_using_bnb import process_event_arrays as bnb_process_event_arrays
+from compute_final_portfolio_using_bnb import process_events as bnb_process_events
+from indicator_cache import super_smoother_kernel
+from polynomial import super_smoother_filter
+from slopedirection import HysteresisFilter, stable_count_initial, stable_count_steady
+from strategies import TrailingStopLocalMin
+
+
+def synthetic_series(rows, interval=60, start=1_700_006_400, seed=1):
+    """Minute bars of a random walk with about SUI's daily volatility, 4 decimals like asset.txt."""
+    rng = np.random.default_rng(seed)
+    sigma = 0.04 * (interval / 86400) ** 0.5
+    timestamps = start + np.arange(rows, dtype=np.int64) * interval
+    prices = np.round(4.0 * np.exp(np.cumsum(rng.normal(0, sigma, rows))), 4)
+    return timestamps, prices
+
+
+def chunks_of(rows, chunk):
+    return [(start, start + chunk) for start in range(0, rows, chunk)]
+
+
+def make_cases(timestamps, prices, chunk, sl):
+    """
+    (name, run, timed_inside) per kernel: run() returns a comparable output,
+    or (output, seconds) when it times only part of itself.
+    """
+    spans = chunks_of(len(prices), chunk)
+    config = {"sl_percentage": sl, "reentry_delay_seconds": 60}
+
+    def super_smoother_cache():
+        kernel = super_smoother_kernel(20, chunk)
+        return np.concatenate(list(kernel(prices, 0, np.empty(0))))
+
+    def hysteresis():
+        slopes = np.diff(prices, prepend=prices[0])
+        directions = np.where(slopes > 0, 5000.0, 4000.0)
+        hysteresis_filter = HysteresisFilter(stable_count_initial // 10, stable_count_steady // 10)
+        return np.concatenate([hysteresis_filter.filter(directions[a:b]) for a, b in spans])
+
+    def trailing_stop():
+        strategy = TrailingStopLocalMin(config)
+        return [trade for a, b in spans
+                for trade in strategy.run({"timestamp": timestamps[a:b], "price": prices[a:b]})]
+
+    trades = None
+
+    def portfolio(process, process_arrays, args):
+        nonlocal trades
+        jit = kernels.JIT
+        if trades is None:
+            trades = [(t, 'trade', action) for t, action, _ in trailing_stop()]
+        if jit:
+            events = list(kernels.portfolio_event_chunks(
+                ((timestamps[a:b], prices[a:b]) for a, b in spans), trades))
+            simulate = process_arrays
+        else:
+            events = list(heapq.merge(
+                ((t, 'price', p) for t, p in zip(timestamps.tolist(), prices.tolist())),
+                sorted(trades, key=lambda event: event[0]), key=lambda event: event[0]))
+            simulate = process
+        out = io.StringIO()
+        started = time.perf_counter()
+        returns = simulate(events, out, *args)
+        # Only the simulation is timed, not building the events
+        return (out.getvalue(), returns), time.perf_counter() - started
+
+    final_args = (4600.0, 4.0, 0.0612, 0.001, 0.0005, None)
+    bnb_args = (4600.0, 4.0, 0.0612, 0.001, None)
+    return [
+        ("super_smoother_filter", lambda: super_smoother_filter(prices, 20), False),
+        ("super_smoother_kernel", super_smoother_cache, False),
+        ("hysteresis", hysteresis, False),
+        ("trailsl_localmin", trailing_stop, False),
+        ("final_portfolio", lambda: portfolio(process_events, process_event_arrays, final_args), True),
+        ("bnb_portfolio", lambda: portfolio(bnb_process_events, bnb_process_event_arrays, bnb_args), True),
+    ]
+
+
+def run_case(run, jit, timed_inside):
+    kernels.JIT = jit
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    if timed_inside:
+        result, elapsed = result
+    return result, elapsed
+
+
+def same(a, b):
+    if isinstance(a, np.ndarray):
+        return a.dtype == b.dtype and np.array_equal(a, b, equal_nan=True)
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled kernels vs the Python loops: identical outputs and speedup.")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="rows of synthetic minute bars")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="rows per chunk fed to the kernels")
+    parser.add_argument("--sl", type=float, default=0.5, help="sl_percentage of the trailing stop")
+    args = parser.parse_args()
+
+    compiled = kernels.JIT
+    print(f"numba: {'yes' if compiled else 'no (kernels run uncompiled)'}")
+    started = time.perf_counter()
+    # Compile (or load from the cache) on a small input, apart from the timings
+    warm_times, warm_prices = synthetic_series(1000)
+    for _, run, timed_inside in make_cases(warm_times, warm_prices, 300, args.sl):
+        run_case(run, True, timed_inside)
+    print(f"compilation / cache load: {time.perf_counter() - started:.2f} s")
+
+    timestamps, prices = synthetic_series(args.rows)
+    print(f"{'kernel':<24} {'rows':>10} {'python s':>9} {'jit s':>9} {'speedup':>8}  identical")
+    failed = False
+    for name, run, timed_inside in make_cases(timestamps, prices, args.chunk_rows, args.sl):
+        expected, python_seconds = run_case(run, False, timed_inside)
+        result, jit_seconds = run_case(run, True, timed_inside)
+        identical = same(expected, result)
+        failed |= not identical
+        print(f"{name:<24} {args.rows:>10,} {python_seconds:>9.3f} {jit_seconds:>9.3f} "
+              f"{python_seconds / max(jit_seconds, 1e-9):>7.1f}x  {'yes' if identical else 'NO'}")
+    kernels.JIT = compiled
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
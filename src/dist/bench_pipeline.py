@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the compute pipeline on sub-minute bars.
+
+Writes a synthetic kline store (random walk, keep-fetching.py's '|' format)
+of --days days of --interval second bars, then runs the compute stages of
+recompute.py on it in a temporary tree (<tmp>/dist with its own config,
+<tmp>/view/output), and reports wall time and peak memory per stage. The
+default is a month of 1s bars, about 2.6 million rows.
+
+Usage (from src/dist):
+    python3 ./bench_pipeline.py
+    python3 ./bench_pipeline.py --days 30 --interval 1 --sl 0.2 --chunk-rows 200000
+    python3 ./bench_pipeline.py --input ../assets/suiusdc-realtime-1s.csv
+"""
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stages import run_stage
+
+STAGES = (
+    "compute_asset.py",
+    "compute_ema.py",
+    "compute_ema_micro.py",
+    "compute_strategies.py",
+    "compute_unt_portfolio.py",
+    "compute_final_portfolio_using_bnb.py",
+    "compute_final_portfolio.py",
+)
+
+
+def write_synthetic_store(path, days, interval, start=1_700_006_400, seed=1):
+    """Random walk bars, volatility scaled so a day moves about like SUI."""
+    rng = random.Random(seed)
+    sigma = 0.04 * (interval / 86400) ** 0.5
+    price = 4.0
+    rows = int(days * 86400 / interval)
+    with open(path, "w") as f:
+        for i in range(rows):
+            o = price
+            price *= 1 + rng.gauss(0, sigma)
+            # Wicks beyond open/close, or every low would equal a neighbour's
+            h = max(o, price) * (1 + abs(rng.gauss(0, sigma / 2)))
+            l = min(o, price) * (1 - abs(rng.gauss(0, sigma / 2)))
+            v = rng.uniform(10, 1000)
+            f.write(f"{start + int(i * interval)}|{o:.4f}|{h:.4f}|{l:.4f}|{price:.4f}|{v:.1f}|{v * price:.2f}|{v / 2:.1f}|{v * price / 2:.2f}|{rng.randint(1, 40)}\n")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end compute pipeline benchmark on sub-minute bars.")
+    parser.add_argument("--days", type=float, default=30, help="days of synthetic bars")
+    parser.add_argument("--interval", type=float, default=1, help="bar length in seconds")
+    parser.add_argument("--input", help="use this kline store instead of synthetic bars")
+    parser.add_argument("--sl", type=float, default=0.3, help="sl_percentage for the trades stage")
+    parser.add_argument("--strategies", nargs="+", default=None, help="strategies to run (config strategies)")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="rows per chunk (config chunk_rows)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary tree and print its path")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    try:
+        dist, output = tmp / "dist", tmp / "view" / "output"
+        dist.mkdir()
+        output.mkdir(parents=True)
+
+        if args.input:
+            store = Path(args.input).resolve()
+            print(f"Input: {store}")
+        else:
+            store = tmp / "store.csv"
+            start = time.perf_counter()
+            rows = write_synthetic_store(store, args.days, args.interval)
+            print(f"Synthetic store: {rows:,} bars of {args.interval:g}s ({args.days:g} days), "
+                  f"{store.stat().st_size / 1e6:.0f} MB, written in {time.perf_counter() - start:.1f} s")
+
+        config = {
+            "pair": "SUIUSDC",
+            "investment": 4600,
+            "margin": 4,
+            "margin_annual_interest_percentage": 6.12,
+            "trade_fee_percentage": 0.1,
+            "sl_percentage": args.sl,
+            "input_file": str(store),
+            "start_date": "1900-01-01",
+            "end_date": "2040-01-01",
+            "ema_days": 1800,
+            "ema_days_micro": 200,
+        }
+        if not args.input:
+            config["interval_seconds"] = args.interval
+        if args.chunk_rows:
+            config["chunk_rows"] = args.chunk_rows
+        if args.strategies:
+            config["strategies"] = args.strategies
+        with open(dist / "apikey-crypto.json", "w") as f:
+            json.dump(config, f, indent=4)
+
+        total = 0.0
+        peak = 0.0
+        print(f"{'stage':<40} {'seconds':>8} {'peak MB':>8}")
+        for script in STAGES:
+            elapsed, rss, status, _ = run_stage(script, dist)
+            total += elapsed
+            peak = max(peak, rss)
+            print(f"{script:<40} {elapsed:>8.2f} {rss:>8.0f}{'  FAILED' if status else ''}")
+            if status:
+                return
+
+        with open(output / "asset.txt", "rb") as f:
+            asset_rows = sum(1 for _ in f)
+        with open(output / "trades.txt", "rb") as f:
+            trades = sum(1 for _ in f)
+        print(f"{'total':<40} {total:>8.2f} {peak:>8.0f}")
+        print(f"{asset_rows:,} rows, {asset_rows / total:,.0f} rows/s end to end, "
+              f"{trades} trades at sl_percentage {args.sl}")
+        with open(output / "costs.txt", "r") as f:
+            print(f.read().strip())
+    finally:
+        if args.keep:
+            print(f"Kept {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Benchmarks of the dist stages on deterministic synthetic kline stores:
+benchmarks.synthetic writes the stores, benchmarks.stages runs and measures
+the stages, `python3 -m benchmarks` records the results and compares them
+with a stored baseline.
+"""
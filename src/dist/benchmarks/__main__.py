@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Per-stage benchmarks of the dist pipeline on synthetic kline stores.
+
+Runs every stage of benchmarks.stages.STAGES on a deterministic synthetic
+store (benchmarks.synthetic; kept in --store-dir and reused, as a five-year
+1s store takes a while to write) and records per stage the wall and CPU
+time, peak RSS, rows in and out and throughput in rows/s. The results go to
+a JSON file; with a baseline for the same scenario (days, bar length, crash
+spacing, seed), each stage is compared with it and a throughput drop or a
+memory growth beyond --tolerance is reported as a regression (exit status
+1). --save-baseline stores the results as the new baseline of the scenario.
+
+Usage (from src/dist):
+    python3 -m benchmarks --days 30 --interval 60
+    python3 -m benchmarks --days 1826 --interval 60 --save-baseline
+    python3 -m benchmarks --days 30 --interval 1 --stages compute_asset.py compute_ema.py
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.stages import STAGES, measure
+from benchmarks.synthetic import cached_store
+
+BENCH_DIR = "runtime/bench"
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def scenario_key(args):
+    return f"{args.interval:g}s-{args.days:g}d-crash{args.crash_every:g}-seed{args.seed}"
+
+
+def environment():
+    try:
+        import numba
+        numba_version = numba.__version__ if os.environ.get("DIST_JIT", "1") != "0" else "disabled"
+    except ImportError:
+        numba_version = None
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "cpus": os.cpu_count(),
+        "numba": numba_version,
+    }
+
+
+def load_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare(record, base, tolerance):
+    """(throughput ratio, memory ratio, regressed) of a stage against its baseline."""
+    if not base or record["status"] != "ok" or base.get("status") != "ok":
+        return None, None, record["status"] != "ok"
+    speed = record["rows_per_s"] / base["rows_per_s"] if base.get("rows_per_s") else None
+    memory = record["peak_rss_mb"] / base["peak_rss_mb"] if base.get("peak_rss_mb") else None
+    regressed = (speed is not None and speed < 1 - tolerance) or (memory is not None and memory > 1 + tolerance)
+    return speed, memory, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage benchmarks of the dist pipeline on synthetic bars.")
+    parser.add_argument("--days", type=float, default=30, help="days of synthetic bars (1 to 1826)")
+    parser.add_argument("--interval", type=float, default=60, help="bar length in seconds (60 or 1)")
+    parser.add_argument("--crash-every", type=float, default=365, help="days between crash segments, 0 for none")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sl", type=float, default=1.5, help="sl_percentage (the LUNA-Crash config's)")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="rows per chunk (config chunk_rows)")
+    parser.add_argument("--stages", nargs="+", default=None, help="run only these stages (script names)")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds after which a stage is killed")
+    parser.add_argument("--store-dir", default=BENCH_DIR, help="folder of the cached synthetic stores")
+    parser.add_argument("--output", default=None, help="results file (default runtime/bench/results-<time>.json)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file, one entry per scenario")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the scenario's baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop / memory growth")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary tree and print its path")
+    args = parser.parse_args()
+
+    stages = [stage for stage in STAGES if not args.stages or stage.script in args.stages or stage.name in args.stages]
+    if args.stages and len(stages) != len(args.stages):
+        parser.error(f"unknown stages, available: {', '.join(stage.name for stage in STAGES)}")
+    if args.stages and stages[0].script != "compute_asset.py":
+        # The later stages read asset.txt
+        stages.insert(0, STAGES[0])
+
+    started = time.perf_counter()
+    store = Path(cached_store(args.store_dir, args.days, args.interval, args.crash_every, args.seed)).resolve()
+    print(f"Store: {store} ({store.stat().st_size / 1e6:.0f} MB, ready in {time.perf_counter() - started:.1f} s)")
+
+    key = scenario_key(args)
+    baselines = load_json(args.baseline, {})
+    baseline = baselines.get(key, {}).get("stages", {})
+    results = {
+        "scenario": key,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "params": {"days": args.days, "interval": args.interval, "crash_every": args.crash_every,
+                   "seed": args.seed, "sl_percentage": args.sl, "chunk_rows": args.chunk_rows},
+        "stages": {},
+    }
+
+    tmp = Path(tempfile.mkdtemp(prefix="benchmarks_"))
+    regressions = []
+    try:
+        dist, output_dir = tmp / "dist", tmp / "view" / "output"
+        dist.mkdir()
+        output_dir.mkdir(parents=True)
+        config = {
+            "pair": "LUNCUSDT",
+            "investment": 4600,
+            "margin": 4,
+            "margin_annual_interest_percentage": 6.12,
+            "trade_fee_percentage": 0.1,
+            "sl_percentage": args.sl,
+            "input_file": str(store),
+            "start_date": "1900-01-01",
+            "end_date": "2040-01-01",
+            "ema_days": 1800,
+            "ema_days_micro": 200,
+            "interval_seconds": args.interval,
+        }
+        if args.chunk_rows:
+            config["chunk_rows"] = args.chunk_rows
+
+        print(f"{'stage':<38} {'seconds':>8} {'rows/s':>11} {'peak MB':>8} {'vs baseline':>18}")
+        for stage in stages:
+            with open(dist / "apikey-crypto.json", "w") as f:
+                json.dump(dict(config, **stage.config), f, indent=4)
+            record = measure(stage, dist, output_dir, store, args.timeout)
+            results["stages"][stage.name] = record
+            speed, memory, regressed = compare(record, baseline.get(stage.name), args.tolerance)
+            versus = f"{speed:6.0%} / {memory:5.0%}" if speed is not None and memory is not None else ""
+            if regressed:
+                regressions.append(stage.name)
+            rows_per_s = f"{record['rows_per_s']:,.0f}" if record["status"] == "ok" else "-"
+            print(f"{stage.name:<38} {record['seconds']:>8.2f} {rows_per_s:>11} {record['peak_rss_mb']:>8.0f} "
+                  f"{versus:>18}{'  ' + record['status'] if record['status'] != 'ok' else ''}"
+                  f"{'  REGRESSION' if regressed and record['status'] == 'ok' else ''}")
+            if record["status"] not in ("ok", "timeout"):
+                break
+    finally:
+        if args.keep:
+            print(f"Kept {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    output = args.output or os.path.join(BENCH_DIR, f"results-{datetime.now():%Y%m%d-%H%M%S}.json")
+    save_json(output, results)
+    print(f"Results: {output}" + (f" (vs baseline of {baselines[key]['created']})" if baseline else " (no baseline)"))
+    if args.save_baseline:
+        baselines[key] = results
+        save_json(args.baseline, baselines)
+        print(f"Saved as the baseline of {key} in {args.baseline}")
+    if regressions:
+        print(f"Failed or regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
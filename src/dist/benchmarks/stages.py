@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+The dist stages the benchmarks run, and how to run and measure one.
+
+Every stage runs as its own process, like in recompute.py, from a temporary
+tree (<tmp>/dist with its own config, <tmp>/view/output), in the order
+below: each stage reads what the earlier ones wrote. A stage is measured by
+wall and CPU time, peak RSS (ru_maxrss of the child), the rows of its input
+files and the rows and bytes of its output files (bytes only for the
+compressed .br files).
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+DIST_DIR = Path(__file__).resolve().parents[1]
+
+
+class Stage:
+    def __init__(self, script, inputs, outputs, args=(), config=None, name=None):
+        self.script = script
+        self.inputs = inputs        # "store" or files of view/output
+        self.outputs = outputs      # files of view/output ("*" = all of them)
+        self.args = list(args)
+        self.config = config or {}  # config keys set for this stage only
+        self.name = name or script
+
+
+STAGES = (
+    Stage("compute_asset.py", ["store"], ["asset.txt"]),
+    Stage("compute_ema.py", ["asset.txt"], ["expma.txt", "ema_slopes.txt"]),
+    Stage("compute_ema_micro.py", ["asset.txt"], ["expma_micro.txt", "ema_slopes_micro.txt"]),
+    Stage("compute_trades_trailsl_localmin.py", ["asset.txt"], ["trades_trailsl_localmin.txt"]),
+    Stage("compute_trades_ema_algo.py", ["asset.txt"], ["trades_ema_algo.txt"]),
+    Stage("compute_trades_ema_algo_minloss.py", ["asset.txt"], ["trades_ema_algo_minloss.txt"]),
+    # All strategies in one pass; the first one leaves trades.txt for the stages after it
+    Stage("compute_strategies.py", ["asset.txt"], ["trades.txt"],
+          config={"strategies": ["trailsl_localmin", "trailsl_localmin_direction", "ema_algo", "ema_algo_minloss"]}),
+    Stage("compute_final_portfolio_using_bnb.py", ["asset.txt", "trades.txt"], ["portfolio_bnb.txt"]),
+    Stage("compute_final_portfolio.py", ["asset.txt", "trades.txt"], ["portfolio.txt"]),
+    Stage("compute_margin_requirement.py", ["asset.txt", "trades.txt"], ["margin.txt"]),
+    Stage("compress_all.py", ["*"], ["*.br"], args=["--force"]),
+)
+
+
+def count_rows(path):
+    """Lines of a file, counted in binary blocks."""
+    rows = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            rows += block.count(b"\n")
+    return rows
+
+
+def file_set(names, output_dir, store):
+    """The files behind a stage's inputs or outputs."""
+    paths = []
+    for name in names:
+        if name == "store":
+            paths.append(Path(store))
+        elif name.startswith("*"):
+            suffix = name[1:]
+            paths.extend(p for p in sorted(output_dir.iterdir())
+                         if p.is_file() and (p.name.endswith(suffix) if suffix else not p.name.endswith(".br")))
+        elif (output_dir / name).exists():
+            paths.append(output_dir / name)
+    return paths
+
+
+def run_stage(script, cwd, args=(), timeout=None):
+    """
+    Run one stage; returns (seconds, peak RSS in MB, exit status, CPU
+    seconds). A stage killed after `timeout` seconds exits with status -9.
+    """
+    # stderr goes to a file: the progress bars would fill a pipe nobody reads
+    with tempfile.TemporaryFile() as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, str(DIST_DIR / script), *args], cwd=cwd,
+                                   stdout=subprocess.DEVNULL, stderr=errors)
+        killer = threading.Timer(timeout, process.kill) if timeout else None
+        if killer:
+            killer.start()
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if killer:
+            killer.cancel()
+        if process.returncode:
+            errors.seek(0)
+            print(f"  {script} failed:\n{errors.read().decode(errors='replace').strip()[-2000:]}")
+    # ru_maxrss is in kilobytes on Linux
+    return elapsed, usage.ru_maxrss / 1024, process.returncode, usage.ru_utime + usage.ru_stime
+
+
+def measure(stage, dist, output_dir, store, timeout=None):
+    """Run `stage` and return its record for the results file."""
+    inputs = file_set(stage.inputs, output_dir, store)
+    rows_in = sum(count_rows(path) for path in inputs)
+    bytes_in = sum(path.stat().st_size for path in inputs)
+    elapsed, rss, status, cpu = run_stage(stage.script, dist, stage.args, timeout)
+    outputs = file_set(stage.outputs, output_dir, store)
+    return {
+        "status": "ok" if status == 0 else ("timeout" if status == -9 else f"exit {status}"),
+        "seconds": round(elapsed, 3),
+        "cpu_seconds": round(cpu, 3),
+        "peak_rss_mb": round(rss, 1),
+        "rows_in": rows_in,
+        "rows_out": sum(count_rows(path) for path in outputs if path.suffix != ".br"),
+        "bytes_in": bytes_in,
+        "bytes_out": sum(path.stat().st_size for path in outputs),
+        "rows_per_s": round(rows_in / elapsed, 1) if elapsed else None,
+    }
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic kline stores for the benchmarks.
+
+Geometric brownian motion whose drift and volatility switch between market
+regimes (bull, bear, chop; exponentially distributed lengths), with a crash
+segment every `crash_every` days shaped like the LUNA-Crash scenario
+(private/LUNA-Crash, February to May 2022): a two month run-up that doubles
+the price, then a collapse of 99.9% in a week that accelerates towards the
+end, at several times the usual volatility. Everything follows from the
+seed, so a store is identical on every machine and can be regenerated
+instead of shipped.
+
+Rows are written in keep-fetching.py's '|' format, chunk by chunk, so five
+years of 1s bars (about 158 million rows) only need disk, not memory.
+
+Usage (from src/dist):
+    python3 -m benchmarks.synthetic --days 365 --interval 60 --output store.csv
+"""
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+DEFAULT_START = 1_577_836_800   # 2020-01-01 UTC, so five years fit before the config's end_date
+SECONDS_PER_YEAR = 365 * 86400
+CHUNK_BARS = 1 << 20
+START_PRICE = 50.0
+
+# name: (annual drift of the log price, annual volatility, mean length in days)
+REGIMES = {
+    "bull": (1.2, 0.7, 30),
+    "bear": (-0.9, 0.9, 20),
+    "chop": (0.0, 0.5, 15),
+}
+# LUNA, 2022: about x2 from February to early April, then -99.9% from May 7 to 13
+CRASH_RUNUP_DAYS = 60
+CRASH_RUNUP_GAIN = 1.0
+CRASH_DAYS = 7
+CRASH_DRAWDOWN = 0.999
+CRASH_VOLATILITY = 4.0           # times the volatility of the chop regime
+
+ROW_FORMAT = "{}|{:.6g}|{:.6g}|{:.6g}|{:.6g}|{:.1f}|{:.2f}|{:.1f}|{:.2f}|{}\n"
+
+
+def chop_volatility(interval):
+    """Volatility per bar of the chop regime, the reference of the others."""
+    return REGIMES["chop"][1] * math.sqrt(interval / SECONDS_PER_YEAR)
+
+
+def segments(days, interval, crash_every=365.0, seed=1):
+    """
+    The plan of the series: (bars, log drift per bar, volatility per bar,
+    accelerate) per segment, in order. `accelerate` segments take their drift
+    along a ramp (slow start, steep end) instead of evenly.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(days * 86400 / interval)
+    per_bar = interval / SECONDS_PER_YEAR
+    chop_sigma = chop_volatility(interval)
+    next_crash = crash_every / 2 * 86400 / interval if crash_every else math.inf
+    plan = []
+    done = 0
+    while done < total:
+        if done >= next_crash:
+            runup = int(CRASH_RUNUP_DAYS * 86400 / interval)
+            crash = int(CRASH_DAYS * 86400 / interval)
+            plan.append((runup, math.log(1 + CRASH_RUNUP_GAIN) / runup, chop_sigma * 1.5, False))
+            plan.append((crash, math.log(1 - CRASH_DRAWDOWN) / crash, chop_sigma * CRASH_VOLATILITY, True))
+            done += runup + crash
+            next_crash += crash_every * 86400 / interval
+            continue
+        name = list(REGIMES)[rng.integers(len(REGIMES))]
+        drift, volatility, mean_days = REGIMES[name]
+        bars = max(1, int(rng.exponential(mean_days) * 86400 / interval))
+        bars = min(bars, math.ceil(next_crash - done))
+        plan.append((bars, drift * per_bar, volatility * math.sqrt(per_bar), False))
+        done += bars
+    return plan, total
+
+
+def bar_chunks(days, interval, crash_every=365.0, seed=1, start=DEFAULT_START, chunk=CHUNK_BARS):
+    """Yield (timestamps, open, high, low, close, volume, trades) numpy arrays of up to `chunk` bars."""
+    plan, total = segments(days, interval, crash_every, seed)
+    chop_sigma = chop_volatility(interval)
+    rng = np.random.default_rng(seed + 1)
+    log_price = math.log(START_PRICE)
+    bar = 0
+    for bars, drift, volatility, accelerate in plan:
+        for offset in range(0, bars, chunk):
+            n = min(chunk, bars - offset, total - bar)
+            if n <= 0:
+                return
+            if accelerate:
+                # Drift proportional to the position in the segment: sums to bars * drift
+                ramp = (np.arange(offset, offset + n) + 0.5) / bars * 2
+                drifts = drift * ramp
+            else:
+                drifts = drift
+            steps = drifts - volatility ** 2 / 2 + volatility * rng.standard_normal(n)
+            logs = log_price + np.cumsum(steps)
+            close = np.exp(logs)
+            open_ = np.exp(np.concatenate(([log_price], logs[:-1])))
+            # Wicks beyond open/close, or every low would equal a neighbour's
+            high = np.maximum(open_, close) * np.exp(np.abs(rng.standard_normal(n)) * volatility / 2)
+            low = np.minimum(open_, close) * np.exp(-np.abs(rng.standard_normal(n)) * volatility / 2)
+            # More volume where the volatility is higher, like in the crash
+            volume = rng.uniform(10, 1000, n) * (volatility / chop_sigma)
+            trades = rng.integers(1, 40, n)
+            timestamps = start + ((bar + np.arange(n)) * interval).astype(np.int64)
+            yield timestamps, open_, high, low, close, volume, trades
+            log_price = float(logs[-1])
+            bar += n
+
+
+def write_store(path, days, interval, crash_every=365.0, seed=1, start=DEFAULT_START):
+    """Write the store to path (via a temp file); returns the number of rows."""
+    rows = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for timestamps, open_, high, low, close, volume, trades in bar_chunks(days, interval, crash_every, seed, start):
+            quote = volume * close
+            columns = [timestamps, open_, high, low, close, volume, quote, volume / 2, quote / 2, trades]
+            for first in range(0, len(timestamps), 1 << 16):
+                f.write("".join(map(ROW_FORMAT.format, *(c[first:first + (1 << 16)].tolist() for c in columns))))
+            rows += len(timestamps)
+    os.replace(tmp_path, path)
+    return rows
+
+
+def cached_store(folder, days, interval, crash_every=365.0, seed=1):
+    """The store for these parameters in folder, written only when it is not there yet."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"synthetic-{days:g}d-{interval:g}s-crash{crash_every:g}-seed{seed}.csv")
+    if not os.path.exists(path):
+        write_store(path, days, interval, crash_every, seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic kline store.")
+    parser.add_argument("--days", type=float, default=365, help="days of bars (1 to 1826)")
+    parser.add_argument("--interval", type=float, default=60, help="bar length in seconds (60 or 1)")
+    parser.add_argument("--crash-every", type=float, default=365, help="days between crash segments, 0 for none")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", required=True, help="store file to write")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = write_store(args.output, args.days, args.interval, args.crash_every, args.seed)
+    print(f"{rows:,} bars of {args.interval:g}s ({args.days:g} days) -> {args.output}, "
+          f"{os.path.getsize(args.output) / 1e6:.0f} MB in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Brotli-compress the dashboard outputs for Caddy's `precompressed br`.
+
+Only files whose content changed since the last cycle are compressed:
+runtime/compress_state.json keeps (size, mtime, hash) per file, a file whose
+size and mtime did not move is skipped without being read, and one that was
+rewritten with the same bytes is skipped after hashing. Changed files are
+compressed on a thread pool (the brotli module releases the GIL).
+
+Quality follows size and the cycle deadline: small files get the best quality
+whose estimated time still fits --deadline (normally the best there is), large
+ones the best quality whose estimated time fits what is left of it. The
+estimates use the brotli throughput per quality measured on this host in
+earlier cycles (CPU time per byte, kept in the state file), starting from the
+conservative single-core defaults in QUALITY_SPEED.
+
+Each <file>.br is written to a temp file and renamed into place, so it is never
+half written; if compressing fails the old .br is removed, so Caddy falls back
+to the plain file instead of serving a stale variant.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import brotli
+
+OUTPUT_DIR = "../view/output"
+STATE_FILE = "runtime/compress_state.json"
+
+# The dashboard reads these from series.bin, the CSVs are only its fallback
+BUNDLED = {"asset.txt", "expma.txt", "expma_micro.txt", "ema_slopes.txt", "portfolio.txt",
+           "portfolio_bnb.txt", "untouched_portfolio.txt", "margin.txt", "trades.txt"}
+# Append-only logs of series_log.py, served only by series_server.py's delta endpoint
+LIVE_DIR = "live"
+
+SMALL_FILE = 256 * 1024                     # always compressed at MAX_QUALITY
+MAX_QUALITY = 11
+# Single-core brotli throughput in bytes/s per quality, best quality first, measured on
+# CSV series on a 1 CPU host; only used until the state file has measurements of its own
+QUALITY_SPEED = [(11, 0.3e6), (9, 4.5e6), (6, 10e6), (4, 30e6), (1, 100e6)]
+SPEED_WEIGHT = 0.3                          # weight of a cycle's measurement in the stored speed
+MIN_MEASURED_BYTES = 64 * 1024              # less input than this says more about overhead than speed
+DEFAULT_DEADLINE = 10.0                     # seconds of the 25 s cycle we allow for compression
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state():
+    """(entries per file, measured bytes/s per quality) from the state file."""
+    try:
+        with open(STATE_FILE, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}
+    if "files" not in state:
+        return state, {}  # written before speeds were measured
+    return state["files"], {int(q): speed for q, speed in state.get("speeds", {}).items()}
+
+
+def save_state(files, speeds):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"files": files, "speeds": speeds}, f)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def source_files(output_dir):
+    """Paths (relative to output_dir) that get a .br next to them."""
+    skip_bundled = os.path.exists(os.path.join(output_dir, "series.bin"))
+    files = []
+    for root, dirs, names in os.walk(output_dir):
+        if root == output_dir and LIVE_DIR in dirs:
+            dirs.remove(LIVE_DIR)
+        for name in names:
+            if name.endswith((".br", ".tmp")):
+                continue
+            if skip_bundled and root == output_dir and name in BUNDLED:
+                continue
+            files.append(os.path.relpath(os.path.join(root, name), output_dir))
+    return sorted(files)
+
+
+def estimate_seconds(total_bytes, quality, speeds, parallel):
+    return total_bytes / (speeds.get(quality, dict(QUALITY_SPEED)[quality]) * parallel)
+
+
+def pick_quality(total_bytes, speeds, parallel, deadline):
+    """Best quality whose estimated time for total_bytes fits the deadline."""
+    for quality, _ in QUALITY_SPEED:
+        if estimate_seconds(total_bytes, quality, speeds, parallel) <= deadline:
+            return quality
+    return QUALITY_SPEED[-1][0]
+
+
+def update_speeds(speeds, measured):
+    """Blend this cycle's (bytes, CPU seconds) per quality into the stored speeds."""
+    for quality, (total_bytes, seconds) in measured.items():
+        if total_bytes < MIN_MEASURED_BYTES or seconds <= 0:
+            continue
+        speed = total_bytes / seconds
+        previous = speeds.get(quality)
+        speeds[quality] = speed if previous is None else previous + SPEED_WEIGHT * (speed - previous)
+    return speeds
+
+
+def compress_file(path, quality):
+    """Write path.br atomically. Returns the compressed size and the CPU seconds brotli took."""
+    with open(path, "rb") as f:
+        data = f.read()
+    cpu_start = time.thread_time()
+    compressed = brotli.compress(data, quality=quality)
+    cpu_seconds = time.thread_time() - cpu_start
+    tmp_path = f"{path}.br.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp_path, f"{path}.br")
+    return len(compressed), cpu_seconds
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress changed dashboard outputs with brotli.")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE,
+                        help="seconds the compression of one cycle may take")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--force", action="store_true", help="recompress every file")
+    args = parser.parse_args()
+
+    start = time.time()
+    previous, speeds = load_state()
+    if args.force:
+        previous = {}
+    state = {}
+    changed = []
+
+    files = source_files(OUTPUT_DIR)
+    for name in files:
+        path = os.path.join(OUTPUT_DIR, name)
+        stat = os.stat(path)
+        entry = previous.get(name)
+        has_br = os.path.exists(f"{path}.br")
+        if entry and has_br and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            state[name] = entry
+            continue
+        digest = file_hash(path)
+        entry_stat = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+        if entry and has_br and entry["hash"] == digest:
+            # Rewritten with the same bytes
+            state[name] = dict(entry, **entry_stat)
+            continue
+        changed.append((name, entry_stat))
+
+    # .br files whose source is gone (or is now served from the bundle)
+    changed_names = {name for name, _ in changed}
+    for root, _, names in os.walk(OUTPUT_DIR):
+        for br_name in names:
+            if br_name.endswith(".br"):
+                source = os.path.relpath(os.path.join(root, br_name[:-3]), OUTPUT_DIR)
+                if source not in state and source not in changed_names:
+                    remove(os.path.join(root, br_name))
+
+    small_bytes = sum(entry["size"] for _, entry in changed if entry["size"] <= SMALL_FILE)
+    large_bytes = sum(entry["size"] for _, entry in changed if entry["size"] > SMALL_FILE)
+    # Threads beyond the CPU count add no throughput
+    parallel = max(1, min(args.workers, os.cpu_count() or 1))
+    # Scanning and hashing already used part of the deadline; small files take their share first
+    budget = max(args.deadline - (time.time() - start), 0)
+    small_quality = pick_quality(small_bytes, speeds, parallel, budget)
+    small_seconds = estimate_seconds(small_bytes, small_quality, speeds, parallel)
+    large_quality = pick_quality(large_bytes, speeds, parallel, max(budget - small_seconds, 0))
+
+    def compress(item):
+        name, entry = item
+        quality = small_quality if entry["size"] <= SMALL_FILE else large_quality
+        path = os.path.join(OUTPUT_DIR, name)
+        try:
+            compressed_size, cpu_seconds = compress_file(path, quality)
+        except Exception as e:
+            print(f"[WARNING] Could not compress {name}: {e}")
+            remove(f"{path}.br")
+            remove(f"{path}.br.tmp")
+            return name, None, 0
+        return name, dict(entry, quality=quality, compressed_size=compressed_size), cpu_seconds
+
+    measured = {}
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for name, entry, cpu_seconds in pool.map(compress, changed):
+            if entry is not None:
+                state[name] = entry
+                total_bytes, seconds = measured.get(entry["quality"], (0, 0.0))
+                measured[entry["quality"]] = (total_bytes + entry["size"], seconds + cpu_seconds)
+
+    save_state(state, update_speeds(speeds, measured))
+    print(
+        f"compression finished: {len(changed)} of {len(files)} files compressed "
+        f"(small files at quality {small_quality}, large at {large_quality}) in {time.time() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
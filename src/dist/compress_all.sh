@@ -1,13 +1,5 @@
 #!/bin/bash
 
-cd ../view/output
-
-rm *.br
-
-for file in *; do
-    if [ -f "$file" ]; then
-        brotli --quality=6 "$file" -o "$file.br"
-    fi
-done
-
-echo "compression finished"
\ No newline at end of file
+# Kept for manual runs, the compression stage lives in compress_all.py
+cd "$(dirname "$0")"
+python3 ./compress_all.py "$@"
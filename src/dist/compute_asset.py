@@ -1,7 +1,8 @@
 import os
 import json5
 from datetime import datetime, timezone
-from tqdm import tqdm
+
+from series_io import SharedSeriesWriter, iter_lines
 
 # Define paths
 config_file = "apikey-crypto.json"
@@ -23,37 +24,39 @@ if not input_file:
 if not start_date or not end_date:
     raise ValueError("Start and/or end dates are not specified in the JSON configuration.")
 
-# Convert start_date and end_date to timezone-aware datetime objects
-start_date = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-end_date = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+# Convert start_date and end_date to Unix epoch bounds, compared as integers per line
+start_ts = int(datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+end_ts = int(datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
 
 # Initialize a counter for the number of lines written
 lines_written = 0
 
-# Count the total lines in the input file for progress bar initialization
-with open(input_file, "r") as infile:
-    total_lines = sum(1 for _ in infile)
-
-# Process the data from the input file
-with open(input_file, "r") as infile, open(output_file, "w") as outfile:
-    for line in tqdm(infile, total=total_lines, desc="Processing lines", unit="lines"):
+# Stream the input file (1s stores are tens of millions of lines), progress over the file size.
+# The rows also go to the shared arrays, so the next stages do not parse asset.txt again
+shared = SharedSeriesWriter()
+with open(output_file, "w") as outfile:
+    for line in iter_lines(input_file, desc="Processing lines"):
         # Split the line by the pipe character
         parts = line.strip().split("|")
         
         # Extract the timestamp (first column) and closing price (4th column)
         if len(parts) >= 4:
             try:
-                # Convert the Unix epoch timestamp to a timezone-aware datetime object
-                line_date = datetime.fromtimestamp(int(parts[0]), tz=timezone.utc)
+                timestamp = int(parts[0])
             except ValueError:
                 # Skip lines with invalid timestamps
                 continue
             
             # Check if the date falls within the specified range
-            if start_date <= line_date <= end_date:
+            if start_ts <= timestamp <= end_ts:
                 closing_price = parts[3]  # 4th column is index 3
+                try:
+                    shared.append(timestamp, float(closing_price))
+                except ValueError:
+                    continue
                 # Write the filtered data to the output file in Unix epoch time
                 outfile.write(f"{parts[0]},{closing_price}\n")
                 lines_written += 1
+shared.close(output_file)
 
 print(f"Filtered data has been processed and saved to {output_file}. Total lines written: {lines_written}")
@@ -1,64 +1,83 @@
 import os
 import json5
+import numpy as np
 import pandas as pd
 
+from indicator_cache import DEFAULT_BUDGET_MB, IndicatorCache, ema_kernel
+from series_io import asset_arrays, bar_interval, chunk_rows, minute_bars, write_columns
+
 # Paths
 config_file = "apikey-crypto.json"
 asset_file = "../view/output/asset.txt"
 ema_file = "../view/output/expma.txt"
 slope_file = "../view/output/ema_slopes.txt"
 
-# Ensure the output directory exists
-os.makedirs(os.path.dirname(ema_file), exist_ok=True)
 
-# Load configuration
-try:
-    with open(config_file, 'r') as file:
-        config = json5.load(file)
-        ema_days = config.get("ema_days", 5)  # Default to 5 days if not specified
-except FileNotFoundError:
-    print(f"Configuration file {config_file} not found.")
-    exit(1)
+def write_ema(config_key, ema_file, slope_file):
+    """
+    Write the EMA of asset.txt (span `config_key` of the config, in minute
+    bars) and its slopes. The EMA comes from the indicator cache: after new
+    bars were appended to asset.txt only those are computed, and only their
+    rows are appended to the output files when these are still the ones the
+    previous run wrote.
+    """
+    # Ensure the output directory exists
+    os.makedirs(os.path.dirname(ema_file), exist_ok=True)
 
-# Read asset data
-try:
-    asset_data = pd.read_csv(asset_file, header=None, names=["Timestamp", "Price"])
-    asset_data["Timestamp"] = pd.to_numeric(asset_data["Timestamp"])  # Ensure timestamps are numeric
-    asset_data = asset_data.sort_values(by="Timestamp")  # Ensure data is sorted by timestamp
-    # Convert Timestamp to human-readable datetime
-    asset_data["Datetime"] = pd.to_datetime(asset_data["Timestamp"], unit="s")
-except FileNotFoundError:
-    print(f"Asset file {asset_file} not found.")
-    exit(1)
+    # Load configuration
+    try:
+        with open(config_file, 'r') as file:
+            config = json5.load(file)
+            ema_days = config.get(config_key, 5)  # Default to 5 days if not specified
+    except FileNotFoundError:
+        print(f"Configuration file {config_file} not found.")
+        exit(1)
 
-# Calculate EMA
-try:
-    asset_data["EMA"] = asset_data["Price"].ewm(span=ema_days, adjust=False).mean()
-except Exception as e:
-    print(f"Error calculating EMA: {e}")
-    exit(1)
+    if not os.path.exists(asset_file):
+        print(f"Asset file {asset_file} not found.")
+        exit(1)
 
-# Write EMA to output file
-try:
-    asset_data[["Timestamp", "EMA"]].to_csv(ema_file, index=False, header=False)
-    print(f"Exponential Moving Average (EMA) written to {ema_file}.")
-except Exception as e:
-    print(f"Error writing EMA to output file {ema_file}: {e}")
-    exit(1)
+    # The span is given in minute bars: keep its length in time for shorter bars
+    interval = bar_interval(config, asset_file)
+    span = minute_bars(ema_days, interval)
+    if interval != 60:
+        print(f"{interval:g}s bars: {config_key} {ema_days} -> EMA span of {span:g} bars")
+
+    rows = chunk_rows(config)
+    params = {"span": span}
+    try:
+        timestamps, prices = asset_arrays(asset_file, rows)
+        cache = IndicatorCache(budget_mb=config.get("indicator_cache_mb", DEFAULT_BUDGET_MB))
+        ema = cache.get("ema", params, timestamps, prices, ema_kernel(span, rows))
+
+        start = min(cache.output_start(path, "ema", params, timestamps) for path in (ema_file, slope_file))
+        if start:
+            print(f"{start} rows of {ema_file} are current, appending {len(ema) - start}")
+        mode = "a" if start else "w"
+        with open(ema_file, mode) as ema_out, open(slope_file, mode) as slope_out:
+            for chunk_start in range(start, len(ema), rows):
+                chunk_times = timestamps[chunk_start:chunk_start + rows]
+                chunk_ema = np.asarray(ema[chunk_start:chunk_start + rows])
+                # The difference between consecutive EMA values (the first row has none)
+                previous = ema[chunk_start - 1] if chunk_start else np.nan
+                slopes = np.diff(chunk_ema, prepend=previous)
 
-# Calculate slopes of the EMA
-try:
-    asset_data["EMA_Slope"] = asset_data["EMA"].diff()  # Calculate the difference between consecutive EMA values
-except Exception as e:
-    print(f"Error calculating EMA slopes: {e}")
-    exit(1)
+                # Same text as DataFrame.to_csv: repr of the floats
+                write_columns(ema_out, "{},{!r}\n", chunk_times, chunk_ema)
 
-# Write slopes to the slope file, including a human-readable datetime column
-try:
-    asset_data[["Timestamp", "EMA_Slope", "Datetime"]].dropna().to_csv(
-        slope_file, index=False, header=False
-    )
+                # Slopes, including a human-readable datetime column
+                valid = ~np.isnan(slopes)
+                datetimes = pd.to_datetime(chunk_times[valid], unit="s").strftime("%Y-%m-%d %H:%M:%S")
+                write_columns(slope_out, "{},{!r},{}\n", chunk_times[valid], slopes[valid], datetimes.to_numpy())
+        for path in (ema_file, slope_file):
+            cache.stamp_output(path, "ema", params, timestamps)
+    except Exception as e:
+        print(f"Error calculating EMA: {e}")
+        exit(1)
+
+    print(f"Exponential Moving Average (EMA) written to {ema_file}.")
     print(f"EMA slopes written to {slope_file} with human-readable datetime.")
-except Exception as e:
-    print(f"Error writing EMA slopes to output file {slope_file}: {e}")
-    exit(1)
+
+
+if __name__ == "__main__":
+    write_ema("ema_days", ema_file, slope_file)
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 
 import os
+import sys
+import math
 import json5
 from datetime import datetime
+from pathlib import Path
+
+import kernels
+from series_io import array_chunks, merged_events, write_columns
 
 # File paths
 API_KEY_FILE = "apikey-crypto.json"
@@ -32,17 +38,26 @@ def load_api_data(file_path):
     
     return investment, margin, annual_interest_rate, trade_fee_percentage, slippage_percent
 
-def load_asset_data(file_path):
-    """Load asset data as a dictionary of prices and events."""
-    price_dict = {}
-    asset_events = []
+def load_lot_step(file_path):
+    """
+    Return the pair's LOT_SIZE step from the local exchange-info cache when
+    'sim_round_to_lot_size' is enabled, so simulated buys use whole lots like
+    the live orders. Returns None otherwise (no rounding).
+    """
     with open(file_path, "r") as f:
-        for line in f:
-            timestamp, closing_price = map(float, line.strip().split(","))
-            timestamp = int(timestamp)
-            price_dict[timestamp] = closing_price
-            asset_events.append((timestamp, 'price', closing_price))
-    return price_dict, asset_events
+        api_data = json5.load(f)
+    if not api_data.get("sim_round_to_lot_size", False):
+        return None
+
+    sys.path.append(str(Path(__file__).resolve().parents[1] / "python"))
+    from exchange.exchange_info import get_symbol_info
+
+    # Cache only, the simulator never calls the exchange
+    info = get_symbol_info(api_data["pair"], refresh=False)
+    if not info or not info.get("step_size"):
+        print("No cached LOT_SIZE for the pair, simulating without lot rounding.")
+        return None
+    return float(info["step_size"])
 
 def load_trade_data(file_path):
     """Load trade data as a list of trade events, ignoring additional parameters."""
@@ -87,12 +102,13 @@ def accrue_interest(debt, annual_interest_rate, time_diff_seconds, cash_balance)
 
 def process_events(
     events, 
-    price_dict, 
+    out, 
     investment, 
     margin, 
     annual_interest_rate, 
     trade_fee_percentage,
-    slippage_percent
+    slippage_percent,
+    lot_step=None
 ):
     """
     Simulate trades (buy/sell) and margin interest, then produce portfolio values,
@@ -105,12 +121,24 @@ def process_events(
       - 'sell': sell all shares, pay fee from proceeds.
                if proceeds don't cover fee, add shortfall to debt.
       - interest: on each price or trade event, we accrue interest on 'debt'.
+      - lot_step: if set, bought shares are rounded down to this LOT_SIZE step
+               and the remainder stays in cash.
+
+    events is a time-ordered iterable (series_io.merged_events); a trade is
+    filled at the price of the latest price event. Portfolio values are
+    written to `out` as they are computed instead of being collected.
+
+    Returns:
+        final_portfolio_value (float): The last portfolio value (0.0 without events).
+        total_interest_cost (float)
+        total_fees_cost (float)
     """
     number_of_shares = 0.0
     cash_balance = investment
     debt = 0.0
 
-    portfolio_data = []
+    final_portfolio_value = 0.0
+    current_price = None
     total_interest_cost = 0.0
     total_fees_cost = 0.0
 
@@ -135,10 +163,11 @@ def process_events(
             current_price = data
             net_value = number_of_shares * current_price + cash_balance - debt
             last_net_value = net_value
-            portfolio_data.append((timestamp, net_value))
 
         elif event_type == 'trade':
-            current_price = price_dict[timestamp]
+            # The price event of the same timestamp comes first in the merge
+            if current_price is None:
+                raise ValueError(f"Trade at {timestamp} before the first asset price")
 
             if data == 'buy':
                 # Slippage: buy at a slightly higher price
@@ -176,10 +205,12 @@ def process_events(
                 shares_to_buy = 0.0
                 if buy_price > 0:
                     shares_to_buy = actual_funds_for_buy / buy_price
+                    if lot_step:
+                        shares_to_buy = math.floor(shares_to_buy / lot_step) * lot_step
                 number_of_shares += shares_to_buy
 
-                # We used all available funds to buy
-                cash_balance = 0.0
+                # We used all available funds to buy (apart from the lot-size remainder)
+                cash_balance = actual_funds_for_buy - shares_to_buy * buy_price if lot_step else 0.0
 
             elif data == 'sell':
                 # Slippage: sell at a slightly lower price
@@ -214,21 +245,40 @@ def process_events(
             # Recompute net value
             net_value = number_of_shares * current_price + cash_balance - debt
             last_net_value = net_value
-            portfolio_data.append((timestamp, net_value))
-
-        else:
-            # If it's not a price or trade event, just keep the last known value
-            portfolio_data.append((timestamp, last_net_value))
 
+        # Any other event just keeps the last known value
+        out.write(f"{timestamp},{last_net_value:.2f}\n")
+        final_portfolio_value = last_net_value
         last_timestamp = timestamp
 
-    return portfolio_data, total_interest_cost, total_fees_cost
+    return final_portfolio_value, total_interest_cost, total_fees_cost
 
-def save_portfolio_data(portfolio_data, file_path):
-    """Save portfolio values to a file."""
-    with open(file_path, "w") as f:
-        for timestamp, value in portfolio_data:
-            f.write(f"{timestamp},{value:.2f}\n")
+def process_event_arrays(
+    event_chunks,
+    out,
+    investment,
+    margin,
+    annual_interest_rate,
+    trade_fee_percentage,
+    slippage_percent,
+    lot_step=None
+):
+    """
+    process_events() over the (times, kinds, prices) chunks of
+    kernels.portfolio_event_chunks(), in the compiled kernel. Same output and
+    returns.
+    """
+    state = kernels.portfolio_state(investment)
+    for times, kinds, prices in event_chunks:
+        values, failed = kernels.final_portfolio(
+            times, kinds, prices, state, margin, annual_interest_rate,
+            trade_fee_percentage, slippage_percent, lot_step or 0.0
+        )
+        write_columns(out, "{},{:.2f}\n", times[:len(values)], values)
+        if failed >= 0:
+            raise ValueError(f"Trade at {times[failed]} before the first asset price")
+    final_portfolio_value = float(state[5]) if state[8] else 0.0
+    return final_portfolio_value, float(state[6]), float(state[7])
 
 def format_with_upticks(value, currency="$usdc"):
     """
@@ -266,34 +316,34 @@ def main():
         trade_fee_percentage, 
         slippage_percent
     ) = load_api_data(API_KEY_FILE)
+    lot_step = load_lot_step(API_KEY_FILE)
      
-    # Load data
-    price_dict, asset_events = load_asset_data(ASSET_FILE)
+    # Load the trades; the asset prices are streamed and merged in by timestamp
     trade_events = load_trade_data(TRADES_FILE)
-
-    # Merge all events by timestamp
-    events = sorted(asset_events + trade_events, key=lambda x: x[0])
-
-    # Run the simulation
-    portfolio_data, total_interest_cost, total_fees_cost = process_events(
-        events, 
-        price_dict, 
-        investment, 
-        margin, 
-        annual_interest_rate, 
-        trade_fee_percentage,
-        slippage_percent
-    )
-
-    # Final portfolio value
-    final_portfolio_value = portfolio_data[-1][1] if portfolio_data else 0.0
+    if kernels.JIT:
+        events = kernels.portfolio_event_chunks(array_chunks(ASSET_FILE), trade_events)
+        simulate = process_event_arrays
+    else:
+        events = merged_events(ASSET_FILE, trade_events)
+        simulate = process_events
+
+    # Run the simulation, saving the portfolio values as they are computed
+    with open(PORTFOLIO_FILE, "w") as out:
+        final_portfolio_value, total_interest_cost, total_fees_cost = simulate(
+            events, 
+            out, 
+            investment, 
+            margin, 
+            annual_interest_rate, 
+            trade_fee_percentage,
+            slippage_percent,
+            lot_step
+        )
 
     # A convenience metric: final minus total_fees, if you want to see
     # the effect of fees netted out of the final
     portfolio_including_fees = final_portfolio_value  # Because we already deducted fees
 
-    # Save portfolio results
-    save_portfolio_data(portfolio_data, PORTFOLIO_FILE)
     print(f"Portfolio data saved to {PORTFOLIO_FILE}")
 
     # Save cost results
@@ -2,8 +2,13 @@
 # Fees are only for the costs.txt since they are in bnb
 
 import os
+import sys
+import math
 import json5
-from datetime import datetime
+from pathlib import Path
+
+import kernels
+from series_io import array_chunks, merged_events, write_columns
 
 # File paths
 API_KEY_FILE = "apikey-crypto.json"
@@ -23,17 +28,26 @@ def load_api_data(file_path):
     
     return investment, margin, annual_interest_rate, trade_fee_percentage
 
-def load_asset_data(file_path):
-    """Load asset data as a dictionary of prices and events."""
-    price_dict = {}
-    asset_events = []
+def load_lot_step(file_path):
+    """
+    Return the pair's LOT_SIZE step from the local exchange-info cache when
+    'sim_round_to_lot_size' is enabled, so simulated buys use whole lots like
+    the live orders. Returns None otherwise (no rounding).
+    """
     with open(file_path, "r") as f:
-        for line in f:
-            timestamp, closing_price = map(float, line.strip().split(","))
-            timestamp = int(timestamp)
-            price_dict[timestamp] = closing_price
-            asset_events.append((timestamp, 'price', closing_price))
-    return price_dict, asset_events
+        api_data = json5.load(f)
+    if not api_data.get("sim_round_to_lot_size", False):
+        return None
+
+    sys.path.append(str(Path(__file__).resolve().parents[1] / "python"))
+    from exchange.exchange_info import get_symbol_info
+
+    # Cache only, the simulator never calls the exchange
+    info = get_symbol_info(api_data["pair"], refresh=False)
+    if not info or not info.get("step_size"):
+        print("No cached LOT_SIZE for the pair, simulating without lot rounding.")
+        return None
+    return float(info["step_size"])
 
 def load_trade_data(file_path):
     """Load trade data as a list of trade events, ignoring additional parameters."""
@@ -61,7 +75,7 @@ def accrue_interest(debt, annual_interest_rate, time_diff_seconds):
     interest_for_period = debt * ((1 + per_second_rate) ** time_diff_seconds - 1)
     return interest_for_period
 
-def process_events(events, price_dict, investment, margin, annual_interest_rate, trade_fee_percentage):
+def process_events(events, out, investment, margin, annual_interest_rate, trade_fee_percentage, lot_step=None):
     """
     Simulate trades (buy/sell) and margin interest, then produce portfolio values.
 
@@ -69,9 +83,15 @@ def process_events(events, price_dict, investment, margin, annual_interest_rate,
       - Fees are NOT deducted from the portfolio, 
         because they're paid separately in BNB.
       - We still track those fees in total_fees_cost for reporting.
+      - With lot_step, bought shares are rounded down to that LOT_SIZE step
+        and the remainder stays in cash.
     
+    events is a time-ordered iterable (series_io.merged_events); a trade is
+    filled at the price of the latest price event. Portfolio values are
+    written to `out` as they are computed.
+
     Returns:
-        portfolio_data (list): List of (timestamp, net_value) tuples.
+        final_portfolio_value (float): The last portfolio value (0.0 without events).
         total_interest_cost (float): The total interest accrued on margin.
         total_fees_cost (float): The total trading fees, paid in BNB (not deducted from portfolio).
     """
@@ -79,7 +99,8 @@ def process_events(events, price_dict, investment, margin, annual_interest_rate,
     cash_balance = investment
     debt = 0.0
 
-    portfolio_data = []
+    final_portfolio_value = 0.0
+    closing_price = None
     total_interest_cost = 0.0
     total_fees_cost = 0.0
 
@@ -88,8 +109,6 @@ def process_events(events, price_dict, investment, margin, annual_interest_rate,
     last_net_value = investment
 
     for timestamp, event_type, data in events:
-        current_timestamp = datetime.fromtimestamp(timestamp)
-
         # First, accrue interest since the last event (if any)
         if last_timestamp is not None:
             time_diff = timestamp - last_timestamp
@@ -104,11 +123,11 @@ def process_events(events, price_dict, investment, margin, annual_interest_rate,
             closing_price = data
             net_value = (number_of_shares * closing_price + cash_balance - debt)
             last_net_value = net_value
-            portfolio_data.append((timestamp, net_value))
 
         elif event_type == 'trade':
-            # We get the latest known closing price
-            closing_price = price_dict[timestamp]
+            # We use the latest known closing price (same timestamp, merged first)
+            if closing_price is None:
+                raise ValueError(f"Trade at {timestamp} before the first asset price")
 
             if data == 'buy':
                 # Buy with all available cash plus margin
@@ -120,14 +139,16 @@ def process_events(events, price_dict, investment, margin, annual_interest_rate,
                 
                 # Use all funds for shares
                 shares_to_buy = total_funds / closing_price
+                if lot_step:
+                    shares_to_buy = math.floor(shares_to_buy / lot_step) * lot_step
                 number_of_shares += shares_to_buy
 
                 # Debt is the borrowed part of the total_funds
                 borrowed = total_funds - cash_balance
                 debt += borrowed
 
-                # After buying, cash is depleted
-                cash_balance = 0.0
+                # After buying, cash is depleted (apart from the lot-size remainder)
+                cash_balance = total_funds - shares_to_buy * closing_price if lot_step else 0.0
 
             elif data == 'sell':
                 # Sell all shares
@@ -151,21 +172,30 @@ def process_events(events, price_dict, investment, margin, annual_interest_rate,
             # Recalculate net value after the trade
             net_value = (number_of_shares * closing_price + cash_balance - debt)
             last_net_value = net_value
-            portfolio_data.append((timestamp, net_value))
-
-        else:
-            # If it's not a price or trade event, just keep the last known value
-            portfolio_data.append((timestamp, last_net_value))
 
+        # Any other event just keeps the last known value
+        out.write(f"{timestamp},{last_net_value:.2f}\n")
+        final_portfolio_value = last_net_value
         last_timestamp = timestamp
 
-    return portfolio_data, total_interest_cost, total_fees_cost
+    return final_portfolio_value, total_interest_cost, total_fees_cost
 
-def save_portfolio_data(portfolio_data, file_path):
-    """Save portfolio values to a file."""
-    with open(file_path, "w") as f:
-        for timestamp, value in portfolio_data:
-            f.write(f"{timestamp},{value:.2f}\n")
+def process_event_arrays(event_chunks, out, investment, margin, annual_interest_rate, trade_fee_percentage, lot_step=None):
+    """
+    process_events() over the (times, kinds, prices) chunks of
+    kernels.portfolio_event_chunks(), in the compiled kernel. Same output and
+    returns.
+    """
+    state = kernels.portfolio_state(investment)
+    for times, kinds, prices in event_chunks:
+        values, failed = kernels.bnb_portfolio(
+            times, kinds, prices, state, margin, annual_interest_rate, trade_fee_percentage, lot_step or 0.0
+        )
+        write_columns(out, "{},{:.2f}\n", times[:len(values)], values)
+        if failed >= 0:
+            raise ValueError(f"Trade at {times[failed]} before the first asset price")
+    final_portfolio_value = float(state[5]) if state[8] else 0.0
+    return final_portfolio_value, float(state[6]), float(state[7])
 
 def format_with_upticks(value, currency="$usdc"):
     """
@@ -195,19 +225,23 @@ def main():
 
     # Load data
     investment, margin, annual_interest_rate, trade_fee_percentage = load_api_data(API_KEY_FILE)
-    price_dict, asset_events = load_asset_data(ASSET_FILE)
+    lot_step = load_lot_step(API_KEY_FILE)
     trade_events = load_trade_data(TRADES_FILE)
 
-    # Merge all events and sort by timestamp
-    events = sorted(asset_events + trade_events, key=lambda x: x[0])
+    # Merge the streamed asset prices with the trades by timestamp
+    if kernels.JIT:
+        events = kernels.portfolio_event_chunks(array_chunks(ASSET_FILE), trade_events)
+        simulate = process_event_arrays
+    else:
+        events = merged_events(ASSET_FILE, trade_events)
+        simulate = process_events
 
-    # Process trades, track portfolio values and costs
-    portfolio_data, total_interest_cost, total_fees_cost = process_events(
-        events, price_dict, investment, margin, annual_interest_rate, trade_fee_percentage
-    )
+    # Process trades, saving portfolio values as they are computed, and track costs
+    with open(PORTFOLIO_FILE, "w") as out:
+        _, total_interest_cost, total_fees_cost = simulate(
+            events, out, investment, margin, annual_interest_rate, trade_fee_percentage, lot_step
+        )
 
-    # Save portfolio results
-    save_portfolio_data(portfolio_data, PORTFOLIO_FILE)
     print(f"Portfolio data using BNB saved to {PORTFOLIO_FILE}")
 
     # Save cost results
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Zoom pyramid for the price and portfolio charts.
+
+Reads the series bundle (series_bundle.py) and writes time tiles at several
+resolutions to ../view/output/pyramid/:
+
+    level 0   full resolution, one point per timestamp
+    level 1+  min/max envelope per time bucket (BUCKET_SECONDS), so a chart at
+              any zoom draws every spike without shipping every minute
+
+Buckets and tiles are aligned to the unix epoch, not to the first timestamp,
+so new minutes only ever change the last tile of each level. Each tile's
+CRC is kept in the manifest; tiles whose bytes did not change are not
+rewritten, which keeps the per-cycle disk writes, compression and uploads
+to a handful of small files.
+
+Tile file L<level>/<tile>.bin (little-endian):
+    time     int32[n]  seconds since the tile start
+    then per series in manifest["series"] order:
+        level 0:  value float32[n]
+        level 1+: min float32[n], max float32[n]
+
+pyramid/manifest.json lists every level (bucket_seconds, tile_seconds) and
+its tiles (start, points, crc), so the chart fetches only the tiles of the
+level that covers the visible range.
+"""
+
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+from series_bundle import OUTPUT_DIR, bundle_timestamps, read_bundle, write_atomic
+
+PYRAMID_DIR = os.path.join(OUTPUT_DIR, "pyramid")
+MANIFEST_FILE = os.path.join(PYRAMID_DIR, "manifest.json")
+FORMAT_VERSION = 1
+
+PYRAMID_SERIES = ["asset", "expma", "portfolio", "portfolio_bnb", "untouched_portfolio"]
+BASE_STEP = 60                          # seconds between points at full resolution
+BUCKET_SECONDS = [600, 6000, 60000]     # ~200k / 20k / 2k points for a few years of minutes
+TILE_BUCKETS = 4096                     # buckets (or points) per tile
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, "r") as f:
+            manifest = json.load(f)
+        return manifest if manifest.get("version") == FORMAT_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def envelope(timestamps, values, bucket_seconds):
+    """Min/max per epoch-aligned bucket. Returns (bucket starts, mins, maxs); NaN is ignored."""
+    bucket_ids = timestamps // bucket_seconds
+    starts = np.flatnonzero(np.diff(bucket_ids)) + 1
+    starts = np.concatenate(([0], starts))
+    mins = np.fmin.reduceat(values, starts, axis=0)
+    maxs = np.fmax.reduceat(values, starts, axis=0)
+    return bucket_ids[starts] * bucket_seconds, mins, maxs
+
+
+def level_tiles(bucket_times, tile_seconds, columns):
+    """Split one level into epoch-aligned tiles. Yields (tile id, tile start, tile bytes, points)."""
+    tile_ids = bucket_times // tile_seconds
+    bounds = np.flatnonzero(np.diff(tile_ids)) + 1
+    for lo, hi in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(tile_ids)]))):
+        tile_id = int(tile_ids[lo])
+        tile_start = tile_id * tile_seconds
+        parts = [(bucket_times[lo:hi] - tile_start).astype("<i4").tobytes()]
+        parts.extend(column[lo:hi].astype("<f4").tobytes() for column in columns)
+        yield tile_id, tile_start, b"".join(parts), int(hi - lo)
+
+
+def build_levels(timestamps, values):
+    """Return [(level, bucket_seconds, tile_seconds, bucket times, [columns])], finest first."""
+    levels = [(0, BASE_STEP, BASE_STEP * TILE_BUCKETS, timestamps, [values[:, i] for i in range(values.shape[1])])]
+    for level, bucket_seconds in enumerate(BUCKET_SECONDS, start=1):
+        bucket_times, mins, maxs = envelope(timestamps, values, bucket_seconds)
+        columns = []
+        for i in range(values.shape[1]):
+            columns.extend((mins[:, i], maxs[:, i]))
+        levels.append((level, bucket_seconds, bucket_seconds * TILE_BUCKETS, bucket_times, columns))
+    return levels
+
+
+def main():
+    start = time.time()
+    header, bundle = read_bundle()
+    if not bundle or header["length"] == 0:
+        print("No series bundle, skipping the zoom pyramid.")
+        return
+
+    series = [name for name in PYRAMID_SERIES if name in bundle]
+    timestamps = bundle_timestamps(header, bundle)
+    values = np.column_stack([bundle[name] for name in series]).astype(np.float32)
+
+    previous = load_manifest()
+    if previous and previous.get("series") != series:
+        previous = None  # different columns, every tile changes
+    old_levels = {lvl["level"]: lvl for lvl in previous["levels"]} if previous else {}
+
+    manifest_levels = []
+    stale_files = []
+    written = kept = 0
+    for level, bucket_seconds, tile_seconds, bucket_times, columns in build_levels(timestamps, values):
+        level_dir = os.path.join(PYRAMID_DIR, f"L{level}")
+        os.makedirs(level_dir, exist_ok=True)
+        old_level = old_levels.get(level, {})
+        old_tiles = old_level.get("tiles", {}) if old_level.get("tile_seconds") == tile_seconds else {}
+
+        tiles = {}
+        for tile_id, tile_start, data, points in level_tiles(bucket_times, tile_seconds, columns):
+            crc = zlib.crc32(data)
+            key = str(tile_id)
+            tile_file = os.path.join(level_dir, f"{tile_id}.bin")
+            if old_tiles.get(key, {}).get("crc") == crc and os.path.exists(tile_file):
+                kept += 1
+            else:
+                write_atomic(tile_file, data)
+                written += 1
+            tiles[key] = {"start": tile_start, "points": points, "crc": crc}
+
+        # Tiles that no longer have data (history shrank or was rewritten)
+        stale_files.extend(os.path.join(level_dir, f"{key}.bin") for key in set(old_tiles) - set(tiles))
+
+        manifest_levels.append({
+            "level": level,
+            "kind": "full" if level == 0 else "envelope",
+            "bucket_seconds": bucket_seconds,
+            "tile_seconds": tile_seconds,
+            "points": int(len(bucket_times)),
+            "tiles": tiles,
+        })
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "generation": time.time_ns() // 1000,
+        "series": series,
+        "start": int(timestamps[0]),
+        "end": int(timestamps[-1]),
+        "levels": manifest_levels,
+    }
+    # Tiles first, manifest last: the manifest never points at a missing tile
+    write_atomic(MANIFEST_FILE, json.dumps(manifest, separators=(",", ":")).encode())
+    for path in stale_files:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    print(f"Zoom pyramid: {written} tiles written, {kept} unchanged, in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
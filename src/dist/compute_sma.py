@@ -1,5 +1,9 @@
 import os
-import pandas as pd
+import json5
+import numpy as np
+
+from indicator_cache import DEFAULT_BUDGET_MB, IndicatorCache, sma_kernel
+from series_io import asset_arrays, chunk_rows, write_columns
 
 # Paths
 config_file = "apikey-crypto.json"
@@ -14,36 +18,36 @@ sma_window = 60000  # Configure the SMA window size
 if not os.path.exists(asset_file):
     raise FileNotFoundError(f"The file {asset_file} does not exist.")
 
-# Read asset data
+with open(config_file, "r") as f:
+    config = json5.load(f)
+rows = chunk_rows(config)
+
+# Read asset data (in time order, as compute_asset.py writes it)
 try:
-    df = pd.read_csv(
-        asset_file,
-        header=None,
-        names=["timestamp", "price"],
-        dtype={"timestamp": int, "price": float}
-    )
+    timestamps, prices = asset_arrays(asset_file, rows)
 except Exception as e:
     raise ValueError(f"Error reading {asset_file}: {e}")
 
-# Sort by timestamp if it's not already sorted
-df.sort_values("timestamp", inplace=True)
-
-# Calculate SMA
-df["sma"] = df["price"].rolling(window=sma_window).mean()
+# Calculate SMA, or take it from the indicator cache
+cache = IndicatorCache(budget_mb=config.get("indicator_cache_mb", DEFAULT_BUDGET_MB))
+sma = cache.get("sma", {"window": sma_window}, timestamps, prices, sma_kernel(sma_window, rows))
 
-# Prepare SMA output
-sma_df = df.dropna(subset=["sma"])[["timestamp", "sma"]]
+with open(sma_file, "w") as sma_out, open(slope_file, "w") as slope_out:
+    for start in range(0, len(sma), rows):
+        chunk_times = timestamps[start:start + rows]
+        chunk_sma = np.asarray(sma[start:start + rows])
 
-# Write SMA with no scientific notation and 12 decimal places
-sma_df.to_csv(sma_file, index=False, header=False, float_format='%.12f')
-print(f"Simple Moving Average calculated and saved to {sma_file}.")
-
-# Calculate slope as d(SMA)/d(Time)
-df["slope"] = df["sma"].diff() / df["timestamp"].diff()
+        # Write SMA with no scientific notation and 12 decimal places
+        valid = ~np.isnan(chunk_sma)
+        write_columns(sma_out, "{},{:.12f}\n", chunk_times[valid], chunk_sma[valid])
 
-# Prepare slope output
-slope_df = df.dropna(subset=["slope"])[["timestamp", "slope"]]
+        # Calculate slope as d(SMA)/d(Time)
+        previous_sma = sma[start - 1] if start else np.nan
+        previous_time = timestamps[start - 1] if start else chunk_times[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slopes = np.diff(chunk_sma, prepend=previous_sma) / np.diff(chunk_times, prepend=previous_time)
+        valid = ~np.isnan(slopes)
+        write_columns(slope_out, "{},{:.12f}\n", chunk_times[valid], slopes[valid])
 
-# Write slope with no scientific notation and 12 decimal places
-slope_df.to_csv(slope_file, index=False, header=False, float_format='%.12f')
+print(f"Simple Moving Average calculated and saved to {sma_file}.")
 print(f"SMA slope calculated and saved to {slope_file}.")
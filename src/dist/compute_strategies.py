@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Run the enabled strategies (strategies.py) over asset.txt in one pass.
+
+The config key "strategies" lists them, e.g.
+
+    "strategies": ["trailsl_localmin", "ema_algo", "ema_algo_minloss"],
+
+(default ["trailsl_localmin"]). The features they declare are computed once,
+chunk by chunk, into a shared frame, and every strategy runs over each chunk
+before the next one is built. Each strategy's trades go to
+../view/output/trades_<name>.txt; the first one's also to trades.txt, which
+the portfolio stages and execute_orders.py read. Comparing strategies costs
+about one run plus the strategy logic.
+"""
+
+import os
+import time
+
+import json5
+from tqdm import tqdm
+
+from indicator_cache import DEFAULT_BUDGET_MB, IndicatorCache
+from series_io import asset_arrays, chunk_rows
+from strategies import FEATURES, STRATEGIES, FeatureContext
+
+# Define file paths
+api_key_file = "apikey-crypto.json"
+asset_file = "../view/output/asset.txt"
+trades_file = "../view/output/trades.txt"
+DEFAULT_STRATEGIES = ["trailsl_localmin"]
+
+
+def strategy_trades_file(name):
+    return os.path.join(os.path.dirname(trades_file), f"trades_{name}.txt")
+
+
+def run_strategies(names=None):
+    """Run the strategies `names` (default: the config's), writing their trade files."""
+    with open(api_key_file, 'r') as f:
+        config = json5.load(f)
+    names = names or config.get("strategies") or DEFAULT_STRATEGIES
+    unknown = [name for name in names if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(f"Unknown strategies {unknown}, available: {sorted(STRATEGIES)}")
+    if not os.path.exists(asset_file):
+        raise FileNotFoundError(f"Asset file not found: {asset_file}")
+
+    rows = chunk_rows(config)
+    timestamps, prices = asset_arrays(asset_file, rows)
+    cache = IndicatorCache(budget_mb=config.get("indicator_cache_mb", DEFAULT_BUDGET_MB))
+    ctx = FeatureContext(config, asset_file, timestamps, prices, cache, rows)
+
+    strategies = [STRATEGIES[name](config) for name in names]
+    needed = {name for strategy in strategies for name in strategy.features}
+    features = {name: iter(FEATURES[name](ctx)) for name in sorted(needed)}
+    print(f"Strategies: {', '.join(names)} (trades.txt: {names[0]}); features: {', '.join(sorted(needed))}")
+
+    outputs = [[open(strategy_trades_file(name), 'w')] for name in names]
+    outputs[0].append(open(trades_file, 'w'))
+    seconds = [0.0] * len(strategies)
+    counts = [0] * len(strategies)
+    try:
+        with tqdm(total=len(timestamps), desc="Running strategies", unit=" rows", unit_scale=True) as pbar:
+            for start in ctx.chunks():
+                frame = {"timestamp": timestamps[start:start + rows]}
+                for name, chunks in features.items():
+                    frame[name] = next(chunks)
+                for i, strategy in enumerate(strategies):
+                    started = time.perf_counter()
+                    for timestamp, action, reason in strategy.run(frame):
+                        line = f"{int(timestamp)},{action},{reason}\n"
+                        for out in outputs[i]:
+                            out.write(line)
+                        counts[i] += 1
+                    seconds[i] += time.perf_counter() - started
+                pbar.update(len(frame["timestamp"]))
+    finally:
+        for files in outputs:
+            for out in files:
+                out.close()
+
+    for name, count, spent in zip(names, counts, seconds):
+        print(f"  {name:<30} {count:>7} trades  {spent:7.2f} s -> {strategy_trades_file(name)}")
+
+
+if __name__ == "__main__":
+    run_strategies()
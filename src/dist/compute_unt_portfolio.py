@@ -1,6 +1,8 @@
 import os
 import json5
 
+from series_io import array_chunks, chunk_rows, write_columns
+
 # Define file paths
 api_key_file = "apikey-crypto.json"
 asset_file = "../view/output/asset.txt"
@@ -14,31 +16,15 @@ with open(api_key_file, "r") as f:
     api_data = json5.load(f)
     investment = float(api_data["investment"])  # Total investment amount
 
-# Read asset data and calculate portfolio value
-portfolio_data = []
-with open(asset_file, "r") as f:
-    asset_lines = f.readlines()
-
-# Get the initial price to compute number of shares
-initial_line = asset_lines[0]
-initial_timestamp, initial_closing_price = initial_line.strip().split(",")
-initial_closing_price = float(initial_closing_price)
-number_of_shares = investment / initial_closing_price
-
-# Now process each line
-for line in asset_lines:
-    timestamp, closing_price = line.strip().split(",")
-    closing_price = float(closing_price)
-    
-    # Portfolio value is number_of_shares * current closing_price
-    portfolio_value = number_of_shares * closing_price
-    
-    # Store the timestamp and portfolio value
-    portfolio_data.append((timestamp, portfolio_value))
-
-# Write the portfolio data to the output file
+# Stream the asset data in numpy chunks: the initial price fixes the number
+# of shares, each chunk is valued and written as a whole
+number_of_shares = None
 with open(portfolio_file, "w") as f:
-    for timestamp, value in portfolio_data:
-        f.write(f"{timestamp},{value:.2f}\n")
+    for timestamps, closing_prices in array_chunks(asset_file, chunk_rows(api_data)):
+        if number_of_shares is None:
+            number_of_shares = investment / closing_prices[0]
+
+        # Portfolio value is number_of_shares * current closing_price
+        write_columns(f, "{},{:.2f}\n", timestamps, number_of_shares * closing_prices)
 
 print(f"Portfolio data has been processed and saved to {portfolio_file}")
@@ -1,5 +1,13 @@
 import os
+import sys
+import time
 import json5
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "python"))
+from exchange import metrics
+from exchange.stop_monitor import read_position, write_position
+from series_io import bar_interval
 
 API_KEY_FILE = "apikey-crypto.json"
 
@@ -27,13 +35,50 @@ def read_trades(file_path):
                     trades.append((int(parts[0]), parts[1], parts[2]))
     return trades
 
-def execute_trade(trade):
-    """Executes the trade by running the respective file."""
+def read_price_at(file_path, timestamp, tail_bytes=65536):
+    """The asset price at timestamp, looked up in the tail of the asset file, or None."""
+    try:
+        with open(file_path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(file.tell() - tail_bytes, 0))
+            lines = file.read().decode(errors="replace").splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        parts = line.split(',')
+        if len(parts) == 2 and parts[0] == str(timestamp):
+            return float(parts[1])
+    return None
+
+def execute_trade(trade, signal_time):
+    """Executes the trade by running the respective file, and records the position for the stop monitor."""
     timestamp, action, strategy = trade
     script_path = buy_order_file if action == 'buy' else sell_order_file
+    signal_price = read_price_at(asset_file, timestamp)
+
+    if action == 'sell':
+        position = read_position() or {}
+        if position.get("state") == "flat" and position.get("closed_by") == "stop_monitor":
+            # exchange.stop_monitor already sold this position on an intrabar stop
+            print(f"Skipping {action} trade with strategy {strategy}: already sold by the stop monitor "
+                  f"at {position.get('exit_price')}")
+            return
 
     print(f"Executing {action} trade with strategy {strategy} at timestamp {timestamp}")
-    os.system(f"python3 {script_path}")
+    # The order script reports its ack latency and slippage against these (exchange.metrics)
+    os.environ[metrics.SIGNAL_TIME_ENV] = str(signal_time)
+    os.environ[metrics.SIGNAL_PRICE_ENV] = str(signal_price or "")
+    status = os.system(f"python3 {script_path}")
+    if status != 0:
+        # The order did not go through: keep the position as it was, so the
+        # stop monitor is neither armed on a missing long nor disarmed on an open one
+        print(f"[ERROR] {action} order script failed (status {status}), position left unchanged")
+        return
+
+    if action == 'buy':
+        write_position("long", entry_time=timestamp, entry_price=signal_price)
+    else:
+        write_position("flat", exit_time=timestamp, closed_by="execute_orders")
 
 def write_last_timestamp(file_path, timestamp):
     """Writes the given timestamp to the file, overwriting existing content."""
@@ -43,6 +88,7 @@ def write_last_timestamp(file_path, timestamp):
 if __name__ == "__main__":
     last_timestamp_file = "../view/output/last_timestamp.txt"
     trades_file = "../view/output/trades.txt"
+    asset_file = "../view/output/asset.txt"
 
     buy_order_file = f"../python/{exchange}/private/buy20_beta2.py"
     sell_order_file = f"../python/{exchange}/private/sell20_beta2.py"
@@ -62,7 +108,12 @@ if __name__ == "__main__":
 
         # Compare timestamps and execute the trade if necessary
         if last_timestamp is None or last_timestamp < last_trade_timestamp:
-            execute_trade(last_trade)
+            signal_time = time.time()
+            if last_timestamp is not None:
+                # Trades carry the open time of their bar
+                bar_close = last_trade_timestamp + bar_interval(config, asset_file)
+                metrics.observe("kline_close_to_signal_seconds", signal_time - bar_close)
+            execute_trade(last_trade, signal_time)
             write_last_timestamp(last_timestamp_file, last_trade_timestamp)
         else:
             print("No new trades to execute.")
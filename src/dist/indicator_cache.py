@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Disk cache for indicator series (EMA, SMA, super smoother, polynomial band).
+
+Each result is a float64 array aligned with the input rows, stored in
+runtime/indicator_cache/<key>.bin. The key is built from the indicator name,
+its parameters and the first timestamp of the input; index.json keeps per
+entry the number of rows computed and a fingerprint (blake2b) of the input
+rows it was computed from.
+
+    cache = IndicatorCache(budget_mb=config.get("indicator_cache_mb", 512))
+    ema = cache.get("ema", {"span": 1800}, timestamps, closes, ema_kernel(1800))
+
+A lookup whose input starts with exactly the rows of the entry (the usual
+case: new bars were appended) only runs the kernel over the new rows and
+appends them; any other change recomputes the entry. Entries are evicted
+least recently used first once the cache is over its size budget, so
+flipping between a few parameter sets during tuning, or a restart, reuses
+the earlier work.
+
+Kernels are generators: kernel(values, start, previous) yields the output
+rows from `start` on, chunk by chunk, where `previous` holds the rows already
+cached (the state a recursive filter continues from).
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import kernels
+from series_io import CHUNK_ROWS
+
+CACHE_DIR = "runtime/indicator_cache"
+DEFAULT_BUDGET_MB = 512
+
+
+def fingerprint(timestamps, values, rows):
+    """Hash of the first `rows` input rows."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(timestamps[:rows]))
+    digest.update(np.ascontiguousarray(values[:rows]))
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+    def __init__(self, root=CACHE_DIR, budget_mb=DEFAULT_BUDGET_MB):
+        self.root = root
+        self.index_file = os.path.join(root, "index.json")
+        self.budget = int(budget_mb * 1024 * 1024)
+        os.makedirs(root, exist_ok=True)
+        try:
+            with open(self.index_file, "r") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        self.index.setdefault("entries", {})
+        self.index.setdefault("outputs", {})
+
+    def _save(self):
+        tmp_path = f"{self.index_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_file)
+
+    def _data_file(self, key):
+        return os.path.join(self.root, f"{key}.bin")
+
+    @staticmethod
+    def make_key(name, params, timestamps):
+        start = int(timestamps[0]) if len(timestamps) else None
+        text = json.dumps([name, params, start], sort_keys=True)
+        return f"{name}-{hashlib.blake2b(text.encode(), digest_size=10).hexdigest()}"
+
+    def get(self, name, params, timestamps, values, kernel, columns=1):
+        """
+        The indicator over all input rows as a read-only memory map, shape
+        (rows,) or (rows, columns). Computes only what the cache lacks.
+        """
+        key = self.make_key(name, params, timestamps)
+        path = self._data_file(key)
+        rows = len(values)
+        row_bytes = 8 * columns
+        entry = self.index["entries"].get(key)
+
+        cached = 0
+        if (entry is not None and entry["rows"] <= rows and os.path.exists(path)
+                and os.path.getsize(path) == entry["rows"] * row_bytes
+                and entry["fingerprint"] == fingerprint(timestamps, values, entry["rows"])):
+            cached = entry["rows"]
+        if cached == 0:
+            # A miss: whatever was derived from the old entry is stale
+            entry = {"name": name, "params": params, "epoch": (entry or {}).get("epoch", 0) + 1, "hits": 0}
+        else:
+            entry["hits"] = entry.get("hits", 0) + 1
+
+        if cached < rows or not os.path.exists(path):
+            previous = self._map(path, cached, columns)
+            with open(path, "r+b" if cached else "wb") as f:
+                f.truncate(cached * row_bytes)
+                f.seek(cached * row_bytes)
+                for block in kernel(values, cached, previous):
+                    f.write(np.ascontiguousarray(block, dtype="<f8").tobytes())
+            del previous
+            if os.path.getsize(path) != rows * row_bytes:
+                os.remove(path)
+                raise ValueError(f"Indicator '{name}' produced the wrong number of rows")
+
+        entry.update(rows=rows, fingerprint=fingerprint(timestamps, values, rows),
+                     size=rows * row_bytes, used_at=time.time(), computed=rows - cached)
+        self.index["entries"][key] = entry
+        self.evict(keep=key)
+        self._save()
+        return self._map(path, rows, columns)
+
+    @staticmethod
+    def _map(path, rows, columns):
+        shape = (rows,) if columns == 1 else (rows, columns)
+        if rows == 0:
+            return np.empty(shape, np.float64)
+        return np.memmap(path, dtype="<f8", mode="r", shape=shape)
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until the cache fits its budget."""
+        entries = self.index["entries"]
+        total = sum(entry.get("size", 0) for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k].get("used_at", 0)):
+            if total <= self.budget:
+                break
+            if key == keep:
+                continue
+            total -= entries[key].get("size", 0)
+            del entries[key]
+            try:
+                os.remove(self._data_file(key))
+            except OSError:
+                pass
+
+    # ------------------- OUTPUT FILES -------------------
+    def output_start(self, path, name, params, timestamps):
+        """
+        Rows of the text file `path` that are still valid: it was written
+        from the same entry and nothing touched it since. 0 = rewrite it.
+        """
+        key = self.make_key(name, params, timestamps)
+        path = os.path.abspath(path)
+        stamp = self.index["outputs"].get(path)
+        entry = self.index["entries"].get(key)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return 0
+        if (stamp is None or entry is None or stamp["key"] != key or stamp["epoch"] != entry["epoch"]
+                or stamp["rows"] > len(timestamps)
+                or stamp["size"] != stat.st_size or stamp["mtime_ns"] != stat.st_mtime_ns):
+            return 0
+        return stamp["rows"]
+
+    def stamp_output(self, path, name, params, timestamps):
+        """Record that `path` now holds all rows of the entry."""
+        key = self.make_key(name, params, timestamps)
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        self.index["outputs"][path] = {
+            "key": key,
+            "epoch": self.index["entries"][key]["epoch"],
+            "rows": len(timestamps),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        self._save()
+
+
+# ------------------------------------------------------------------------------
+# KERNELS
+# ------------------------------------------------------------------------------
+def ema_kernel(span, chunk=CHUNK_ROWS):
+    """ewm(span, adjust=False).mean(), continued from the last cached value."""
+    def kernel(values, start, previous):
+        last = previous[start - 1] if start else None
+        for chunk_start in range(start, len(values), chunk):
+            prices = pd.Series(values[chunk_start:chunk_start + chunk])
+            if last is not None:
+                prices = pd.concat([pd.Series([last]), prices], ignore_index=True)
+            ema = prices.ewm(span=span, adjust=False).mean().to_numpy()
+            if last is not None:
+                ema = ema[1:]
+            last = ema[-1]
+            yield ema
+    return kernel
+
+
+def sma_kernel(window, chunk=CHUNK_ROWS):
+    """
+    rolling(window).mean(), NaN for the first window - 1 rows. pandas keeps a
+    running sum, so rows may differ from one pass over the whole series in
+    the last bits (far below the 12 decimals compute_sma.py writes).
+    """
+    def kernel(values, start, previous):
+        for chunk_start in range(start, len(values), chunk):
+            chunk_end = min(chunk_start + chunk, len(values))
+            # The window reaches back into rows that are already cached
+            lead = min(chunk_start, window - 1)
+            prices = pd.Series(values[chunk_start - lead:chunk_end])
+            yield prices.rolling(window=window).mean().to_numpy()[lead:]
+    return kernel
+
+
+def super_smoother_kernel(period, chunk=CHUNK_ROWS):
+    """Ehlers' 2-pole super smoother (polynomial.super_smoother_filter), resumable."""
+    def kernel(values, start, previous):
+        if period < 2:
+            for chunk_start in range(start, len(values), chunk):
+                yield np.asarray(values[chunk_start:chunk_start + chunk], dtype=np.float64)
+            return
+        a = math.exp(-math.sqrt(2) * math.pi * 4 / period)
+        c2 = 2 * a * math.cos((math.sqrt(2) / 2) * (2 * math.pi * 4 / period))
+        c3 = -(a ** 2)
+        c1 = 1 - c2 - c3
+        y1 = float(previous[start - 1]) if start >= 1 else None
+        y2 = float(previous[start - 2]) if start >= 2 else None
+        for chunk_start in range(start, len(values), chunk):
+            if kernels.JIT:
+                out = kernels.super_smoother(np.asarray(values[chunk_start:chunk_start + chunk], dtype=np.float64),
+                                             chunk_start, y1 if y1 is not None else np.nan,
+                                             y2 if y2 is not None else np.nan, c1, c2, c3)
+                y1, y2 = float(out[-1]), float(out[-2]) if len(out) > 1 else y1
+                yield out
+                continue
+            block = values[chunk_start:chunk_start + chunk].tolist()
+            out = []
+            for i, x in enumerate(block, chunk_start):
+                # The first two rows pass through, like the original filter
+                y = x if i < 2 else c1 * x + c2 * y1 + c3 * y2
+                out.append(y)
+                y1, y2 = y, y1
+            yield np.array(out, dtype=np.float64)
+    return kernel
+
+
+def poly_band_kernel(period, order, stdev_mult, offset=0, bars_ago=0, chunk=4096):
+    """
+    Rolling polynomial regression band over bar indices (polynomial.py):
+    columns lsma, upper, lower, fitted on the `period` bars ending `bars_ago`
+    bars back; NaN until there are enough bars.
+    """
+    def kernel(values, start, previous):
+        for chunk_start in range(start, len(values), chunk):
+            chunk_end = min(chunk_start + chunk, len(values))
+            out = np.full((chunk_end - chunk_start, 3), np.nan)
+            for i in range(max(chunk_start, period - 1 + bars_ago), chunk_end):
+                first = i - period + 1 - bars_ago
+                x = np.arange(first, first + period)
+                y = np.asarray(values[first:first + period], dtype=np.float64)
+                lsma = np.poly1d(np.polyfit(x, y, deg=order))(i - offset)
+                band = stdev_mult * np.std(y, ddof=1)
+                out[i - chunk_start] = (lsma, lsma + band, lsma - band)
+            yield out
+    return kernel
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Typed-array kernels for the loops of the pipeline that depend on the state of
+the previous row and cannot be vectorized: the super smoother, the
+multi-stage hysteresis filter, the local minimum / trailing stop walk of
+trailsl_localmin and process_events() of both portfolio simulators.
+
+Each kernel takes numpy arrays (one chunk) and a float64 `state` array that
+it updates in place, so the callers feed it chunk after chunk like their
+Python loops. The kernels are compiled with numba when it is importable
+(`pip install numba`); JIT is then True and the callers use them. Without
+numba, or with the environment variable DIST_JIT=0, JIT is False and the
+callers keep their Python loops: the kernels are only the compiled path, not
+a second implementation to maintain. They still run as plain Python (slowly)
+so bench_kernels.py can check both paths give identical outputs either way.
+
+Compiled code is cached in __pycache__ (cache=True); the first run after a
+change pays the compilation, a second or two per kernel.
+"""
+
+import math
+import os
+
+import numpy as np
+
+try:
+    if os.environ.get("DIST_JIT", "1") == "0":
+        raise ImportError("disabled by DIST_JIT=0")
+    from numba import njit
+    JIT = True
+except ImportError:
+    JIT = False
+
+    def njit(*args, **kwargs):
+        """No numba: leave the function as it is."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+# Event kinds of portfolio_event_chunks()
+PRICE, BUY, SELL, OTHER = 0, 1, 2, 3
+TRADE_KINDS = {"buy": BUY, "sell": SELL}
+
+
+# ------------------------------------------------------------------------------
+# INDICATORS
+# ------------------------------------------------------------------------------
+@njit(cache=True)
+def super_smoother(values, first_index, y1, y2, c1, c2, c3):
+    """
+    The 2-pole super smoother over one chunk whose first row is row
+    `first_index` of the series; y1, y2 are the two previous outputs. Rows 0
+    and 1 of the series pass through.
+    """
+    out = np.empty(len(values), np.float64)
+    for j in range(len(values)):
+        x = values[j]
+        if first_index + j < 2:
+            y = x
+        else:
+            y = c1 * x + c2 * y1 + c3 * y2
+        out[j] = y
+        y2 = y1
+        y1 = y
+    return out
+
+
+def hysteresis_state(current=None, pending=None, established=False, count=0):
+    """The state array of hysteresis() (NaN for no value yet)."""
+    return np.array([np.nan if current is None else current,
+                     np.nan if pending is None else pending,
+                     1.0 if established else 0.0, count], np.float64)
+
+
+@njit(cache=True)
+def hysteresis(directions, stable_count_initial, stable_count_steady, state):
+    """
+    slopedirection.HysteresisFilter over an array of directions. NaN rows
+    are skipped and stay NaN. state = [current, pending, established, count].
+    """
+    current, pending, established, count = state[0], state[1], state[2], state[3]
+    out = np.empty(len(directions), np.float64)
+    for i in range(len(directions)):
+        value = directions[i]
+        if value != value:
+            out[i] = np.nan
+            continue
+        if current != current:
+            # The first value is taken as is
+            current = value
+            pending = value
+        elif value == current:
+            pending = current
+            count = 0.0
+        elif value == pending:
+            count += 1.0
+            required = stable_count_steady if established else stable_count_initial
+            if count >= required:
+                current = pending
+                count = 0.0
+                established = 1.0
+        else:
+            pending = value
+            count = 1.0
+        out[i] = current
+    state[0], state[1], state[2], state[3] = current, pending, established, count
+    return out
+
+
+# ------------------------------------------------------------------------------
+# STRATEGIES
+# ------------------------------------------------------------------------------
+@njit(cache=True)
+def trailing_stop_localmin(timestamps, prices, stop_percentage, reentry_delay,
+                           state, window_times, window_prices):
+    """
+    strategies.TrailingStopLocalMin over one chunk. state = [in_market,
+    trailing_stop_price, last_stop_loss_sell_timestamp, window_count], NaN
+    for None; the window arrays hold the last 5 (timestamp, price) rows,
+    oldest first. Returns (trade_times, trade_actions, count) with actions
+    BUY ('locmin', dated at the minimum) and SELL ('tsl').
+    """
+    in_market, stop_price, last_stop_time, count = state[0], state[1], state[2], int(state[3])
+    trade_times = np.empty(len(prices), np.int64)
+    trade_actions = np.empty(len(prices), np.int8)
+    trades = 0
+    factor = 1 - stop_percentage / 100
+    for i in range(len(prices)):
+        timestamp = timestamps[i]
+        price = prices[i]
+        if count == 5:
+            for k in range(4):
+                window_times[k] = window_times[k + 1]
+                window_prices[k] = window_prices[k + 1]
+            count = 4
+        window_times[count] = timestamp
+        window_prices[count] = price
+        count += 1
+
+        if in_market == 0.0 and count == 5:
+            # Local minimum: the middle row is strictly below the other four
+            middle = window_prices[2]
+            is_minimum = True
+            for k in range(5):
+                if k != 2 and middle >= window_prices[k]:
+                    is_minimum = False
+                    break
+            if is_minimum and (last_stop_time != last_stop_time
+                               or window_times[2] > last_stop_time + reentry_delay):
+                in_market = 1.0
+                stop_price = price * factor
+                trade_times[trades] = window_times[2]
+                trade_actions[trades] = BUY
+                trades += 1
+                continue
+
+        if in_market == 1.0:
+            new_stop = price * factor
+            if stop_price != stop_price or new_stop > stop_price:
+                stop_price = new_stop
+            if price <= stop_price:
+                in_market = 0.0
+                stop_price = np.nan
+                last_stop_time = timestamp
+                trade_times[trades] = timestamp
+                trade_actions[trades] = SELL
+                trades += 1
+    state[0], state[1], state[2], state[3] = in_market, stop_price, last_stop_time, count
+    return trade_times, trade_actions, trades
+
+
+# ------------------------------------------------------------------------------
+# PORTFOLIOS
+# ------------------------------------------------------------------------------
+def portfolio_event_chunks(chunks, trade_events):
+    """
+    The events of series_io.merged_events() as (times, kinds, prices) arrays
+    per chunk of (timestamps, prices): the trades are inserted after the
+    prices of the same or an earlier timestamp (prices first at equal
+    timestamps), with a NaN price; the trades after the last price end the
+    last chunk.
+    """
+    trades = sorted(trade_events, key=lambda event: event[0])
+    trade_times = np.array([event[0] for event in trades], np.int64)
+    trade_kinds = np.array([TRADE_KINDS.get(event[2], OTHER) for event in trades], np.int8)
+    done = 0
+    for timestamps, prices in chunks:
+        end = done + int(np.searchsorted(trade_times[done:], timestamps[-1], side="right"))
+        times, kinds = trade_times[done:end], trade_kinds[done:end]
+        positions = np.searchsorted(timestamps, times, side="right")
+        yield (np.insert(np.asarray(timestamps, np.int64), positions, times),
+               np.insert(np.zeros(len(timestamps), np.int8), positions, kinds),
+               np.insert(np.asarray(prices, np.float64), positions, np.nan))
+        done = end
+    if done < len(trade_times):
+        yield trade_times[done:], trade_kinds[done:], np.full(len(trade_times) - done, np.nan)
+
+
+def portfolio_state(investment):
+    """
+    The state array of the portfolio kernels: [shares, cash, debt, price,
+    last_timestamp, last_net_value, total_interest, total_fees, events].
+    """
+    return np.array([0.0, investment, 0.0, np.nan, np.nan, investment, 0.0, 0.0, 0.0], np.float64)
+
+
+@njit(cache=True)
+def final_portfolio(times, kinds, prices, state, margin, annual_interest_rate,
+                    trade_fee_percentage, slippage_percent, lot_step):
+    """
+    compute_final_portfolio.process_events() over one chunk of events: fees
+    are paid from cash (or added to the debt). Returns the net value after
+    each event; on a trade before the first price, returns the index of that
+    event as the second value (else -1).
+    """
+    shares, cash, debt, current_price, last_timestamp = state[0], state[1], state[2], state[3], state[4]
+    last_net_value, total_interest, total_fees = state[5], state[6], state[7]
+    per_second_rate = (1 + annual_interest_rate) ** (1 / (365 * 24 * 3600)) - 1
+    values = np.empty(len(times), np.float64)
+    for i in range(len(times)):
+        timestamp = times[i]
+        if last_timestamp == last_timestamp and debt > 0:
+            interest = debt * ((1 + per_second_rate) ** float(timestamp - last_timestamp) - 1)
+            if cash >= interest:
+                cash -= interest
+            else:
+                debt += interest - cash
+                cash = 0.0
+            total_interest += interest
+
+        kind = kinds[i]
+        if kind == 0:
+            current_price = prices[i]
+            last_net_value = shares * current_price + cash - debt
+        else:
+            if current_price != current_price:
+                return values[:i], i
+            if kind == 1:
+                buy_price = current_price * (1 + slippage_percent)
+                max_funds = cash * (1 + margin)
+                fee = max_funds * trade_fee_percentage
+                total_fees += fee
+                if cash >= fee:
+                    cash -= fee
+                else:
+                    debt += fee - cash
+                    cash = 0.0
+                funds = max_funds - fee
+                borrowed = funds - cash
+                if borrowed < 0:
+                    borrowed = 0.0
+                debt += borrowed
+                bought = 0.0
+                if buy_price > 0:
+                    bought = funds / buy_price
+                    if lot_step != 0:
+                        bought = math.floor(bought / lot_step) * lot_step
+                shares += bought
+                cash = funds - bought * buy_price if lot_step != 0 else 0.0
+            elif kind == 2:
+                proceeds = shares * (current_price * (1 - slippage_percent))
+                fee = proceeds * trade_fee_percentage
+                total_fees += fee
+                shares = 0.0
+                if proceeds >= fee:
+                    net_after_fee = proceeds - fee
+                else:
+                    net_after_fee = 0.0
+                    debt += fee - proceeds
+                if net_after_fee >= debt:
+                    cash += net_after_fee - debt
+                    debt = 0.0
+                else:
+                    debt -= net_after_fee
+                    cash += 0.0
+            last_net_value = shares * current_price + cash - debt
+        values[i] = last_net_value
+        last_timestamp = timestamp
+    state[0], state[1], state[2], state[3], state[4] = shares, cash, debt, current_price, last_timestamp
+    state[5], state[6], state[7] = last_net_value, total_interest, total_fees
+    state[8] += len(times)
+    return values, -1
+
+
+@njit(cache=True)
+def bnb_portfolio(times, kinds, prices, state, margin, annual_interest_rate,
+                  trade_fee_percentage, lot_step):
+    """
+    compute_final_portfolio_using_bnb.process_events() over one chunk of
+    events: fees are counted but paid in BNB, interest is added to the debt.
+    Same returns as final_portfolio().
+    """
+    shares, cash, debt, closing_price, last_timestamp = state[0], state[1], state[2], state[3], state[4]
+    last_net_value, total_interest, total_fees = state[5], state[6], state[7]
+    per_second_rate = (1 + annual_interest_rate) ** (1 / (365 * 24 * 3600)) - 1
+    values = np.empty(len(times), np.float64)
+    for i in range(len(times)):
+        timestamp = times[i]
+        if last_timestamp == last_timestamp:
+            interest = 0.0
+            if debt > 0:
+                interest = debt * ((1 + per_second_rate) ** float(timestamp - last_timestamp) - 1)
+            debt += interest
+            total_interest += interest
+
+        kind = kinds[i]
+        if kind == 0:
+            closing_price = prices[i]
+            last_net_value = shares * closing_price + cash - debt
+        else:
+            if closing_price != closing_price:
+                return values[:i], i
+            if kind == 1:
+                total_funds = cash + cash * margin
+                total_fees += total_funds * trade_fee_percentage
+                bought = total_funds / closing_price
+                if lot_step != 0:
+                    bought = math.floor(bought / lot_step) * lot_step
+                shares += bought
+                debt += total_funds - cash
+                cash = total_funds - bought * closing_price if lot_step != 0 else 0.0
+            elif kind == 2:
+                proceeds = shares * closing_price
+                total_fees += proceeds * trade_fee_percentage
+                shares = 0.0
+                if proceeds >= debt:
+                    cash += proceeds - debt
+                    debt = 0.0
+                else:
+                    debt -= proceeds
+                    cash = 0.0
+            last_net_value = shares * closing_price + cash - debt
+        values[i] = last_net_value
+        last_timestamp = timestamp
+    state[0], state[1], state[2], state[3], state[4] = shares, cash, debt, closing_price, last_timestamp
+    state[5], state[6], state[7] = last_net_value, total_interest, total_fees
+    state[8] += len(times)
+    return values, -1
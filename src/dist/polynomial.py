@@ -10,6 +10,9 @@ bands, and logs trades to trades.txt (based on a very basic signal approach).
 import numpy as np
 import pandas as pd
 
+import kernels
+from indicator_cache import IndicatorCache, poly_band_kernel, super_smoother_kernel
+
 # =============================================================================
 # 1. Super Smoother Filter (2-Pole) - same logic as the Pine Script SSF() function
 # =============================================================================
@@ -35,7 +38,9 @@ def super_smoother_filter(series: np.ndarray, period: int) -> np.ndarray:
     c3 = -(a**2)
     c1 = 1 - c2 - c3
     
-    # Apply filter
+    # Apply filter (compiled when numba is available, see kernels.py)
+    if kernels.JIT and result.dtype == np.float64:
+        return kernels.super_smoother(series, 0, np.nan, np.nan, c1, c2, c3)
     result[0] = series[0]
     result[1] = series[1]
     for i in range(2, len(series)):
@@ -96,91 +101,69 @@ def main(
     # Convert "time" to a numeric index or keep as is
     # We'll use a numeric "bar index" approach for x-values
     df["bar_index"] = np.arange(len(df))
-    
+    times = df["time"].to_numpy(dtype=np.int64)
+    closes = df["close"].to_numpy(dtype=np.float64)
+
+    # The filter and the bands come from the indicator cache (runtime/indicator_cache):
+    # re-running with the same data and parameters, or with bars appended, only
+    # computes what is new
+    cache = IndicatorCache()
+
     # Optionally apply smoothing filter to the close
     if smooth:
-        df["filtered_close"] = super_smoother_filter(df["close"].values, smooth_period)
+        df["filtered_close"] = cache.get("super_smoother", {"period": smooth_period}, times, closes,
+                                         super_smoother_kernel(smooth_period))
         y_source = df["filtered_close"]
+        source_name = f"super_smoother-{smooth_period}"
     else:
         y_source = df["close"]
-    
-    # Prepare a place to store the results: polynomial LSMA, upper band, lower band
-    df["poly_lsma"] = np.nan
-    df["poly_upper"] = np.nan
-    df["poly_lower"] = np.nan
-    
+        source_name = "close"
+
+    # Rolling polynomial calculation
+    # For each bar i, we look back 'period' bars (shifted by 'forecast_bars_ago')
+    # to compute the polynomial regression, evaluated at the bar index minus 'offset',
+    # plus the stdev bands. Nothing before the first full window.
+    band_params = {"source": source_name, "period": period, "order": order,
+                   "stdev_mult": stdev_mult, "offset": offset, "bars_ago": forecast_bars_ago}
+    bands = cache.get("poly_band", band_params, times, y_source.to_numpy(dtype=np.float64),
+                      poly_band_kernel(period, order, stdev_mult, offset, forecast_bars_ago), columns=3)
+    df["poly_lsma"] = bands[:, 0]
+    df["poly_upper"] = bands[:, 1]
+    df["poly_lower"] = bands[:, 2]
+
     # We'll store a trading "signal" state
     # For example: 1 = long, 0 = flat. (Simple demonstration.)
-    df["signal"] = 0
-    
-    # Rolling polynomial calculation
-    # We replicate the idea: for each bar i, we look back 'period' bars 
-    # to compute polynomial regression. 
-    # Then we shift by 'offset' or 'forecast_bars_ago' if desired.
-    # Because polynomial fitting can be expensive, we'll do it only 
-    # from i = period-1 to the end. 
-    
-    close_array = y_source.values
-    bar_idx_array = df["bar_index"].values
-    
+    signals = np.zeros(len(df), dtype=np.int64)
+
     # We'll store trades in a list, then write to trades.txt
     trades = []
     position = 0  # 1 if long, 0 if flat, -1 if short (if you want short logic)
-    
-    for i in range(period - 1, len(df)):
-        # Example approach: take a slice of length 'period'
-        window_slice = slice(i - period + 1 - forecast_bars_ago, i + 1 - forecast_bars_ago)
-        y_window = close_array[window_slice]
-        x_window = bar_idx_array[window_slice]
-        
-        # For numerical stability, you might want to use a simpler x range like 1..period
-        # But for clarity, we’ll just use the bar indices directly here.
-        # If forecast_bars_ago > 0, effectively you're using older data to get the polynomial.
-        
-        # Fit the polynomial if we have a valid slice
-        if len(y_window) == period:
-            poly_func = polynomial_regression(x_window, y_window, order)
-            
-            # Evaluate the polynomial on the *current* bar index + offset
-            # The user’s script does something like: poly(x - offset).
-            # We can replicate that logic or keep it simple.
-            # We'll define "eval_index" as the current bar minus offset, if you like.
-            
-            eval_index = df["bar_index"][i] - offset
-            poly_value = poly_func(eval_index)
-            
-            # Calculate stdev of y_window
-            # We'll measure stdev of the last 'period' real points from the window:
-            stdev_window = np.std(y_window, ddof=1)  # sample stdev
-            upper_band = poly_value + stdev_mult * stdev_window
-            lower_band = poly_value - stdev_mult * stdev_window
-            
-            df.loc[i, "poly_lsma"] = poly_value
-            df.loc[i, "poly_upper"] = upper_band
-            df.loc[i, "poly_lower"] = lower_band
-            
-            # --------------------------------------------------------------------
-            # Example naive trade logic:
-            # If close > poly_value => go long
-            # If close < poly_value => flat
-            # This is very basic — adapt to your needs.
-            # --------------------------------------------------------------------
-            curr_close = df["close"][i]
-            
-            if position == 0:
-                if curr_close > poly_value:
-                    # Enter long
-                    position = 1
-                    trades.append((df["time"][i], "BUY", curr_close))
-            elif position == 1:
-                if curr_close < poly_value:
-                    # Exit
-                    position = 0
-                    trades.append((df["time"][i], "SELL", curr_close))
-            # If you wanted short logic, you'd handle position == -1 etc.
-            
-            df.loc[i, "signal"] = position
-    
+
+    for i, (t, curr_close, poly_value) in enumerate(zip(times.tolist(), closes.tolist(), bands[:, 0].tolist())):
+        if np.isnan(poly_value):
+            continue
+
+        # --------------------------------------------------------------------
+        # Example naive trade logic:
+        # If close > poly_value => go long
+        # If close < poly_value => flat
+        # This is very basic — adapt to your needs.
+        # --------------------------------------------------------------------
+        if position == 0:
+            if curr_close > poly_value:
+                # Enter long
+                position = 1
+                trades.append((t, "BUY", curr_close))
+        elif position == 1:
+            if curr_close < poly_value:
+                # Exit
+                position = 0
+                trades.append((t, "SELL", curr_close))
+        # If you wanted short logic, you'd handle position == -1 etc.
+
+        signals[i] = position
+    df["signal"] = signals
+
     # End main loop
     
     # =============================================================================
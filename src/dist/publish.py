@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Publish ../view to the directory Caddy serves.
+
+Replaces `sudo cp -r ../view/* /usr/share/caddy`. Only files whose content
+changed since the last publish are written, and every write is a temp file
+renamed into place, so the dashboard never reads a half-copied file.
+
+Two layouts:
+
+    copy (default)   files are replaced one by one in --dest
+    --versioned      every publish is a new --dest/releases/<id>/ directory;
+                     unchanged files are hardlinks into the previous release,
+                     and --dest/current is flipped to it with one symlink
+                     rename. Point Caddy's root at --dest/current.
+
+While the series API (series_server.py) answers, the files it serves from the
+bundle are not published. output/live/ (series_log.py) is never published,
+series_server.py serves its tail.
+
+Every publish that changes something also writes output/manifest.json with
+the content hash and size of each output, last (or inside the release before
+the flip), so it never lists a file that is not there yet:
+
+    {"generation": <µs>, "files": {"trades.txt": {"hash": "...", "size": 123}, ...}}
+
+The dashboard fetches that manifest and requests outputs as <file>?v=<hash>,
+URLs Caddy marks immutable; pyramid tiles are left out, pyramid/manifest.json
+already versions them by CRC.
+
+runtime/publish_state.json keeps (size, mtime, hash) of every published file:
+a file whose size and mtime did not move is not even read.
+
+Run it as root (recompute.py calls it through sudo):
+    sudo python3 ./publish.py [--dest /usr/share/caddy] [--versioned]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import urllib.request
+
+SOURCE_DIR = "../view"
+DEFAULT_DEST = "/usr/share/caddy"
+STATE_FILE = "runtime/publish_state.json"
+KEEP_RELEASES = 3   # older releases may still be in use by a download in flight
+MANIFEST_PATH = os.path.join("output", "manifest.json")
+PYRAMID_TILES = os.path.join("output", "pyramid", "L")
+LIVE_DIR = os.path.join("output", "live")
+HASH_LENGTH = 16
+
+SERIES_API = "http://127.0.0.1:8010/api/series"
+# Served by series_server.py from the bundle, no need to publish them for Caddy
+API_SERVED = ["series.bin", "asset.txt", "expma.txt", "expma_micro.txt", "ema_slopes.txt", "portfolio.txt",
+              "portfolio_bnb.txt", "untouched_portfolio.txt", "margin.txt"]
+
+
+def series_api_up():
+    try:
+        with urllib.request.urlopen(SERIES_API, timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state(dest, versioned):
+    try:
+        with open(STATE_FILE, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}}
+    if state.get("dest") != dest or state.get("versioned") != versioned:
+        return {"files": {}}  # published somewhere else, start over
+    return state
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def source_files(source_dir, skip_api_served):
+    """Paths (relative to source_dir) to publish."""
+    skip = set()
+    if skip_api_served:
+        skip = {os.path.join("output", name) for name in API_SERVED}
+        skip |= {f"{path}.br" for path in skip}
+    files = []
+    for root, dirs, names in os.walk(source_dir):
+        relative = os.path.relpath(root, source_dir)
+        dirs[:] = [d for d in dirs if os.path.join(relative, d) != LIVE_DIR]
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.relpath(os.path.join(root, name), source_dir)
+            if path not in skip:
+                files.append(path)
+    return sorted(files)
+
+
+def scan(source_dir, files, previous):
+    """Return ({path: entry}, [changed paths]) against the previously published entries."""
+    entries = {}
+    changed = []
+    for path in files:
+        stat = os.stat(os.path.join(source_dir, path))
+        entry = previous.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            entries[path] = entry
+            continue
+        digest = file_hash(os.path.join(source_dir, path))
+        entries[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+        if not entry or entry["hash"] != digest:
+            changed.append(path)
+    return entries, changed
+
+
+def build_manifest(entries):
+    """Content hash and size of every output the dashboard fetches by name."""
+    files = {}
+    for path, entry in entries.items():
+        if path.startswith(PYRAMID_TILES) or path.endswith(".br"):
+            continue
+        name = os.path.relpath(path, "output")
+        if not name.startswith(".."):
+            files[name.replace(os.sep, "/")] = {"hash": entry["hash"][:HASH_LENGTH], "size": entry["size"]}
+    return {"generation": time.time_ns() // 1000, "files": files}
+
+
+def write_manifest(root, manifest):
+    target = os.path.join(root, MANIFEST_PATH)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, target)
+
+
+def copy_atomic(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, target)
+
+
+def publish_copy(source_dir, dest, entries, changed, previous):
+    """Replace changed files in place and remove the ones no longer published."""
+    for path in entries:
+        target = os.path.join(dest, path)
+        if path in changed or not os.path.exists(target):
+            copy_atomic(os.path.join(source_dir, path), target)
+    for path in set(previous) - set(entries):
+        try:
+            os.remove(os.path.join(dest, path))
+        except FileNotFoundError:
+            pass
+
+
+def publish_versioned(source_dir, dest, entries, changed, previous_release, manifest):
+    """Build a new release (hardlinking unchanged files) and flip dest/current to it."""
+    releases_dir = os.path.join(dest, "releases")
+    release = os.path.join(releases_dir, str(time.time_ns()))
+    for path in entries:
+        target = os.path.join(release, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        old = os.path.join(previous_release, path) if previous_release else None
+        if path not in changed and old and os.path.exists(old):
+            os.link(old, target)
+        else:
+            shutil.copyfile(os.path.join(source_dir, path), target)
+            os.chmod(target, 0o644)
+    write_manifest(release, manifest)
+
+    # One rename swaps the whole tree
+    link_tmp = os.path.join(dest, "current.tmp")
+    if os.path.lexists(link_tmp):
+        os.remove(link_tmp)
+    os.symlink(os.path.relpath(release, dest), link_tmp)
+    os.replace(link_tmp, os.path.join(dest, "current"))
+
+    releases = sorted((name for name in os.listdir(releases_dir) if name.isdigit()), key=int)
+    for old_release in releases[:-KEEP_RELEASES]:
+        shutil.rmtree(os.path.join(releases_dir, old_release), ignore_errors=True)
+    return release
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the dashboard to the Caddy root.")
+    parser.add_argument("--dest", default=DEFAULT_DEST)
+    parser.add_argument("--versioned", action="store_true",
+                        help="publish to dest/releases/<id> and flip the dest/current symlink")
+    args = parser.parse_args()
+
+    start = time.time()
+    state = load_state(args.dest, args.versioned)
+    previous = state["files"]
+    api_up = series_api_up()
+    files = source_files(SOURCE_DIR, skip_api_served=api_up)
+    entries, changed = scan(SOURCE_DIR, files, previous)
+    changed = set(changed)
+    removed = set(previous) - set(entries)
+
+    if args.versioned:
+        release = state.get("release")
+        if changed or removed or not release or not os.path.isdir(release):
+            release = publish_versioned(SOURCE_DIR, args.dest, entries, changed, release, build_manifest(entries))
+        state["release"] = release
+    else:
+        publish_copy(SOURCE_DIR, args.dest, entries, changed, previous)
+        # Unchanged outputs keep the same manifest (and its ETag)
+        if changed or removed or not os.path.exists(os.path.join(args.dest, MANIFEST_PATH)):
+            write_manifest(args.dest, build_manifest(entries))
+
+    state.update(dest=args.dest, versioned=args.versioned, files=entries)
+    save_state(state)
+    print(
+        f"Published {len(changed)} changed of {len(entries)} files, {len(removed)} removed"
+        f"{' (series served by the API)' if api_up else ''} in {time.time() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Push the results of a recompute cycle to the dashboards (exchange.push_hub).
+
+Sends the current equity, the last portfolio point and the last trade decision
+as 'equity' and 'signal' events. A signal is only pushed when it is newer than
+the one pushed by the previous cycle (runtime/push_state.json). Nothing happens
+when the push hub is not running.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "python"))
+from exchange.push_hub import push
+
+OUTPUT_DIR = "../view/output"
+STATE_FILE = "runtime/push_state.json"
+
+
+def last_row(path, max_line=4096):
+    """Last non-empty CSV row of path, split on commas, or None."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - max_line, 0))
+            lines = f.read().decode(errors="replace").strip().splitlines()
+    except OSError:
+        return None
+    return lines[-1].split(",") if lines else None
+
+
+def read_text(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def main():
+    state = load_state()
+
+    equity = read_text(os.path.join(OUTPUT_DIR, "equity.txt"))
+    portfolio = last_row(os.path.join(OUTPUT_DIR, "portfolio.txt"))
+    update = {"equity": equity}
+    if portfolio and len(portfolio) >= 2:
+        update["t"] = int(float(portfolio[0]))
+        update["portfolio"] = float(portfolio[1])
+    push("equity", update)
+
+    trade = last_row(os.path.join(OUTPUT_DIR, "trades.txt"))
+    if trade and len(trade) >= 3:
+        signal = {"t": int(float(trade[0])), "action": trade[1], "reason": trade[2]}
+        if signal != state.get("signal"):
+            push("signal", signal)
+            state["signal"] = signal
+            save_state(state)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,51 @@
 #!/usr/bin/env python3
 
-import time
-import subprocess
-import os
+import json5
 
-# Start the timer
-start_time = time.time()
+from stage_metrics import CycleMetrics
+from stage_profile import ProfileHooks
 
-command = ["sudo", "cp", "-r", "../view/*", "/usr/share/caddy"]
+ASSET_FILE = "../view/output/asset.txt"
+TRADES_FILE = "../view/output/trades.txt"
+with open("apikey-crypto.json", "r") as f:
+    config = json5.load(f)
+input_file = config.get("input_file")
 
+# Every stage is timed and measured (stage_metrics.py): one record per cycle in
+# runtime/stage_metrics.jsonl, the latest in ../view/output/cycle_metrics.json.
+# "profile_stages" in the config runs the listed ones under the profilers (stage_profile.py)
+metrics = CycleMetrics(profiler=ProfileHooks.from_config(config))
 
 # Remove all .txt files
 # os.system("rm ../view/output/*.txt")
 # dont do this because you need the last_timestamp.txt
 
 # Execute the commands
-os.system("python3 ./equity.py")
-os.system("python3 ./pairname.py")
-os.system("python3 ./compute_asset.py")
-os.system("python3 ./compute_ema.py")
-#os.system("python3 ./compute_sma.py")
-#os.system("python3 ./slopedirection.py")
-os.system("python3 ./compute_ema_micro.py")
-os.system("python3 ./compute_trades_trailsl_localmin.py")
-# os.system("python3 ./compute_trades_ema_algo_minloss.py")
-# os.system("python3 ./compute_margin_requirement.py")
-#os.system("python3 ./tradedirectionfilter.py") #filters non-steep
-os.system("python3 ./compute_unt_portfolio.py")
-os.system("python3 ./compute_final_portfolio_using_bnb.py")
-os.system("python3 ./compute_final_portfolio.py")
-os.system("bash ./compress_all.sh")
-
-# Execute the command
-try:
-    subprocess.run("sudo cp -r ../view/* /usr/share/caddy", shell=True, check=True)
-    print("Files copied successfully!")
-except subprocess.CalledProcessError as e:
-    print(f"Error occurred: {e}")
+metrics.run(["python3", "./equity.py"])
+metrics.run(["python3", "./pairname.py"])
+metrics.run(["python3", "./compute_asset.py"], inputs=[input_file] if input_file else [])
+metrics.run(["python3", "./compute_ema.py"], inputs=[ASSET_FILE])
+#metrics.run(["python3", "./compute_sma.py"], inputs=[ASSET_FILE])
+#metrics.run(["python3", "./slopedirection.py"])
+metrics.run(["python3", "./compute_ema_micro.py"], inputs=[ASSET_FILE])
+metrics.run(["python3", "./compute_strategies.py"], inputs=[ASSET_FILE])  # "strategies" in the config, the first one writes trades.txt
+# metrics.run(["python3", "./compute_margin_requirement.py"], inputs=[ASSET_FILE, TRADES_FILE])
+#metrics.run(["python3", "./tradedirectionfilter.py"]) #filters non-steep
+metrics.run(["python3", "./compute_unt_portfolio.py"], inputs=[ASSET_FILE])
+metrics.run(["python3", "./compute_final_portfolio_using_bnb.py"], inputs=[ASSET_FILE, TRADES_FILE])
+metrics.run(["python3", "./compute_final_portfolio.py"], inputs=[ASSET_FILE, TRADES_FILE])
+metrics.run(["python3", "./series_bundle.py"])
+metrics.run(["python3", "./series_log.py"])
+metrics.run(["python3", "./compute_pyramid.py"], inputs=[ASSET_FILE])
+metrics.run(["python3", "./compress_all.py"])
+
+# Publish the changed files to the Caddy root (replaces the sudo cp -r of ../view/*)
+metrics.run(["sudo", "python3", "./publish.py"])
+
+# Live equity and signals for the open dashboards (push hub)
+metrics.run(["python3", "./push_updates.py"])
 #os.system("beep")
 
-# Stop the timer
-end_time = time.time()
-
-# Calculate elapsed time
-elapsed_time = end_time - start_time
-print(f"Time taken for execution: {elapsed_time:.2f} seconds")
+# Record the cycle; prints the total time and the slowest stage
+record = metrics.finish()
+print(f"Time taken for execution: {record['seconds']:.2f} seconds")
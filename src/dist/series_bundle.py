@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Pack the dashboard series into one binary bundle.
+
+The CSV outputs stay the interchange format between the dist stages. This
+stage runs after them and writes what the browser downloads:
+
+    ../view/output/series.bin   raw little-endian columns, back to back
+    ../view/output/series.json  header: column names, dtypes, byte offsets
+
+Layout of series.bin:
+    time      int32   seconds since header["t0"], the union of all series timestamps
+    <series>  float32 one column per series, aligned to time, NaN where the
+                      series has no point (portfolios keep the last value per timestamp)
+    trades    int32 offsets + uint8 action + uint16 index into header["trades"]["reasons"]
+
+Every column starts on a 4-byte boundary so the browser can map it with
+new Float32Array(buffer, offset, length) without copying.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from series_io import attach_shared
+
+OUTPUT_DIR = "../view/output"
+BUNDLE_FILE = os.path.join(OUTPUT_DIR, "series.bin")
+HEADER_FILE = os.path.join(OUTPUT_DIR, "series.json")
+FORMAT_VERSION = 1
+
+# column name -> CSV written by the stages (missing files are skipped)
+SERIES_FILES = {
+    "asset": "asset.txt",
+    "expma": "expma.txt",
+    "expma_micro": "expma_micro.txt",
+    "ema_slopes": "ema_slopes.txt",
+    "portfolio": "portfolio.txt",
+    "portfolio_bnb": "portfolio_bnb.txt",
+    "untouched_portfolio": "untouched_portfolio.txt",
+    "margin": "margin.txt",
+}
+TRADE_ACTIONS = ["buy", "sell"]
+
+
+def load_series(file_path):
+    """Return (timestamps int64, values float64) of a two-column CSV, last value per timestamp."""
+    shared = attach_shared(file_path)
+    if shared is not None:
+        # asset.txt: the arrays compute_asset.py published, no parse
+        frame = pd.DataFrame({"t": shared[0], "v": shared[1]})
+    else:
+        frame = pd.read_csv(file_path, header=None, usecols=[0, 1], names=["t", "v"])
+    frame = frame.dropna()
+    frame = frame.drop_duplicates(subset="t", keep="last").sort_values("t")
+    return frame["t"].to_numpy(dtype=np.int64), frame["v"].to_numpy(dtype=np.float64)
+
+
+def load_trades(file_path):
+    """Return (timestamps, action codes, reason codes, reason table) from trades.txt."""
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        return np.empty(0, np.int64), np.empty(0, np.uint8), np.empty(0, np.uint16), []
+    frame = pd.read_csv(file_path, header=None, usecols=[0, 1, 2], names=["t", "action", "reason"])
+    frame = frame[frame["action"].isin(TRADE_ACTIONS)]
+    actions = frame["action"].map(TRADE_ACTIONS.index).to_numpy(dtype=np.uint8)
+    reason_codes, reasons = pd.factorize(frame["reason"].astype(str))
+    return (
+        frame["t"].to_numpy(dtype=np.int64),
+        actions,
+        reason_codes.astype(np.uint16),
+        [str(r) for r in reasons],
+    )
+
+
+def align(time_axis, timestamps, values):
+    """Place values on time_axis, NaN where the series has no point."""
+    column = np.full(len(time_axis), np.nan, dtype=np.float32)
+    column[np.searchsorted(time_axis, timestamps)] = values
+    return column
+
+
+def write_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_bundle(output_dir=OUTPUT_DIR):
+    """
+    Map series.bin read-only. Returns (header, {column name: array}) with the
+    arrays backed by the file, or (None, {}) when the bundle is missing or
+    does not match its header.
+    """
+    header_file = os.path.join(output_dir, "series.json")
+    bundle_file = os.path.join(output_dir, "series.bin")
+    try:
+        with open(header_file, "r") as f:
+            header = json.load(f)
+        if os.path.getsize(bundle_file) != header["byte_length"]:
+            return None, {}
+    except (OSError, ValueError, KeyError):
+        return None, {}
+    if header["byte_length"] == 0:
+        return header, {}
+
+    raw = np.memmap(bundle_file, dtype=np.uint8, mode="r")
+    columns = {
+        name: np.frombuffer(raw, dtype=np.dtype(column["dtype"]).newbyteorder("<"),
+                            count=column["length"], offset=column["offset"])
+        for name, column in header["columns"].items()
+    }
+    return header, columns
+
+
+def bundle_timestamps(header, columns):
+    """Absolute unix timestamps (int64) of the bundle's shared time axis."""
+    return columns["time"].astype(np.int64) + header["t0"]
+
+
+def build_bundle(output_dir=OUTPUT_DIR):
+    """Read the stage outputs and return (header dict, bundle bytes)."""
+    series = {}
+    for name, file_name in SERIES_FILES.items():
+        file_path = os.path.join(output_dir, file_name)
+        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            series[name] = load_series(file_path)
+
+    trade_ts, trade_actions, trade_reasons, reason_table = load_trades(os.path.join(output_dir, "trades.txt"))
+
+    if series:
+        time_axis = np.unique(np.concatenate([ts for ts, _ in series.values()]))
+    else:
+        time_axis = np.empty(0, np.int64)
+    t0 = int(time_axis[0]) if len(time_axis) else 0
+
+    chunks = []
+    columns = {}
+    offset = 0
+
+    def add(name, array):
+        nonlocal offset
+        data = array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes()
+        columns[name] = {"dtype": array.dtype.name, "offset": offset, "length": len(array)}
+        padding = -len(data) % 4
+        chunks.append(data + b"\0" * padding)
+        offset += len(data) + padding
+
+    add("time", (time_axis - t0).astype(np.int32))
+    for name, (timestamps, values) in series.items():
+        add(name, align(time_axis, timestamps, values))
+    add("trades_time", (trade_ts - t0).astype(np.int32))
+    add("trades_action", trade_actions)
+    add("trades_reason", trade_reasons)
+
+    header = {
+        "version": FORMAT_VERSION,
+        "generation": time.time_ns() // 1000,  # µs, stays exact as a JS number
+        "t0": t0,
+        "length": len(time_axis),
+        "byte_length": offset,
+        "series": list(series),
+        "columns": columns,
+        "trades": {"actions": TRADE_ACTIONS, "reasons": reason_table},
+    }
+    return header, b"".join(chunks)
+
+
+def main():
+    start = time.time()
+    header, bundle = build_bundle()
+    # Bundle first, header last: a reader that sees the new header finds the new bundle
+    write_atomic(BUNDLE_FILE, bundle)
+    write_atomic(HEADER_FILE, json.dumps(header, separators=(",", ":")).encode())
+    print(
+        f"Series bundle: {header['length']} timestamps, {len(header['series'])} series, "
+        f"{len(bundle) / 1e6:.1f} MB in {time.time() - start:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
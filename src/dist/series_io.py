@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Streaming readers and writers for the "timestamp,value" files of the compute
+pipeline.
+
+With 1s bars a year of asset.txt is tens of millions of rows, so the compute
+stages never load a whole file. Files are parsed into fixed-size numpy chunks
+of `chunk_rows` rows (config, default CHUNK_ROWS); the stages are chained as
+generators over those chunks (or over the rows of each chunk, where the logic
+is sequential), and price, indicator and trade streams are combined with
+linear merges instead of dicts or a global sort. Peak memory depends on the
+chunk size, not on the length of the history. The files are expected in time
+order, which is how compute_asset.py writes them.
+
+compute_asset.py also publishes the filtered timestamp and close columns as
+raw arrays (SharedSeriesWriter): runtime/asset_shared.time.bin (int64),
+runtime/asset_shared.close.bin (float64) and the descriptor
+runtime/asset_shared.json, written last. array_chunks() on asset.txt maps
+those files instead of parsing the text, so the stages after it share one
+parse and one copy in the page cache. A plain file rather than a
+multiprocessing.shared_memory block: each stage is its own process and the
+block would be unlinked when compute_asset.py exits. The descriptor holds the
+size and mtime of asset.txt; when they no longer match, the stages parse the
+text as before.
+
+Parameters that were written for minute bars are converted with the bar
+length from `interval_seconds` (config), or from the spacing of the first
+rows when the key is missing.
+"""
+
+import heapq
+import json
+import os
+from array import array
+from itertools import islice
+
+from tqdm import tqdm
+
+DEFAULT_INTERVAL = 60       # seconds, the minute bars of keep-fetching.py
+CHUNK_ROWS = 500_000        # rows per pandas chunk
+PROGRESS_EVERY = 1 << 16    # lines between progress bar updates
+WRITE_ROWS = 1 << 16        # rows formatted per write
+SHARED_PREFIX = "runtime/asset_shared"
+
+
+def chunk_rows(config):
+    return max(1000, int(config.get("chunk_rows", CHUNK_ROWS)))
+
+
+def bar_interval(config, path=None, sample=200, sep=","):
+    """Bar length in seconds: the config's interval_seconds, else inferred from path."""
+    if config.get("interval_seconds"):
+        return float(config["interval_seconds"])
+    if path is None or not os.path.exists(path):
+        return DEFAULT_INTERVAL
+    with open(path, "r") as f:
+        times = []
+        for line in islice(f, sample):
+            try:
+                times.append(float(line.split(sep, 1)[0]))
+            except ValueError:
+                continue
+    steps = sorted(b - a for a, b in zip(times, times[1:]) if b > a)
+    # The median step ignores the odd gap in the data
+    return steps[len(steps) // 2] if steps else DEFAULT_INTERVAL
+
+
+def minute_bars(value, interval):
+    """Convert a length given in minute bars to bars of `interval` seconds."""
+    return value * DEFAULT_INTERVAL / interval
+
+
+def iter_lines(path, desc=None):
+    """Yield the lines of path, with a progress bar over the file size."""
+    with open(path, "r") as f, tqdm(total=os.path.getsize(path), desc=desc, unit="B",
+                                    unit_scale=True, disable=desc is None) as pbar:
+        done = 0
+        for count, line in enumerate(f, 1):
+            done += len(line)
+            if count % PROGRESS_EVERY == 0:
+                pbar.update(done)
+                done = 0
+            yield line
+        pbar.update(done)
+
+
+class SharedSeriesWriter:
+    """Writes the (timestamp, close) rows of asset.txt as raw columns for attach_shared()."""
+
+    def __init__(self, prefix=SHARED_PREFIX):
+        self.prefix = prefix
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        # The old arrays stop being valid as soon as asset.txt is rewritten
+        if os.path.exists(f"{prefix}.json"):
+            os.remove(f"{prefix}.json")
+        self.files = [open(f"{prefix}.{name}.bin.tmp", "wb") for name in ("time", "close")]
+        self.buffers = [array("q"), array("d")]
+        self.length = 0
+
+    def append(self, timestamp, close):
+        self.buffers[0].append(timestamp)
+        self.buffers[1].append(close)
+        self.length += 1
+        if len(self.buffers[0]) >= WRITE_ROWS:
+            self._flush()
+
+    def _flush(self):
+        for buffer, f in zip(self.buffers, self.files):
+            buffer.tofile(f)
+            del buffer[:]
+
+    def close(self, source):
+        """Publish the arrays as the binary copy of `source` (asset.txt, already closed)."""
+        self._flush()
+        for name, f in zip(("time", "close"), self.files):
+            f.close()
+            os.replace(f.name, f"{self.prefix}.{name}.bin")
+        stat = os.stat(source)
+        descriptor = {
+            "source": os.path.abspath(source),
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "length": self.length,
+            "columns": {"time": "<i8", "close": "<f8"},
+        }
+        tmp_path = f"{self.prefix}.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(descriptor, f)
+        os.replace(tmp_path, f"{self.prefix}.json")
+
+
+def attach_shared(path, prefix=SHARED_PREFIX):
+    """
+    (timestamps, closes) read-only memory maps of the arrays published for
+    `path`, or None when there are none or asset.txt changed since.
+    """
+    import numpy as np
+
+    try:
+        with open(f"{prefix}.json", "r") as f:
+            descriptor = json.load(f)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if (descriptor.get("source") != os.path.abspath(path)
+            or descriptor.get("source_size") != stat.st_size
+            or descriptor.get("source_mtime_ns") != stat.st_mtime_ns):
+        return None
+    length = descriptor["length"]
+    if length == 0:
+        return np.empty(0, np.int64), np.empty(0, np.float64)
+    return tuple(
+        np.memmap(f"{prefix}.{name}.bin", dtype=dtype, mode="r", shape=(length,))
+        for name, dtype in descriptor["columns"].items()
+    )
+
+
+def asset_arrays(path, rows=CHUNK_ROWS):
+    """
+    (timestamps, closes) of asset.txt as whole-file memory maps. When the
+    published arrays are missing or stale they are rebuilt from the text
+    first, one chunk at a time.
+    """
+    shared = attach_shared(path)
+    if shared is None:
+        writer = SharedSeriesWriter()
+        for timestamps, values in array_chunks(path, rows):
+            for timestamp, value in zip(timestamps.tolist(), values.tolist()):
+                writer.append(timestamp, value)
+        writer.close(path)
+        shared = attach_shared(path)
+    return shared
+
+
+def array_chunks(path, rows=CHUNK_ROWS, value_column=1):
+    """
+    Yield (timestamps int64, values float64) numpy arrays of at most `rows`
+    rows: the first column of the file and column `value_column`. For
+    asset.txt these are zero-copy slices of the published arrays when they
+    are current.
+    """
+    import pandas as pd
+
+    shared = attach_shared(path) if value_column == 1 else None
+    if shared is not None:
+        timestamps, values = shared
+        for start in range(0, len(timestamps), rows):
+            yield timestamps[start:start + rows], values[start:start + rows]
+        return
+
+    if os.path.getsize(path) == 0:
+        return
+    with pd.read_csv(path, header=None, usecols=[0, value_column], chunksize=rows,
+                     dtype={0: "int64", value_column: "float64"}) as reader:
+        for chunk in reader:
+            yield chunk[0].to_numpy(), chunk[value_column].to_numpy()
+
+
+def iter_rows(path, desc=None, rows=CHUNK_ROWS, value_column=1):
+    """Yield the (timestamp, value) rows of a file, parsed in numpy chunks."""
+    with tqdm(desc=desc, unit=" rows", unit_scale=True, disable=desc is None) as pbar:
+        for timestamps, values in array_chunks(path, rows, value_column):
+            yield from zip(timestamps.tolist(), values.tolist())
+            pbar.update(len(timestamps))
+
+
+def write_columns(out, row_format, *columns):
+    """
+    Append one chunk of rows to the open file out, one row_format.format()
+    per row over the numpy columns, e.g. "{},{:.2f}\n" for timestamp,value.
+    Joined in slices of WRITE_ROWS rows: about twice as fast as
+    DataFrame.to_csv, without holding the text of a whole chunk.
+    """
+    for start in range(0, len(columns[0]), WRITE_ROWS):
+        rows = (column[start:start + WRITE_ROWS].tolist() for column in columns)
+        out.write("".join(map(row_format.format, *rows)))
+
+
+def join_rows(rows, *others):
+    """
+    Inner join of time-ordered (timestamp, value) streams on the timestamp:
+    yields (timestamp, value, other_value, ...) for the timestamps present in
+    all of them, reading each stream once.
+    """
+    others = [iter(other) for other in others]
+    heads = [next(other, None) for other in others]
+    for timestamp, value in rows:
+        matched = [value]
+        for i, other in enumerate(others):
+            head = heads[i]
+            while head is not None and head[0] < timestamp:
+                head = next(other, None)
+            heads[i] = head
+            if head is None or head[0] != timestamp:
+                break
+            matched.append(head[1])
+        else:
+            yield (timestamp, *matched)
+
+
+def merged_events(asset_file, trade_events, rows=CHUNK_ROWS):
+    """
+    Merge the asset prices with the (small, in-memory) trade events in time
+    order, without loading the asset file: (timestamp, 'price', price) and
+    (timestamp, 'trade', action) tuples. A linear merge; at equal timestamps
+    the price comes first, like the stable sort of asset events + trade events.
+    """
+    prices = ((timestamp, 'price', price) for timestamp, price in iter_rows(asset_file, rows=rows))
+    yield from heapq.merge(prices, sorted(trade_events, key=lambda event: event[0]), key=lambda event: event[0])
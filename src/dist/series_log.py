@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Append-only copies of the per-minute series, for clients that follow the tail.
+
+The stages rewrite asset.txt, expma*.txt and portfolio*.txt completely every
+cycle, although only a few rows at the end are new. This stage keeps
+
+    ../view/output/live/<series>.csv   the same rows, only ever appended to
+    ../view/output/live/<series>.idx   uint64 little-endian byte offset of the
+                                       end of every row
+    ../view/output/live/index.json     {series: {rows, bytes, epoch, ...}}
+
+When a stage output still starts with the rows already in the log, only the new
+complete rows are appended. When history itself changed (different prefix) the
+log is rewritten and gets a new epoch, so followers know to start over.
+
+index.json is replaced last, after the appends: a reader that trusts its rows
+and bytes never reads a partial row. Followers ask for "rows after N":
+
+    series_server.py    GET /api/series/delta?series=asset&after=N&epoch=E
+    Python              read_rows_after("asset", N, epoch)
+
+live/ is neither brotli-compressed (compress_all.py) nor published to Caddy
+(publish.py): the logs grow every cycle and only their tail is ever needed.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from series_bundle import OUTPUT_DIR, write_atomic
+
+LIVE_DIR = os.path.join(OUTPUT_DIR, "live")
+INDEX_FILE = os.path.join(LIVE_DIR, "index.json")
+
+# series name -> stage output that gains one row per minute
+LIVE_SERIES = {
+    "asset": "asset.txt",
+    "expma": "expma.txt",
+    "expma_micro": "expma_micro.txt",
+    "portfolio": "portfolio.txt",
+    "portfolio_bnb": "portfolio_bnb.txt",
+    "untouched_portfolio": "untouched_portfolio.txt",
+}
+
+
+class EpochChanged(Exception):
+    """The log was rewritten since the follower's epoch; it has to start over from row 0."""
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def row_offsets(data, base=0):
+    """uint64 LE end offsets (plus base) of every row in data, which ends with a newline."""
+    ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord("\n")) + 1 + base
+    return ends.astype("<u8").tobytes(), len(ends)
+
+
+def load_index(live_dir=LIVE_DIR):
+    try:
+        with open(os.path.join(live_dir, "index.json"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_series(name, data, entry):
+    """Append the new rows of data to the log of name (or rewrite it). Returns the new entry."""
+    log_path = os.path.join(LIVE_DIR, f"{name}.csv")
+    idx_path = os.path.join(LIVE_DIR, f"{name}.idx")
+    data = data[:data.rfind(b"\n") + 1]  # complete rows only
+
+    appendable = (
+        entry is not None
+        and len(data) >= entry["bytes"]
+        and os.path.exists(log_path) and os.path.getsize(log_path) == entry["bytes"]
+        and os.path.exists(idx_path) and os.path.getsize(idx_path) == 8 * entry["rows"]
+        and content_hash(data[:entry["bytes"]]) == entry["hash"]
+    )
+    if appendable:
+        tail = data[entry["bytes"]:]
+        if not tail:
+            return dict(entry, appended_rows=0)
+        offsets, rows = row_offsets(tail, base=entry["bytes"])
+        with open(log_path, "ab") as f:
+            f.write(tail)
+        with open(idx_path, "ab") as f:
+            f.write(offsets)
+        return dict(entry, rows=entry["rows"] + rows, bytes=len(data), hash=content_hash(data),
+                    appended_rows=rows, updated_at=time.time())
+
+    offsets, rows = row_offsets(data)
+    write_atomic(log_path, data)
+    write_atomic(idx_path, offsets)
+    return {
+        "rows": rows,
+        "bytes": len(data),
+        "hash": content_hash(data),
+        "epoch": time.time_ns() // 1000,
+        "appended_rows": rows,
+        "updated_at": time.time(),
+    }
+
+
+def read_rows_after(name, after, epoch=None, live_dir=LIVE_DIR):
+    """
+    Return (entry, bytes of the rows after row `after`) from the log of name.
+    Raises KeyError for an unknown series and EpochChanged when epoch is
+    given and the log was rewritten since.
+    """
+    entry = load_index(live_dir)[name]
+    if epoch is not None and int(epoch) != entry["epoch"]:
+        raise EpochChanged(name)
+    after = max(0, min(int(after), entry["rows"]))
+    with open(os.path.join(live_dir, f"{name}.csv"), "rb") as log:
+        start = 0
+        if after:
+            with open(os.path.join(live_dir, f"{name}.idx"), "rb") as idx:
+                idx.seek(8 * (after - 1))
+                start = int.from_bytes(idx.read(8), "little")
+        log.seek(start)
+        data = log.read(entry["bytes"] - start)
+    # A rewrite between reading the index and the log would mix two epochs
+    if load_index(live_dir).get(name, {}).get("epoch") != entry["epoch"]:
+        raise EpochChanged(name)
+    return entry, data
+
+
+def main():
+    start = time.time()
+    os.makedirs(LIVE_DIR, exist_ok=True)
+    index = load_index()
+    new_index = {}
+    for name, file_name in LIVE_SERIES.items():
+        source_path = os.path.join(OUTPUT_DIR, file_name)
+        if not os.path.exists(source_path):
+            continue
+        with open(source_path, "rb") as f:
+            data = f.read()
+        new_index[name] = update_series(name, data, index.get(name))
+
+    write_atomic(INDEX_FILE, json.dumps(new_index, separators=(",", ":")).encode())
+    appended = sum(entry["appended_rows"] for entry in new_index.values())
+    print(f"Live series: {appended} rows appended to {len(new_index)} logs in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
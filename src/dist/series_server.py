@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Time-range query API over the series bundle.
+
+Serves slices of ../view/output/series.bin (see series_bundle.py) straight
+from a read-only memory map, so the dashboard asks for what it draws instead
+of downloading whole files:
+
+    GET /api/series
+        {generation, start, end, length, series}
+
+    GET /api/series?series=portfolio,asset&from=<unix s>&to=<unix s>&points=2000[&format=bin]
+        from/to default to the whole history, points=0 returns every point.
+        When the range holds more than `points` timestamps it is reduced to a
+        min/max envelope (two rows per epoch-aligned bucket, like the zoom
+        pyramid), so spikes survive the decimation. The first bucket is
+        stamped with its first sample, never before `from`.
+
+        format=json (default): {generation, kind, bucket_seconds, time: [unix s],
+                                series: {name: [value or null]}}
+        format=bin: int32 time relative to X-Series-T0, then one float32
+                    column per requested series (NaN = no point), little-endian;
+                    X-Series-Names / X-Series-Length / X-Series-Kind headers
+
+    GET /api/series/delta?series=asset&after=<rows>[&epoch=<epoch>]
+        The CSV rows of the append-only log (series_log.py) after the first
+        `after` rows, with X-Series-Rows / X-Series-Bytes / X-Series-Epoch
+        headers. 409 when `epoch` is given and the log was rewritten since:
+        the client starts over with after=0.
+
+Every answer carries an ETag built from the bundle generation and the query,
+so an unchanged chart costs a 304. A new bundle is picked up on the next
+request (series.json is replaced after series.bin); requests in flight keep
+reading the old file, which stays mapped until they finish.
+
+Usage (from src/dist, Caddy proxies /api/series* here):
+    python3 ./series_server.py --port 8010
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from compute_pyramid import envelope
+from series_bundle import HEADER_FILE, read_bundle
+from series_log import EpochChanged, read_rows_after
+
+API_PATH = "/api/series"
+DELTA_PATH = "/api/series/delta"
+DEFAULT_PORT = 8010
+MAX_POINTS = 20000      # cap for a decimated answer
+MAX_RAW_POINTS = 2000000  # cap for points=0 (full resolution) answers
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ------------------------------------------------------------------------------
+# BUNDLE
+# ------------------------------------------------------------------------------
+_lock = threading.Lock()
+_bundle = {"mtime": None, "header": None, "columns": {}}
+
+
+def current_bundle():
+    """Return (header, columns), remapping the bundle when series.json changed."""
+    try:
+        mtime = os.stat(HEADER_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    with _lock:
+        if mtime != _bundle["mtime"]:
+            header, columns = read_bundle()
+            _bundle.update(mtime=mtime, header=header, columns=columns)
+        return _bundle["header"], _bundle["columns"]
+
+
+# ------------------------------------------------------------------------------
+# QUERIES
+# ------------------------------------------------------------------------------
+def parse_query(query, header):
+    """Validate the query string. Returns (names, start, end, points, fmt)."""
+    params = parse_qs(query)
+
+    def single(key, default=None):
+        values = params.get(key)
+        return values[-1] if values else default
+
+    def integer(key, default):
+        try:
+            return int(single(key, default))
+        except (TypeError, ValueError):
+            raise QueryError(400, f"'{key}' must be an integer")
+
+    names = [name for value in params.get("series", []) for name in value.split(",") if name]
+    unknown = [name for name in names if name not in header["series"]]
+    if unknown:
+        raise QueryError(404, f"Unknown series: {', '.join(unknown)}")
+
+    start = integer("from", header["t0"])
+    end = integer("to", header["t0"] + 2**31 - 1)
+    if end < start:
+        raise QueryError(400, "'to' is before 'from'")
+    points = integer("points", 2000)
+    if points < 0 or points > MAX_POINTS:
+        raise QueryError(400, f"'points' must be between 0 and {MAX_POINTS}")
+    fmt = single("format", "json")
+    if fmt not in ("json", "bin"):
+        raise QueryError(400, "'format' must be json or bin")
+    return names, start, end, points, fmt
+
+
+def slice_series(header, columns, names, start, end, points):
+    """
+    Return (kind, bucket_seconds, timestamps int64, values float32[n, len(names)])
+    for [start, end], reduced to a min/max envelope above `points` rows.
+    """
+    time_axis = columns["time"]
+    t0 = header["t0"]
+    # Clamp to int32 so the search stays on the mapped int32 column
+    lo = np.searchsorted(time_axis, max(start - t0, -2**31), "left")
+    hi = np.searchsorted(time_axis, min(end - t0, 2**31 - 1), "right")
+    if points == 0 and hi - lo > MAX_RAW_POINTS:
+        raise QueryError(400, f"Range holds {hi - lo} points, use 'points' or a shorter range")
+
+    timestamps = time_axis[lo:hi].astype(np.int64) + t0
+    values = np.empty((hi - lo, len(names)), dtype=np.float32)
+    for i, name in enumerate(names):
+        values[:, i] = columns[name][lo:hi]
+
+    if points == 0 or hi - lo <= points:
+        return "full", None, timestamps, values
+
+    # Two rows (min, max) per bucket
+    span = int(timestamps[-1] - timestamps[0]) + 1
+    bucket_seconds = max(1, math.ceil(span / max(points // 2 - 1, 1)))
+    bucket_times, mins, maxs = envelope(timestamps, values, bucket_seconds)
+    # The first bucket starts on the epoch grid, possibly before `start` and the first
+    # sample; draw it at the first sample so no point falls outside the asked range
+    bucket_times[0] = max(bucket_times[0], timestamps[0])
+    envelope_values = np.empty((2 * len(bucket_times), len(names)), dtype=np.float32)
+    envelope_values[0::2] = mins
+    envelope_values[1::2] = maxs
+    return "envelope", bucket_seconds, np.repeat(bucket_times, 2), envelope_values
+
+
+def render_json(header, kind, bucket_seconds, timestamps, values, names):
+    series = {}
+    for i, name in enumerate(names):
+        column = values[:, i].astype(object)
+        column[np.isnan(values[:, i])] = None
+        series[name] = column.tolist()
+    return json.dumps({
+        "generation": header["generation"],
+        "kind": kind,
+        "bucket_seconds": bucket_seconds,
+        "time": timestamps.tolist(),
+        "series": series,
+    }, separators=(",", ":")).encode()
+
+
+def render_bin(timestamps, values):
+    t0 = int(timestamps[0]) if len(timestamps) else 0
+    parts = [(timestamps - t0).astype("<i4").tobytes()]
+    parts.extend(values[:, i].astype("<f4").tobytes() for i in range(values.shape[1]))
+    return t0, b"".join(parts)
+
+
+# ------------------------------------------------------------------------------
+# HTTP
+# ------------------------------------------------------------------------------
+class SeriesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type, etag=None, extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_body(status, json.dumps({"error": message}).encode(), "application/json")
+
+    def not_modified(self, etag):
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        return False
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def send_delta(self, query):
+        params = parse_qs(query)
+        name = params.get("series", [""])[-1]
+        try:
+            after = int(params.get("after", ["0"])[-1])
+            epoch = params.get("epoch", [None])[-1]
+            entry, data = read_rows_after(name, after, epoch)
+        except ValueError:
+            self.send_error_json(400, "'after' and 'epoch' must be integers")
+            return
+        except KeyError:
+            self.send_error_json(404, f"No live log for series '{name}'")
+            return
+        except EpochChanged:
+            self.send_error_json(409, f"The '{name}' log was rewritten, start again from after=0")
+            return
+
+        etag = f'"{entry["epoch"]:x}-{entry["rows"]:x}-{after:x}"'
+        if self.not_modified(etag):
+            return
+        self.send_body(200, data, "text/csv", etag, {
+            "X-Series-Rows": str(entry["rows"]),
+            "X-Series-Bytes": str(entry["bytes"]),
+            "X-Series-Epoch": str(entry["epoch"]),
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") == DELTA_PATH:
+            self.send_delta(url.query)
+            return
+        if url.path.rstrip("/") != API_PATH:
+            self.send_error_json(404, "Not found")
+            return
+
+        header, columns = current_bundle()
+        if header is None:
+            self.send_error_json(503, "Series bundle not available yet")
+            return
+
+        # The query is part of the tag: same bundle + same question = same answer
+        etag = f'"{header["generation"]:x}-{zlib.crc32(url.query.encode()):08x}"'
+        if self.not_modified(etag):
+            return
+
+        try:
+            names, start, end, points, fmt = parse_query(url.query, header)
+            if not names:
+                length = header["length"]
+                body = json.dumps({
+                    "generation": header["generation"],
+                    "start": header["t0"],
+                    "end": header["t0"] + int(columns["time"][-1]) if length else header["t0"],
+                    "length": length,
+                    "series": header["series"],
+                }).encode()
+                self.send_body(200, body, "application/json", etag)
+                return
+            kind, bucket_seconds, timestamps, values = slice_series(header, columns, names, start, end, points)
+        except QueryError as e:
+            self.send_error_json(e.status, str(e))
+            return
+
+        if fmt == "bin":
+            t0, body = render_bin(timestamps, values)
+            self.send_body(200, body, "application/octet-stream", etag, {
+                "X-Series-T0": str(t0),
+                "X-Series-Length": str(len(timestamps)),
+                "X-Series-Names": ",".join(names),
+                "X-Series-Kind": kind,
+            })
+        else:
+            body = render_json(header, kind, bucket_seconds, timestamps, values, names)
+            self.send_body(200, body, "application/json", etag)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time-range query API over the series bundle.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), SeriesHandler)
+    print(f"Series API on http://{args.host}:{args.port}{API_PATH}")
+    server.serve_forever()
@@ -1,6 +1,10 @@
 import os
 from datetime import datetime
 
+import numpy as np
+
+import kernels
+
 # This file writes to direction.txt and groups in upwards 5000 
 # and downwards 4000
 
@@ -52,6 +56,63 @@ def parse_ema_slopes(file_path):
                     print(f"Skipping invalid line: {line}")
     return data
 
+class HysteresisFilter:
+    """
+    Streaming form of multi_stage_hysteresis_filter(): update() takes one
+    direction value and returns the filtered one, so the filter can run over
+    chunks (strategies.py) with the same result as over the whole list.
+    """
+
+    def __init__(self, stable_count_initial, stable_count_steady):
+        self.stable_count_initial = stable_count_initial
+        self.stable_count_steady = stable_count_steady
+        self.current_val = None
+        self.pending_val = None
+        self.direction_established = False
+        self.consecutive_count = 0
+
+    def update(self, next_val):
+        if self.current_val is None:
+            # The first value is taken as is
+            self.current_val = self.pending_val = next_val
+        elif next_val == self.current_val:
+            # Same direction as current, reset pending info
+            self.pending_val = self.current_val
+            self.consecutive_count = 0
+        elif next_val == self.pending_val:
+            # Continuing the potential change
+            self.consecutive_count += 1
+            required_count = self.stable_count_steady if self.direction_established else self.stable_count_initial
+
+            # If we have enough consecutive points of the new value, commit to change
+            if self.consecutive_count >= required_count:
+                self.current_val = self.pending_val
+                self.consecutive_count = 0
+                self.direction_established = True
+        else:
+            # The direction changed from what was pending to another new value
+            self.pending_val = next_val
+            self.consecutive_count = 1
+        return self.current_val
+
+    def filter(self, directions):
+        """
+        update() over a float64 array of directions, compiled when numba is
+        available (kernels.hysteresis). NaN rows are skipped and stay NaN.
+        """
+        if not kernels.JIT:
+            return np.array([value if value != value else self.update(value) for value in directions.tolist()],
+                            np.float64)
+        state = kernels.hysteresis_state(self.current_val, self.pending_val,
+                                         self.direction_established, self.consecutive_count)
+        out = kernels.hysteresis(directions, self.stable_count_initial, self.stable_count_steady, state)
+        current, pending, established, count = state.tolist()
+        self.current_val = None if current != current else current
+        self.pending_val = None if pending != pending else pending
+        self.direction_established = bool(established)
+        self.consecutive_count = int(count)
+        return out
+
 def multi_stage_hysteresis_filter(directions, stable_count_initial, stable_count_steady):
     """
     Applies a multi-stage hysteresis filter to direction values.
@@ -68,42 +129,10 @@ def multi_stage_hysteresis_filter(directions, stable_count_initial, stable_count
     Returns:
         list of int: Filtered direction values.
     """
-    if not directions:
-        return directions
-
-    filtered = [directions[0]]
-    current_val = directions[0]
-
-    direction_established = False
-    pending_val = current_val
-    consecutive_count = 0
-
-    for i in range(1, len(directions)):
-        next_val = directions[i]
-        if next_val == current_val:
-            # Same direction as current, reset pending info
-            pending_val = current_val
-            consecutive_count = 0
-        else:
-            # Potential direction change
-            if next_val == pending_val:
-                # Continuing the potential change
-                consecutive_count += 1
-                required_count = stable_count_steady if direction_established else stable_count_initial
-
-                # If we have enough consecutive points of the new value, commit to change
-                if consecutive_count >= required_count:
-                    current_val = pending_val
-                    consecutive_count = 0
-                    direction_established = True
-            else:
-                # The direction changed from what was pending to another new value
-                pending_val = next_val
-                consecutive_count = 1
-
-        filtered.append(current_val)
-
-    return filtered
+    hysteresis = HysteresisFilter(stable_count_initial, stable_count_steady)
+    if kernels.JIT:
+        return hysteresis.filter(np.asarray(directions, np.float64)).astype(np.int64).tolist()
+    return [hysteresis.update(direction) for direction in directions]
 
 def write_direction_file(slope_data, output_file):
     """
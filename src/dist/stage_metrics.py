@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Per-stage instrumentation of the recompute.py cycle.
+
+Every stage runs as a child process and is measured from the outside, so the
+scripts need no changes:
+
+    wall / CPU seconds   perf_counter around the child, ru_utime + ru_stime
+    peak RSS             ru_maxrss of the child (and of what it waited for)
+    bytes written        ru_oublock * 512, the kernel's write accounting
+    rows in              lines of the stage's declared input files
+    rows out             lines of the .txt/.csv files under ../view/output
+                         whose size or mtime the stage changed
+
+A stage that cannot be started (missing interpreter or sudo) is recorded
+with status 127 and its error, and the cycle goes on like after any failed
+stage.
+
+Line counts are cached per file in runtime/row_counts.json; a file that only
+grew at the end (checked against a hash of the bytes before the old end)
+has just its new bytes counted.
+
+At the end of the cycle one JSON record is appended to
+runtime/stage_metrics.jsonl (rotated to .1 past METRICS_MAX_BYTES), and
+../view/output/cycle_metrics.json gets that record plus the p50/p99 of every
+stage over the last ROLLING_CYCLES cycles. The file is written after
+publish.py ran, so the dashboard gets it with the next cycle's publish.
+
+With a `profiler` (stage_profile.ProfileHooks), the stages it selects run
+under cProfile and tracemalloc and are flagged "profiled" in the record.
+"""
+
+import hashlib
+import json
+import math
+import os
+import subprocess
+import time
+from datetime import datetime, timezone
+
+OUTPUT_DIR = "../view/output"
+METRICS_FILE = "runtime/stage_metrics.jsonl"
+ROW_COUNTS_FILE = "runtime/row_counts.json"
+LATEST_FILE = os.path.join(OUTPUT_DIR, "cycle_metrics.json")
+METRICS_MAX_BYTES = 50 * 1024 * 1024
+ROLLING_CYCLES = 240                # about two hours of 25 s cycles
+CYCLE_BUDGET = 25.0                 # seconds bucle.py waits between cycles
+TAIL_CHECK = 4096                   # bytes before the old end hashed to detect appends
+COUNTED_SUFFIXES = (".txt", ".csv")
+START_FAILED = 127                  # status of a stage that could not be started, as in the shell
+
+
+def write_json_atomic(path, data, **kwargs):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
+
+
+class RowCounter:
+    """Line counts of files, recounting only what was appended since the last call."""
+
+    def __init__(self, path=ROW_COUNTS_FILE):
+        self.path = path
+        try:
+            with open(path, "r") as f:
+                self.counts = json.load(f)
+        except (OSError, ValueError):
+            self.counts = {}
+
+    @staticmethod
+    def _count(f, start, end):
+        f.seek(start)
+        rows = 0
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            rows += block.count(b"\n")
+            remaining -= len(block)
+        return rows
+
+    @staticmethod
+    def _tail_hash(f, end):
+        f.seek(max(0, end - TAIL_CHECK))
+        return hashlib.blake2b(f.read(min(end, TAIL_CHECK)), digest_size=8).hexdigest()
+
+    def rows(self, path):
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry = self.counts.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["rows"]
+        with open(path, "rb") as f:
+            if entry and entry["size"] <= stat.st_size and self._tail_hash(f, entry["size"]) == entry["tail"]:
+                rows = entry["rows"] + self._count(f, entry["size"], stat.st_size)
+            else:
+                rows = self._count(f, 0, stat.st_size)
+            tail = self._tail_hash(f, stat.st_size)
+        self.counts[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rows": rows, "tail": tail}
+        return rows
+
+    def save(self):
+        write_json_atomic(self.path, self.counts)
+
+
+def snapshot(folder=OUTPUT_DIR):
+    """{path: (size, mtime_ns)} of every file under folder."""
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class CycleMetrics:
+    """Runs the stages of one cycle and records them."""
+
+    def __init__(self, metrics_file=METRICS_FILE, latest_file=LATEST_FILE, budget=CYCLE_BUDGET, profiler=None):
+        self.metrics_file = metrics_file
+        self.profiler = profiler        # stage_profile.ProfileHooks, or None
+        self.latest_file = latest_file
+        self.budget = budget
+        self.rows = RowCounter()
+        self.stages = []
+        self.started = time.time()
+        self.clock = time.perf_counter()
+
+    def run(self, command, name=None, inputs=()):
+        """Run one stage (an argv list) and record it; returns its exit status."""
+        name = name or os.path.basename(next((arg for arg in command if arg.endswith(".py")), command[0]))
+        profiled = self.profiler is not None and self.profiler.wants(name)
+        if profiled:
+            command = self.profiler.wrap(command, name)
+        rows_in = [rows for rows in map(self.rows.rows, inputs) if rows is not None]
+        before = snapshot()
+        started = time.perf_counter()
+        try:
+            process = subprocess.Popen(command)
+        except OSError as e:
+            # Missing interpreter, script or sudo: a failed stage, not a crashed cycle
+            return self._record_start_failure(name, e, time.perf_counter() - started, profiled)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        after = snapshot()
+
+        changed = [path for path, stamp in after.items() if before.get(path) != stamp]
+        rows_out = sum(self.rows.rows(path) or 0 for path in changed if path.endswith(COUNTED_SUFFIXES))
+        self.stages.append({
+            "stage": name,
+            "status": process.returncode,
+            "seconds": round(elapsed, 3),
+            "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+            # ru_maxrss is in kilobytes on Linux
+            "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+            "rows_in": sum(rows_in) if rows_in else None,
+            "rows_out": rows_out,
+            "bytes_written": usage.ru_oublock * 512,
+            "files_changed": len(changed),
+            "profiled": profiled,
+        })
+        if process.returncode:
+            print(f"Error occurred: {name} exited with status {process.returncode}")
+        return process.returncode
+
+    def _record_start_failure(self, name, error, elapsed, profiled):
+        self.stages.append({
+            "stage": name,
+            "status": START_FAILED,
+            "error": str(error),
+            "seconds": round(elapsed, 3),
+            "cpu_seconds": 0.0,
+            "peak_rss_mb": 0.0,
+            "rows_in": None,
+            "rows_out": 0,
+            "bytes_written": 0,
+            "files_changed": 0,
+            "profiled": profiled,
+        })
+        print(f"Error occurred: {name} could not be started ({error})")
+        return START_FAILED
+
+    def _recent(self, count):
+        """The last `count` records of the metrics file (read from its end)."""
+        try:
+            with open(self.metrics_file, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                block = 256 * 1024
+                data = b""
+                while size > 0 and data.count(b"\n") <= count:
+                    step = min(block, size)
+                    size -= step
+                    f.seek(size)
+                    data = f.read(step) + data
+        except OSError:
+            return []
+        records = []
+        for line in data.splitlines()[-count:]:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+    def rolling(self, records):
+        """
+        p50/p99 seconds and peak RSS per stage, and of the whole cycle. Runs
+        under the profilers (stage_profile.py) and stages that could not be
+        started are left out.
+        """
+        per_stage = {"cycle": {"seconds": [r["seconds"] for r in records
+                                           if not any(stage.get("profiled") for stage in r["stages"])],
+                               "peak_rss_mb": []}}
+        for record in records:
+            for stage in record["stages"]:
+                if stage.get("profiled") or "error" in stage:
+                    continue  # a stage that never started has no timing or memory to count
+                entry = per_stage.setdefault(stage["stage"], {"seconds": [], "peak_rss_mb": []})
+                entry["seconds"].append(stage["seconds"])
+                entry["peak_rss_mb"].append(stage["peak_rss_mb"])
+        summary = {}
+        for name, series in per_stage.items():
+            summary[name] = {"cycles": len(series["seconds"])}
+            for key, values in series.items():
+                if values:
+                    summary[name][f"{key}_p50"] = percentile(values, 50)
+                    summary[name][f"{key}_p99"] = percentile(values, 99)
+        return summary
+
+    def finish(self):
+        """Append the cycle's record and write the latest cycle with its rolling summary."""
+        seconds = round(time.perf_counter() - self.clock, 3)
+        slowest = max(self.stages, key=lambda stage: stage["seconds"], default=None)
+        record = {
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+            "started_ts": round(self.started, 3),
+            "seconds": seconds,
+            "budget": self.budget,
+            "over_budget": seconds > self.budget,
+            "slowest": slowest["stage"] if slowest else None,
+            "stages": self.stages,
+        }
+        os.makedirs(os.path.dirname(self.metrics_file) or ".", exist_ok=True)
+        if os.path.exists(self.metrics_file) and os.path.getsize(self.metrics_file) > METRICS_MAX_BYTES:
+            os.replace(self.metrics_file, f"{self.metrics_file}.1")
+        with open(self.metrics_file, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.rows.save()
+
+        write_json_atomic(self.latest_file, {"cycle": record, "rolling": self.rolling(self._recent(ROLLING_CYCLES))},
+                          indent=1)
+        if slowest:
+            print(f"Cycle: {seconds:.2f} s of a {self.budget:g} s budget, slowest stage {slowest['stage']} "
+                  f"({slowest['seconds']:.2f} s); metrics in {self.metrics_file}")
+        return record
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Opt-in profiling of chosen recompute.py stages.
+
+    "profile_stages": ["compute_final_portfolio"],  // stages to profile (script names, .py optional)
+    "profile_every": 20,                           // only every 20th cycle (default 1)
+    "profile_top": 25,                             // lines in the reports
+    "profile_memory": true,                        // tracemalloc as well (slows the stage down more)
+    "profile_keep": 20,                            // captures kept per stage
+
+The environment variables DIST_PROFILE_STAGES (comma separated) and
+DIST_PROFILE_EVERY override the config, e.g. for one manual cycle:
+
+    DIST_PROFILE_STAGES=compute_strategies,compute_ema python3 recompute.py
+
+A profiled stage runs as `python3 -m stage_profile --output <prefix> script`
+(this file), which executes the script under cProfile, tracemalloc and a
+stack sampler, and writes
+
+    runtime/profiles/<stage>-<time>.prof        cProfile stats (snakeviz, pstats)
+    runtime/profiles/<stage>-<time>.txt         top functions by cumulative time,
+                                                top allocations by line, peak traced memory
+    runtime/profiles/<stage>-<time>.collapsed   sampled stacks, one "a;b;c count" line
+                                                per stack (flamegraph.pl, speedscope)
+
+Profiled runs are flagged in the cycle metrics and left out of the rolling
+percentiles, since the profilers slow the stage down.
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = "runtime/profiles"
+STATE_FILE = "runtime/profile_state.json"
+DEFAULT_TOP = 25
+DEFAULT_KEEP = 20
+SAMPLE_INTERVAL = 0.005     # seconds between stack samples
+
+
+def stage_name(script):
+    """'./compute_ema.py' -> 'compute_ema'"""
+    name = os.path.basename(script)
+    return name[:-3] if name.endswith(".py") else name
+
+
+class ProfileHooks:
+    """Decides which stages of this cycle are profiled and wraps their command."""
+
+    def __init__(self, stages=(), every=1, top=DEFAULT_TOP, memory=True, keep=DEFAULT_KEEP,
+                 folder=PROFILE_DIR, state_file=STATE_FILE):
+        self.stages = {stage_name(stage) for stage in stages}
+        self.every = max(1, int(every))
+        self.top = int(top)
+        self.memory = memory
+        self.keep = int(keep)
+        self.folder = folder
+        self.cycle = 0
+        if self.stages:
+            # Cycles are counted only while profiling is on
+            try:
+                with open(state_file, "r") as f:
+                    self.cycle = json.load(f).get("cycle", 0) + 1
+            except (OSError, ValueError):
+                self.cycle = 0
+            os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+            with open(state_file, "w") as f:
+                json.dump({"cycle": self.cycle}, f)
+
+    @classmethod
+    def from_config(cls, config):
+        stages = os.environ.get("DIST_PROFILE_STAGES")
+        stages = [s for s in stages.split(",") if s.strip()] if stages is not None else config.get("profile_stages", [])
+        return cls(
+            stages=[s.strip() for s in stages],
+            every=os.environ.get("DIST_PROFILE_EVERY") or config.get("profile_every", 1),
+            top=config.get("profile_top", DEFAULT_TOP),
+            memory=config.get("profile_memory", True),
+            keep=config.get("profile_keep", DEFAULT_KEEP),
+        )
+
+    def wants(self, name):
+        return stage_name(name) in self.stages and self.cycle % self.every == 0
+
+    def wrap(self, command, name):
+        """The command running the stage's script under stage_profile."""
+        script = next(i for i, arg in enumerate(command) if arg.endswith(".py"))
+        stage = stage_name(name)
+        self.prune(stage)
+        os.makedirs(self.folder, exist_ok=True)
+        prefix = os.path.join(self.folder, f"{stage}-{datetime.now():%Y%m%d-%H%M%S}")
+        options = ["-m", "stage_profile", "--output", prefix, "--top", str(self.top)]
+        if not self.memory:
+            options.append("--no-memory")
+        return command[:script] + options + command[script:]
+
+    def prune(self, stage):
+        """Remove the oldest captures of `stage` beyond keep - 1, making room for one more."""
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return
+        captures = sorted({name.rsplit(".", 1)[0] for name in names
+                           if name.startswith(f"{stage}-") and name.endswith((".prof", ".txt", ".collapsed"))})
+        for capture in captures[:max(0, len(captures) - self.keep + 1)]:
+            for suffix in (".prof", ".txt", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.folder, capture + suffix))
+                except OSError:
+                    pass
+
+
+# ------------------------------------------------------------------------------
+# THE PROFILED RUN
+# ------------------------------------------------------------------------------
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of one thread every `interval` seconds into collapsed
+    stacks, rooted at the script's module frame (the runpy frames above it
+    are dropped).
+    """
+
+    def __init__(self, thread_id, script, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.script = os.path.abspath(script)
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            rooted = False
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                if code.co_name == "<module>" and os.path.abspath(code.co_filename) == self.script:
+                    rooted = True
+                    break
+                frame = frame.f_back
+            if rooted:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+
+def write_reports(prefix, profiler, sampler, snapshot, peak, top, elapsed):
+    profiler.dump_stats(f"{prefix}.prof")
+
+    text = io.StringIO()
+    text.write(f"{os.path.basename(prefix)}: {elapsed:.2f} s under the profilers\n\n")
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+    if snapshot is not None:
+        text.write(f"Peak traced memory: {peak / 1e6:.1f} MB\n")
+        text.write(f"Top {top} allocations by line (live at the end of the stage):\n")
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            text.write(f"  {stat.size / 1e6:10.3f} MB {stat.count:>9} blocks  {frame.filename}:{frame.lineno}\n")
+    with open(f"{prefix}.txt", "w") as f:
+        f.write(text.getvalue())
+
+    with open(f"{prefix}.collapsed", "w") as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stage script under cProfile, tracemalloc and a stack sampler.")
+    parser.add_argument("--output", required=True, help="prefix of the .prof / .txt / .collapsed files")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc")
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL, help="seconds between stack samples")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    # The script sees itself as __main__, with its own argv and folder on the path
+    sys.argv = [args.script, *args.args]
+    sys.path[0] = os.path.dirname(os.path.abspath(args.script))
+
+    if not args.no_memory:
+        tracemalloc.start()
+    sampler = StackSampler(threading.get_ident(), args.script, args.interval)
+    profiler = cProfile.Profile()
+    status = 0
+    started = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    except SystemExit as e:
+        status = e.code
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        profiler.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+        snapshot = peak = None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    write_reports(args.output, profiler, sampler, snapshot, peak, args.top, elapsed)
+    print(f"Profile of {args.script}: {args.output}.prof / .txt / .collapsed")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
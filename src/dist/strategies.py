@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Strategy registry for compute_strategies.py.
+
+A strategy declares the features it reads and turns one chunk of the shared
+feature frame into trades:
+
+    @strategy("my_strategy")
+    class MyStrategy(Strategy):
+        features = ("price", "ema_slope")
+
+        def step(self, timestamp, price, ema_slope):
+            ...
+            return (timestamp, "buy", "my_reason")   # or None
+
+step() is called once per row, in time order, with the row's features in
+the declared order; state lives on the instance. A vectorized strategy
+overrides run(frame) instead and yields its trades for the chunk: the frame
+maps "timestamp" and each feature name to numpy arrays of the chunk's rows.
+
+Features are registered the same way (@feature): a generator over the
+chunks of asset.txt yielding one float64 array per chunk, NaN where the
+feature has no value (e.g. the first row of a slope). Each feature is
+computed once per run, whatever the number of strategies reading it. EMA and
+SMA come from the indicator cache, so they cost nothing after compute_ema.py.
+"""
+
+from collections import deque
+
+import numpy as np
+
+import kernels
+from indicator_cache import ema_kernel, sma_kernel
+from series_io import bar_interval, minute_bars
+from slopedirection import HysteresisFilter, apply_hysteresis, considered_positive, \
+    stable_count_initial, stable_count_steady
+
+FEATURES = {}
+STRATEGIES = {}
+
+SMA_WINDOW = 60000  # the window of compute_sma.py, for the direction feature
+
+
+# ------------------------------------------------------------------------------
+# FEATURES
+# ------------------------------------------------------------------------------
+class FeatureContext:
+    """The inputs shared by the feature generators of one run."""
+
+    def __init__(self, config, asset_file, timestamps, prices, cache, rows):
+        self.config = config
+        self.asset_file = asset_file
+        self.timestamps = timestamps
+        self.prices = prices
+        self.cache = cache
+        self.rows = rows
+
+    def chunks(self):
+        return range(0, len(self.timestamps), self.rows)
+
+
+def feature(name):
+    def register(generator):
+        FEATURES[name] = generator
+        return generator
+    return register
+
+
+@feature("price")
+def price_feature(ctx):
+    for start in ctx.chunks():
+        yield ctx.prices[start:start + ctx.rows]
+
+
+def differences(series, ctx):
+    """Chunks of series[i] - series[i - 1], NaN for the first row."""
+    for start in ctx.chunks():
+        previous = series[start - 1] if start else np.nan
+        yield np.diff(np.asarray(series[start:start + ctx.rows]), prepend=previous)
+
+
+def ema_slopes(ctx, config_key):
+    """The slopes compute_ema.py writes for the span `config_key`."""
+    span = minute_bars(ctx.config.get(config_key, 5), bar_interval(ctx.config, ctx.asset_file))
+    ema = ctx.cache.get("ema", {"span": span}, ctx.timestamps, ctx.prices, ema_kernel(span, ctx.rows))
+    return differences(ema, ctx)
+
+
+@feature("ema_slope")
+def ema_slope_feature(ctx):
+    return ema_slopes(ctx, "ema_days")
+
+
+@feature("micro_slope")
+def micro_slope_feature(ctx):
+    return ema_slopes(ctx, "ema_days_micro")
+
+
+@feature("direction")
+def direction_feature(ctx):
+    """
+    slopedirection.py over the SMA slope of compute_sma.py: 5000 (up) or 4000
+    (down) after the hysteresis filter, NaN until the SMA has a slope. The
+    slope is rounded to the 12 decimals of simple_ma_slope.txt first.
+    """
+    sma = ctx.cache.get("sma", {"window": SMA_WINDOW}, ctx.timestamps, ctx.prices,
+                        sma_kernel(SMA_WINDOW, ctx.rows))
+    hysteresis = HysteresisFilter(stable_count_initial, stable_count_steady)
+    for start in ctx.chunks():
+        chunk_sma = np.asarray(sma[start:start + ctx.rows])
+        chunk_times = ctx.timestamps[start:start + ctx.rows]
+        previous_sma = sma[start - 1] if start else np.nan
+        previous_time = ctx.timestamps[start - 1] if start else chunk_times[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slopes = np.diff(chunk_sma, prepend=previous_sma) / np.diff(chunk_times, prepend=previous_time)
+
+        directions = np.where(slopes > considered_positive, 5000.0, 4000.0)
+        directions[np.isnan(slopes)] = np.nan
+        # Rounding moves a slope by at most 5e-13: only those this close to
+        # the threshold need the exact decimal rounding
+        for i in np.flatnonzero(np.abs(slopes - considered_positive) < 1e-12).tolist():
+            directions[i] = 5000 if float(f"{slopes[i]:.12f}") > considered_positive else 4000
+        yield hysteresis.filter(directions) if apply_hysteresis else directions
+
+
+# ------------------------------------------------------------------------------
+# STRATEGIES
+# ------------------------------------------------------------------------------
+def strategy(name):
+    def register(cls):
+        cls.name = name
+        STRATEGIES[name] = cls
+        return cls
+    return register
+
+
+class Strategy:
+    name = None
+    features = ("price",)
+
+    def __init__(self, config):
+        self.config = config
+
+    def run(self, frame):
+        """Yield the (timestamp, action, reason) trades of one chunk of the frame."""
+        columns = [frame["timestamp"].tolist()] + [frame[name].tolist() for name in self.features]
+        step = self.step
+        for row in zip(*columns):
+            trade = step(*row)
+            if trade is not None:
+                yield trade
+
+    def step(self, timestamp, *values):
+        raise NotImplementedError(f"Strategy '{self.name}' implements neither step() nor run()")
+
+
+def find_local_minimum(prices, window_size=5):
+    """
+    Finds a local minimum in a larger window of prices.
+    The local minimum is defined as the middle element of
+    the window being strictly less than all other elements.
+
+    Expects `prices` to be a deque or list of tuples (timestamp, price)
+    with length >= window_size.
+
+    Parameters:
+    - prices: deque/list of (timestamp, price) tuples
+    - window_size (int): The size of the window to determine a local minimum.
+                         Should be an odd number so there is a clear "middle" point.
+
+    Returns:
+    - The middle (timestamp, price) tuple if it's a local minimum, otherwise None.
+    """
+    if len(prices) < window_size:
+        return None
+
+    mid_index = window_size // 2
+    # Extract the middle element
+    mid_timestamp, mid_price = prices[mid_index]
+
+    # Check if this price is less than all other prices in the window
+    for i, (_, p) in enumerate(prices):
+        if i != mid_index and mid_price >= p:
+            return None
+
+    # If we reach here, mid_price is the smallest in this window
+    return (mid_timestamp, mid_price)
+
+
+@strategy("trailsl_localmin")
+class TrailingStopLocalMin(Strategy):
+    """Buy a 5-bar local minimum, sell on a trailing stop loss of sl_percentage."""
+
+    features = ("price",)
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.trailing_stop_loss_percentage = config["sl_percentage"]  # e.g. 1.5 for 1.5%
+        # Seconds after a stop loss sell before a local minimum may buy again
+        self.reentry_delay = float(config.get("reentry_delay_seconds", 60))
+        self.trailing_stop_price = None
+        # Initialize to 'sell' state to allow first buy on local minimum
+        self.last_action = 'sell'
+        # We'll keep a 5-point window for detecting local minima
+        self.recent_prices = deque(maxlen=5)
+        self.last_stop_loss_sell_timestamp = None  # Track last time we sold due to stop loss
+
+    def run(self, frame):
+        """The whole chunk in kernels.trailing_stop_localmin when numba is available."""
+        if not kernels.JIT:
+            yield from super().run(frame)
+            return
+        state = np.array([1.0 if self.last_action == 'buy' else 0.0,
+                          np.nan if self.trailing_stop_price is None else self.trailing_stop_price,
+                          np.nan if self.last_stop_loss_sell_timestamp is None else self.last_stop_loss_sell_timestamp,
+                          len(self.recent_prices)], np.float64)
+        window_times = np.zeros(5, np.int64)
+        window_prices = np.zeros(5, np.float64)
+        for k, (t, p) in enumerate(self.recent_prices):
+            window_times[k], window_prices[k] = t, p
+        trade_times, trade_actions, count = kernels.trailing_stop_localmin(
+            np.asarray(frame["timestamp"], np.int64), np.asarray(frame["price"], np.float64),
+            float(self.trailing_stop_loss_percentage), self.reentry_delay, state, window_times, window_prices)
+
+        in_market, stop_price, last_stop_time, window = state.tolist()
+        self.last_action = 'buy' if in_market else 'sell'
+        self.trailing_stop_price = None if stop_price != stop_price else stop_price
+        self.last_stop_loss_sell_timestamp = None if last_stop_time != last_stop_time else int(last_stop_time)
+        self.recent_prices.clear()
+        self.recent_prices.extend(zip(window_times[:int(window)].tolist(), window_prices[:int(window)].tolist()))
+        for timestamp, action in zip(trade_times[:count].tolist(), trade_actions[:count].tolist()):
+            yield (timestamp, 'buy', 'locmin') if action == kernels.BUY else (timestamp, 'sell', 'tsl')
+
+    def step(self, timestamp, price):
+        self.recent_prices.append((timestamp, price))
+
+        # Check if we can detect a local minimum (only if we're currently 'sold out')
+        if self.last_action == 'sell' and len(self.recent_prices) == 5:
+            local_minimum = find_local_minimum(self.recent_prices)
+            if local_minimum is not None:
+                local_min_timestamp = local_minimum[0]
+
+                # Only buy if it's at least reentry_delay seconds after the last stop loss sell
+                if (self.last_stop_loss_sell_timestamp is None or
+                        local_min_timestamp > self.last_stop_loss_sell_timestamp + self.reentry_delay):
+                    self.last_action = 'buy'
+                    # Set the initial trailing stop price based on the price at buy time
+                    self.trailing_stop_price = price * (1 - self.trailing_stop_loss_percentage / 100)
+                    # After buying, skip the trailing stop check in this row
+                    return (local_min_timestamp, 'buy', 'locmin')
+
+        # If currently in a buy state, manage trailing stop
+        if self.last_action == 'buy':
+            # Update the trailing stop price if the current price justifies a higher stop
+            new_stop = price * (1 - self.trailing_stop_loss_percentage / 100)
+            if self.trailing_stop_price is None:
+                self.trailing_stop_price = new_stop
+            else:
+                self.trailing_stop_price = max(self.trailing_stop_price, new_stop)
+
+            # Check if price hits the trailing stop
+            if price <= self.trailing_stop_price:
+                self.last_action = 'sell'
+                self.trailing_stop_price = None
+                self.last_stop_loss_sell_timestamp = timestamp
+                return (timestamp, 'sell', 'tsl')
+        return None
+
+
+@strategy("trailsl_localmin_direction")
+class TrailingStopLocalMinDirection(Strategy):
+    """
+    trailsl_localmin with the tradedirectionfilter.py rule: a buy at a bar
+    whose direction is down (4000) is written as a 'hysteresis' sell.
+    """
+
+    features = ("price", "direction")
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.inner = TrailingStopLocalMin(config)
+        # A local minimum buy is dated two bars back
+        self.recent_directions = deque(maxlen=5)
+
+    def step(self, timestamp, price, direction):
+        self.recent_directions.append((timestamp, direction))
+        trade = self.inner.step(timestamp, price)
+        if trade is not None and trade[1] == 'buy':
+            for t, d in self.recent_directions:
+                if t == trade[0] and d == 4000:
+                    return (trade[0], 'sell', 'hysteresis')
+        return trade
+
+
+@strategy("ema_algo")
+class EmaSlope(Strategy):
+    """compute_trades_ema_algo.py: average EMA slope over 400 bars, with a trailing stop."""
+
+    features = ("price", "ema_slope")
+
+    SLOPE_WINDOW_SIZE = 400
+    TRAILING_STOP_PERCENTAGE = 0.90  # 7% trailing stop loss
+    positive_slope_limit = 0
+    negative_slope_limit = 0
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.in_market = False          # Whether we currently hold the asset
+        self.slope_window = deque(maxlen=self.SLOPE_WINDOW_SIZE)  # Rolling window to calculate average slope
+        self.highest_price = None       # Track the highest price after buying
+
+    def step(self, timestamp, price, slope):
+        if slope != slope:
+            return None  # no slope yet (the first row)
+
+        # Update the rolling window of slopes
+        self.slope_window.append(slope)
+
+        # Trailing stop loss logic
+        if self.in_market:
+            # Update the highest price
+            if self.highest_price is None or price > self.highest_price:
+                self.highest_price = price
+
+            # Check for a drop from the highest price
+            if price <= self.highest_price * (1 - self.TRAILING_STOP_PERCENTAGE):
+                # Sell due to trailing stop loss
+                self.in_market = False
+                self.highest_price = None  # Reset the highest price
+                return (timestamp, 'sell', 'stl')
+
+        # Calculate the average slope over the last window (if we have enough data)
+        if len(self.slope_window) == self.SLOPE_WINDOW_SIZE:
+            avg_slope = sum(self.slope_window) / len(self.slope_window)
+
+            # Buy condition
+            if avg_slope > self.positive_slope_limit and not self.in_market:
+                self.in_market = True
+                self.highest_price = price  # Initialize highest price after buying
+                return (timestamp, 'buy', 'slope')
+
+            # Sell condition
+            elif avg_slope <= self.negative_slope_limit and self.in_market:
+                self.in_market = False
+                self.highest_price = None  # Reset the highest price
+                return (timestamp, 'sell', 'slope')
+        return None
+
+
+@strategy("ema_algo_minloss")
+class EmaSlopeMinLoss(Strategy):
+    """
+    compute_trades_ema_algo_minloss.py: the EMA slope strategy with stops on
+    the micro EMA slope averaged over 7 minutes, and pauses after those stops.
+    """
+
+    features = ("price", "ema_slope", "micro_slope")
+
+    SLOPE_WINDOW_SIZE = 400
+    positive_slope_limit = 0
+    negative_slope_limit = 0
+
+    ema_micro_sl_slope_limit = -0.45
+    ema_micro_sl_slope_limit2 = -0.025  # Secondary stop-loss limit
+    buying_pause_length_hours = 168  # One week pause period
+    mstl_pause_length_hours = 72  # Example: 3-day pause after "mstl"
+    ema_micro_compute_time_minutes = 7  # Average micro EMA over the last 7 minutes
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.in_market = False  # Whether we currently hold the asset
+        self.slope_window = deque(maxlen=self.SLOPE_WINDOW_SIZE)  # Rolling window to calculate average slope
+        self.slope_micro_window = deque()  # Micro EMA slopes over the last 7 minutes
+        self.last_sell_time = None  # Time of the last sell trade
+        self.last_mstl_time = None  # Time of the last "mstl" trade
+
+    def is_in_pause(self, current_time):
+        """Whether we are in the pause period after a stop."""
+        if self.last_sell_time is not None and current_time < self.last_sell_time + self.buying_pause_length_hours * 3600:
+            return True
+        if self.last_mstl_time is not None and current_time < self.last_mstl_time + self.mstl_pause_length_hours * 3600:
+            return True
+        return False
+
+    def step(self, timestamp, price, slope, slope_micro):
+        if slope != slope or slope_micro != slope_micro:
+            return None  # no slopes yet (the first row)
+
+        # Update the rolling window of slopes
+        self.slope_window.append(slope)
+
+        # Update the slope_micro_window, and remove any entries older than 7 minutes
+        self.slope_micro_window.append((timestamp, slope_micro))
+        cutoff_time = timestamp - self.ema_micro_compute_time_minutes * 60
+        while self.slope_micro_window and self.slope_micro_window[0][0] < cutoff_time:
+            self.slope_micro_window.popleft()
+
+        # Calculate the average of slope_micro over the last 7 minutes
+        avg_slope_micro = sum(s[1] for s in self.slope_micro_window) / len(self.slope_micro_window)
+
+        # Calculate the average slope over the last window (if we have enough data)
+        if len(self.slope_window) == self.SLOPE_WINDOW_SIZE:
+            avg_slope = sum(self.slope_window) / len(self.slope_window)
+
+            # Sell condition based on average of micro EMA slope (primary stop-loss)
+            if self.in_market and avg_slope_micro < self.ema_micro_sl_slope_limit:
+                self.in_market = False
+                self.last_sell_time = timestamp  # Start the general pause period
+                return (timestamp, 'sell', 'stl')
+
+            # Sell condition based on average of micro EMA slope (secondary stop-loss)
+            elif self.in_market and avg_slope_micro < self.ema_micro_sl_slope_limit2:
+                self.in_market = False
+                self.last_mstl_time = timestamp  # Start the "mstl" pause period
+                return (timestamp, 'sell', 'mstl')
+
+            # Sell condition based on average slope
+            elif self.in_market and avg_slope <= self.negative_slope_limit:
+                self.in_market = False
+                return (timestamp, 'sell', 'slope')
+
+            # Buy condition
+            elif not self.in_market and avg_slope > self.positive_slope_limit and not self.is_in_pause(timestamp):
+                self.in_market = True
+                return (timestamp, 'buy', 'slope')
+        return None
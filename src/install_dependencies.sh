@@ -19,4 +19,5 @@ pip install pandas tqdm  --break-system-packages
 pip install bybit --break-system-packages
 pip install json5 --break-system-packages
 pip install brotli --break-system-packages
+#pip install numba --break-system-packages  # optional: compiled kernels (src/dist/kernels.py)
 pip install --upgrade urllib3 six bravado bravado-core  --break-system-packages
@@ -2,6 +2,7 @@
 
 import argparse
 import math
+import sys
 import time
 from pathlib import Path
 from datetime import date
@@ -11,6 +12,10 @@ import pandas as pd
 import websocket
 from tqdm import tqdm  # for progress bar
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange import metrics
+from exchange.push_hub import push
+
 # ----------------------------------------------------------------------------
 # Configuration
 # ----------------------------------------------------------------------------
@@ -53,6 +58,8 @@ with open(f"{home_dir}/CRYPTO-Trader/src/dist/apikey-crypto.json", "r") as file:
     if "pair" not in config:
         raise ValueError("The 'pair' key is missing in apikey-crypto.json")
     symbol = config["pair"].lower()  # Convert to lowercase for Binance's WebSocket API
+    # "trades": exchange.trade_bars appends the minute bars, this script only fetches history
+    kline_source = config.get("kline_source", "kline")
 
 # ----------------------------------------------------------------------------
 # Paths and URLs
@@ -162,6 +169,14 @@ def on_message(ws, message):
     data = json5.loads(message)
     kline = data['k']
     is_kline_closed = kline['x']
+
+    # Live candle for the dashboards (push hub), closed or not
+    push("kline", {
+        "t": int(kline['t'] // 1000), "o": float(kline['o']), "h": float(kline['h']),
+        "l": float(kline['l']), "c": float(kline['c']), "v": float(kline['v']), "x": is_kline_closed,
+    })
+    if kline_source == "trades":
+        return
     if is_kline_closed:
         timestamp = int(kline['t'] // 1000)  # Convert to seconds
         open_price = float(kline['o'])
@@ -243,5 +258,6 @@ if __name__ == "__main__":
             on_close=on_close
         )
         ws.run_forever()
+        metrics.increment("websocket_reconnects_total", stream="keep_fetching")
         # Sleep 1 second before attempting a reconnect if the socket closes
         time.sleep(1)
@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 
-import requests
-import time
-import hmac
-import hashlib
 import json5
 import json
+import sys
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from exchange.account_mirror import read_margin_account
+from exchange.client import BinanceClient
+from exchange.exchange_info import split_pair
+
 # ------------------------------------------------------------------------------
 # 1. LOAD API KEYS AND PAIR FROM JSON5
 # ------------------------------------------------------------------------------
@@ -25,63 +27,44 @@ outfile = f"{home_dir}/CRYPTO-Trader/src/view/output/equity.txt"
 # We'll parse that down to "HBAR" as the base token.
 full_pair = config.get("pair", "HBARUSDC")
 
-BASE_URL = 'https://api.binance.com'
+client = BinanceClient(API_KEY, SECRET_KEY)
 
 # ------------------------------------------------------------------------------
 # 2. PARSE THE BASE TOKEN FROM THE PAIR
 # ------------------------------------------------------------------------------
 def parse_base_token(pair_str):
     """
-    If pair_str is like 'HBARUSDC', strip 'USDC' -> 'HBAR'.
-    If the pair doesn't end with 'USDC', you can adapt the logic.
+    If pair_str is like 'HBARUSDC', return the base asset 'HBAR'.
+    Unknown formats are returned unchanged.
     """
-    pair_str = pair_str.upper()
-    if pair_str.endswith("USDC"):
-        # remove trailing "USDC" -> "HBAR"
-        return pair_str[:-4]
-    # fallback if format is different
-    return pair_str
+    try:
+        return split_pair(pair_str)[0]
+    except ValueError:
+        # Fallback if format is different
+        return pair_str.upper()
 
 # Extract base token from the pair (e.g. "HBARUSDC" -> "HBAR")
 base_token = parse_base_token(full_pair)
 
 # ------------------------------------------------------------------------------
-# 3. SIGNING HELPER FOR BINANCE
-# ------------------------------------------------------------------------------
-def sign_query(query: str) -> str:
-    return hmac.new(SECRET_KEY.encode(), query.encode(), hashlib.sha256).hexdigest()
-
-# ------------------------------------------------------------------------------
-# 4. GET CROSS MARGIN ACCOUNT INFO
+# 3. GET CROSS MARGIN ACCOUNT INFO
 # ------------------------------------------------------------------------------
 def get_cross_margin_account_info():
     """
     Fetch cross margin account info which shows net assets for each coin.
     """
     try:
-        timestamp = int(time.time() * 1000)
-        query_string = f"timestamp={timestamp}"
-        signature = sign_query(query_string)
-        query_string += f"&signature={signature}"
-
-        headers = {"X-MBX-APIKEY": API_KEY}
-        url = f"{BASE_URL}/sapi/v1/margin/account"
-        resp = requests.get(url, headers=headers, params=query_string)
-
-        if resp.status_code == 200:
-            return resp.json()
-        else:
-            print(f"Error (cross margin): {resp.status_code}, {resp.text}")
-            return None
+        return client.get_margin_account()
     except Exception as e:
         print(f"Error fetching cross margin info: {e}")
         return None
 
 # ------------------------------------------------------------------------------
-# 5. MAIN EXECUTION
+# 4. MAIN EXECUTION
 # ------------------------------------------------------------------------------
 def main():
-    account_info = get_cross_margin_account_info()
+    # Prefer the local account mirror, it costs no exchange round-trip
+    account_info = read_margin_account() or get_cross_margin_account_info()
     if not account_info:
         print("Unable to retrieve cross margin account info.")
         return
@@ -1,9 +1,9 @@
-import time
-import hmac
-import hashlib
-import requests
+import sys
 import json5
-from urllib.parse import urlencode
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from exchange.client import BinanceClient, ExchangeAPIError
 
 with open("../../../dist/apikey-crypto.json", "r") as file:
     config = json5.load(file)
@@ -17,43 +17,16 @@ with open("../../../dist/apikey-crypto.json", "r") as file:
 API_KEY = key
 API_SECRET = secret
 
-BASE_URL = "https://api.binance.com"  # For production. Use "https://testnet.binance.vision" for testnet.
-
-def sign_request(params, secret_key):
-    query_string = urlencode(params)
-    signature = hmac.new(
-        secret_key.encode("utf-8"),
-        query_string.encode("utf-8"),
-        hashlib.sha256
-    ).hexdigest()
-    return signature
+# For testnet pass base_url="https://testnet.binance.vision"
+client = BinanceClient(API_KEY, API_SECRET)
 
 def get_max_borrowable_amount(asset):
-    endpoint = "/sapi/v1/margin/maxBorrowable"
-    timestamp = int(time.time() * 1000)
-
-    params = {
-        "asset": asset,
-        "timestamp": timestamp
-    }
-
-    # Sign the request
-    signature = sign_request(params, API_SECRET)
-    params["signature"] = signature
-
-    headers = {
-        "X-MBX-APIKEY": API_KEY
-    }
-
-    url = BASE_URL + endpoint
-    response = requests.get(url, headers=headers, params=params)
-
-    if response.status_code == 200:
-        data = response.json()
+    try:
+        data = client.get_max_margin_loan(asset)
         # The response typically looks like: {"amount":"123.456789"}
         return float(data["amount"])
-    else:
-        print("Error fetching max borrowable:", response.status_code, response.text)
+    except ExchangeAPIError as e:
+        print("Error fetching max borrowable:", e.status_code, e.message)
         return None
 
 if __name__ == "__main__":
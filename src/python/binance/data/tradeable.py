@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
+import sys
 import json5
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.exchange_info import get_symbol_info
+
 # ----------------------------------------------------------------------------
 # Load the trading pair and API keys from apikey-crypto.json
 # ----------------------------------------------------------------------------
@@ -24,25 +26,14 @@ API_SECRET = config["secret"]
 def is_tradeable(symbol):
     """
     Check if a given symbol (e.g., BTCUSDT) is tradeable on Binance.
+    Uses the local exchange-info cache, which only downloads this one symbol.
     """
     try:
-        # Initialize Binance client
-        client = Client(API_KEY, API_SECRET)
-        
-        # Fetch exchange info to find the symbol
-        exchange_info = client.get_exchange_info()
-        
-        # Check if the symbol exists and is tradeable
-        for s in exchange_info['symbols']:
-            if s['symbol'] == symbol:
-                if s['status'] == 'TRADING':
-                    return True
-                else:
-                    return False
-        return False  # Symbol not found
-    except BinanceAPIException as e:
-        print(f"Binance API Exception: {e}")
-        return False
+        # The trading status is re-checked at least hourly
+        info = get_symbol_info(symbol, ttl=3600)
+        if info is None:
+            return False  # Symbol not found
+        return info['status'] == 'TRADING'
     except Exception as e:
         print(f"Error: {e}")
         return False
@@ -1,7 +1,3 @@
-import requests
-import time
-import hmac
-import hashlib
 import math
 import json5
 import json
@@ -9,64 +5,34 @@ from pathlib import Path
 import sys
 import datetime
 
-from binance.client import Client
-from binance.exceptions import BinanceAPIException, BinanceRequestException
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BinanceClient, ExchangeAPIError, ExchangeRequestError
+from exchange import metrics
+from exchange.account_mirror import read_margin_account
+from exchange.exchange_info import max_orders_for_notional, split_pair
+from exchange.server_clock import sync_client
 
-BASE_URL = 'https://api.binance.com'
 SLIPPAGE_FILE = '/home/g1pablo_escaida1/CRYPTO-Trader/src/view/output/slippage.txt'
 
 # ------------------- HELPER FUNCTIONS ------------------- #
-def parse_pair(pair: str):
-    """
-    Given a trading pair like 'SUIUSDC' or 'HBARUSDC',
-    return (base_symbol, quote_symbol).
-    Assumes quote is always 'USDC'.
-    """
-    if not pair.endswith("USDC"):
-        raise ValueError(f"Unexpected pair format '{pair}'. Expected to end with 'USDC'.")
-    base_symbol = pair[:-4]  # everything before the last 4 chars
-    quote_symbol = "USDC"
-    return base_symbol, quote_symbol
-
-def get_price_from_binance(pair: str):
+def get_price_from_binance(client, pair: str):
     """
     Fetch the price for the specified pair (e.g. 'SUIUSDC', 'HBARUSDC').
     Returns float price of base in terms of quote.
     """
     try:
-        response = requests.get(
-            f'{BASE_URL}/api/v3/ticker/price',
-            params={'symbol': pair}
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = client.get_symbol_ticker(pair)
         return float(data.get("price", 0))
     except Exception as e:
         print(f"[ERROR] Failed to get price for {pair}: {e}")
         return 0.0
 
-def get_margin_account_info(api_key, secret_key, base_symbol, quote_symbol, debug=False):
+def get_margin_account_info(client, base_symbol, quote_symbol, debug=False):
     """
     Fetch margin account info but only print the relevant base/quote assets if debug=True.
     """
     try:
-        timestamp = int(time.time() * 1000)
-        query_string = f'timestamp={timestamp}'
-        signature = hmac.new(
-            secret_key.encode(),
-            query_string.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        query_string += f'&signature={signature}'
-        headers = {'X-MBX-APIKEY': api_key}
-
-        response = requests.get(
-            f'{BASE_URL}/sapi/v1/margin/account',
-            headers=headers,
-            params=query_string
-        )
-        response.raise_for_status()
-        account_info = response.json()
+        account_info = client.get_margin_account()
 
         if debug:
             user_assets = account_info.get("userAssets", [])
@@ -83,14 +49,11 @@ def get_margin_account_info(api_key, secret_key, base_symbol, quote_symbol, debu
         print(f"[ERROR] An error occurred in get_margin_account_info: {e}")
         return None
 
-def sync_server_time(client):
-    """Sync local system time with Binance server to avoid timestamp errors."""
+def sync_server_time(client, refresh=False):
+    """Apply the shared exchange clock offset (one REST sync if the clock service is down)."""
     try:
-        server_time_info = client.get_server_time()
-        server_time = server_time_info['serverTime']  # ms
-        local_time = int(time.time() * 1000)          # ms
-        client.time_offset = server_time - local_time
-        print(f"[Time Sync] Offset: {client.time_offset/1000:.3f}s")
+        offset_ms, source = sync_client(client, refresh=refresh)
+        print(f"[Time Sync] Offset: {offset_ms/1000:.3f}s ({source})")
     except Exception as e:
         print(f"Failed to sync server time: {e}")
         raise
@@ -109,15 +72,15 @@ def place_order_with_retry(client, trading_pair, order_size, max_retries=3):
                 quoteOrderQty=order_size
             )
             return order
-        except BinanceAPIException as e:
+        except ExchangeAPIError as e:
             if e.code == -1021:  # Timestamp for this request is outside recvWindow
                 print(f"Attempt {attempt}: Timestamp error. Re-syncing time.")
-                sync_server_time(client)
-                time.sleep(1)
+                # The offset in use was wrong: measure it again, it applies immediately
+                sync_server_time(client, refresh=True)
             else:
                 print(f"[ERROR] Binance API on attempt {attempt}: {e.message} (Code: {e.code})")
                 raise
-        except BinanceRequestException as e:
+        except ExchangeRequestError as e:
             print(f"[ERROR] Binance Request on attempt {attempt}: {e}")
             raise
         except Exception as e:
@@ -164,20 +127,24 @@ def main():
             raise ValueError("Missing 'key', 'secret', or 'pair' in JSON config.")
 
         # 2) Parse pair => base/quote
-        base_symbol, quote_symbol = parse_pair(trading_pair)
+        base_symbol, quote_symbol = split_pair(trading_pair)
         print(f"[INFO] Base:  {base_symbol}, Quote: {quote_symbol}")
 
         # 3) Create client & sync time
-        client = Client(api_key, api_secret)
+        client = BinanceClient(api_key, api_secret)
         sync_server_time(client)
 
-        # 4) Fetch margin account info
-        account_info = get_margin_account_info(api_key, api_secret, base_symbol, quote_symbol, debug=True)
+        # 4) Fetch margin account info (local mirror first, REST as fallback)
+        account_info = read_margin_account()
+        if account_info:
+            print("[INFO] Using margin account from the local account mirror.")
+        else:
+            account_info = get_margin_account_info(client, base_symbol, quote_symbol, debug=True)
         if not account_info:
             raise Exception("[ERROR] Could not fetch margin account info. Exiting.")
 
         # 5) Get price of BASE in QUOTE
-        base_quote_price = get_price_from_binance(trading_pair)
+        base_quote_price = get_price_from_binance(client, trading_pair)
         if base_quote_price <= 0:
             print("[WARNING] Could not get price. Equity calc may be inaccurate.")
 
@@ -239,7 +206,7 @@ def main():
             try:
                 client.create_margin_loan(asset=quote_symbol, amount=borrow_amount)
                 print(f"[INFO] Borrowed {borrow_amount} {quote_symbol}")
-            except BinanceAPIException as e:
+            except ExchangeAPIError as e:
                 print(f"[ERROR] Failed to borrow: {e.message} (Code: {e.code})")
                 raise
 
@@ -247,7 +214,8 @@ def main():
         total_quote_for_order = math.floor(portion_equity + borrow_amount)
 
         # 10) Split into multiple orders
-        num_orders = number_sim_orders
+        # Fewer slices if each one would fall below the symbol's minimum notional
+        num_orders = max_orders_for_notional(trading_pair, total_quote_for_order, number_sim_orders)
         order_size = math.floor(total_quote_for_order / num_orders)
 
         if order_size <= 0:
@@ -257,12 +225,13 @@ def main():
 
         for i in range(1, num_orders + 1):
             # Capture the price just before placing each order:
-            price_before_order = get_price_from_binance(trading_pair)
+            price_before_order = get_price_from_binance(client, trading_pair)
 
             try:
                 print(f" - Order {i}/{num_orders} => {order_size} {quote_symbol}")
                 order_resp = place_order_with_retry(client, trading_pair, order_size)
                 print(f"   [OK] orderId={order_resp.get('orderId')}")
+                metrics.order_acked("buy", order_resp)
 
                 # ------------------
                 # Calculate slippage
@@ -283,16 +252,18 @@ def main():
                         print("[WARNING] No executed quantity; cannot compute slippage.")
                 except ValueError:
                     print("[ERROR] Could not parse fill quantities for slippage calculation.")
-
-                time.sleep(1)
             except Exception as e:
                 print(f"[ERROR] Could not place order {i}: {e}")
+                if i == 1:
+                    raise  # nothing bought: exit non-zero, execute_orders.py records no position
                 break
 
-    except BinanceAPIException as e:
+    except ExchangeAPIError as e:
         print(f"[ERROR] Binance API Exception: {e.message} (Code:{e.code})")
-    except BinanceRequestException as e:
+        sys.exit(1)
+    except ExchangeRequestError as e:
         print(f"[ERROR] Binance Request Exception: {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"[ERROR] General Exception: {e}")
         sys.exit(1)
@@ -1,10 +1,11 @@
 import sys
 import json5
 import math
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BinanceClient, ExchangeAPIError
+
 print("Executing Margin BUY order script...")
 home_dir = Path.home()
 
@@ -20,7 +21,7 @@ try:
     leverageStrength = api_keys['margin']
 
     # Step 2: Initialize the Binance client
-    client = Client(api_key, api_secret)
+    client = BinanceClient(api_key, api_secret)
 
     # Step 3: Fetch the USDC balance from the margin account
     margin_account_info = client.get_margin_account()
@@ -78,7 +79,7 @@ try:
     
     print("Margin BUY order executed successfully. Order details:", order)
 
-except BinanceAPIException as e:
+except ExchangeAPIError as e:
     # Display a detailed error message
     print(f"Binance API Exception: {e.message} (Code: {e.code})")
 except Exception as e:
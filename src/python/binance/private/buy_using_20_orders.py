@@ -2,33 +2,23 @@ from pathlib import Path
 import sys
 import json5
 import math
-from binance.client import Client
-from binance.exceptions import BinanceAPIException, BinanceRequestException
-import time
-import datetime
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BinanceClient, ExchangeAPIError, ExchangeRequestError
+from exchange.server_clock import sync_client
 
 print("Executing Margin BUY order script...")
 home_dir = Path.home()
 
-def sync_server_time(client):
+def sync_server_time(client, refresh=False):
     """
-    Synchronizes local system time with Binance server time.
-    This updates the client's internal timestamp offset.
+    Applies the exchange clock offset to the client's signed requests.
+    The offset comes from exchange.server_clock; the Binance server is only
+    asked when that service is not running or refresh is set.
     """
     try:
-        server_time_response = client.get_server_time()
-        server_time = server_time_response['serverTime']  # in milliseconds
-        local_time = int(time.time() * 1000)  # in milliseconds
-        time_offset = server_time - local_time
-        client.time_offset = time_offset  # Update the client's internal time offset
-
-        # For debugging: Print the server time, local time, and offset
-        server_time_dt = datetime.datetime.fromtimestamp(server_time / 1000.0)
-        local_time_dt = datetime.datetime.fromtimestamp(local_time / 1000.0)
-        offset_seconds = time_offset / 1000.0
-
-        print(f"[Time Sync] Server Time: {server_time_dt} | Local Time: {local_time_dt} | Offset: {offset_seconds} seconds")
-
+        offset_ms, source = sync_client(client, refresh=refresh)
+        print(f"[Time Sync] Offset: {offset_ms / 1000.0} seconds ({source})")
     except Exception as e:
         print(f"Failed to synchronize time: {e}")
         raise
@@ -46,16 +36,15 @@ def place_order_with_retry(client, trading_pair, order_size, max_retries=3):
                 quoteOrderQty=order_size
             )
             return order
-        except BinanceAPIException as e:
+        except ExchangeAPIError as e:
             if e.code == -1021:  # Timestamp error
                 print(f"Attempt {attempt}: Timestamp error detected. Resynchronizing time...")
-                sync_server_time(client)
-                # Adding a longer sleep to ensure time sync takes effect
-                time.sleep(2)
+                # The offset in use was wrong: measure it again, it applies immediately
+                sync_server_time(client, refresh=True)
             else:
                 print(f"Binance API Exception on attempt {attempt}: {e.message} (Code: {e.code})")
                 raise
-        except BinanceRequestException as e:
+        except ExchangeRequestError as e:
             print(f"Binance Request Exception on attempt {attempt}: {e}")
             raise
         except Exception as e:
@@ -78,7 +67,7 @@ def main():
             raise ValueError("API key, secret, or trading pair not found in the configuration file.")
 
         # Step 2: Initialize the Binance client
-        client = Client(api_key, api_secret)
+        client = BinanceClient(api_key, api_secret)
 
         # Step 3: Synchronize time with Binance server
         sync_server_time(client)
@@ -115,7 +104,7 @@ def main():
             try:
                 client.create_margin_loan(asset='USDC', amount=borrow_amount)
                 print(f"Successfully borrowed {borrow_amount} USDC.")
-            except BinanceAPIException as e:
+            except ExchangeAPIError as e:
                 print(f"Failed to borrow USDC: {e.message} (Code: {e.code})")
                 raise
             except Exception as e:
@@ -144,21 +133,20 @@ def main():
                 print(f"Order {i} executed successfully. Order ID: {order.get('orderId')}")
                 # Optional: Print additional order details for debugging
                 # print(json.dumps(order, indent=2))
-                time.sleep(1)  # Small delay to respect API rate limits
-            except BinanceAPIException as e:
+            except ExchangeAPIError as e:
                 print(f"Binance API Exception on order {i}: {e.message} (Code: {e.code})")
                 break
-            except BinanceRequestException as e:
+            except ExchangeRequestError as e:
                 print(f"Binance Request Exception on order {i}: {e}")
                 break
             except Exception as e:
                 print(f"General Exception on order {i}: {e}")
                 break
 
-    except BinanceAPIException as e:
+    except ExchangeAPIError as e:
         # Display a detailed Binance API error message
         print(f"Binance API Exception: {e.message} (Code: {e.code})")
-    except BinanceRequestException as e:
+    except ExchangeRequestError as e:
         print(f"Binance Request Exception: {e}")
     except Exception as e:
         # Catch-all for any other exceptions
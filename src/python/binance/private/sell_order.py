@@ -1,10 +1,11 @@
 import sys
 import json5
-import math
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BinanceClient, ExchangeAPIError
+from exchange.exchange_info import format_quantity, round_quantity, split_pair
+
 print("Executing Margin SELL order script...")
 home_dir = Path.home()
 
@@ -18,16 +19,11 @@ try:
     trading_pair = api_keys['pair']
 
     # Step 2: Initialize the Binance client
-    client = Client(api_key, api_secret)
+    client = BinanceClient(api_key, api_secret)
 
     # Step 3: Extract the base asset from the trading pair
     # For example, if trading_pair is "SUIUSDC", base is "SUI"
-    # Usually on Binance, pairs are formatted as BASEQUOTE (e.g., BTCUSDT -> BTC as base, USDT as quote)
-    # This script assumes the first 3 characters is the base asset. 
-    # Adjust if needed. For pairs with variable lengths (like BTCUSDT), 
-    # you may need a different logic:
-    #   base asset = trading_pair.replace("USDT","").replace("BUSD","").replace("USDC","") etc.
-    asset_to_sell = trading_pair[:3]
+    asset_to_sell, _ = split_pair(trading_pair)
 
     # Step 4: Fetch the balance from the margin account
     margin_account_info = client.get_margin_account()
@@ -40,8 +36,8 @@ try:
     if asset_balance <= 0:
         raise Exception(f"No {asset_to_sell} balance available to liquidate.")
 
-    # Step 5: Round down the balance using the floor function
-    asset_balance = math.floor(asset_balance)
+    # Step 5: Round the balance down to the symbol's LOT_SIZE step
+    asset_balance = round_quantity(trading_pair, asset_balance)
 
     if asset_balance <= 0:
         raise Exception(f"Rounded {asset_to_sell} balance is zero, no asset to sell.")
@@ -54,7 +50,7 @@ try:
         symbol=trading_pair,
         side='SELL',
         type='MARKET',
-        quantity=asset_balance
+        quantity=format_quantity(asset_balance)
     )
     print("Margin SELL order executed successfully. Order details:", order)
 
@@ -78,7 +74,7 @@ try:
     if not repaid_anything:
         print("No debt to repay.")
 
-except BinanceAPIException as e:
+except ExchangeAPIError as e:
     if e.code == -1100:
         print("ApiError -1100, character error. [Possibly invalid symbol or insufficient balance]")
     else:
@@ -1,11 +1,12 @@
 from pathlib import Path
 import sys
 import json5
-import math
 import time
-import datetime
-from binance.client import Client
-from binance.exceptions import BinanceAPIException, BinanceRequestException
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BinanceClient, ExchangeAPIError, ExchangeRequestError
+from exchange.exchange_info import format_quantity, round_quantity, split_pair, split_quantity
+from exchange.server_clock import sync_client
 
 # Start the timer at the very beginning of the script execution
 script_start_time = time.time()
@@ -13,25 +14,15 @@ script_start_time = time.time()
 print("Executing Margin SELL order script...")
 home_dir = Path.home()
 
-def sync_server_time(client):
+def sync_server_time(client, refresh=False):
     """
-    Synchronizes local system time with Binance server time.
-    This updates the client's internal timestamp offset.
+    Applies the exchange clock offset to the client's signed requests.
+    The offset comes from exchange.server_clock; the Binance server is only
+    asked when that service is not running or refresh is set.
     """
     try:
-        server_time_response = client.get_server_time()
-        server_time = server_time_response['serverTime']  # in milliseconds
-        local_time = int(time.time() * 1000)  # in milliseconds
-        time_offset = server_time - local_time
-        client.time_offset = time_offset  # Update the client's internal time offset
-
-        # For debugging: Print the server time, local time, and offset
-        server_time_dt = datetime.datetime.fromtimestamp(server_time / 1000.0)
-        local_time_dt = datetime.datetime.fromtimestamp(local_time / 1000.0)
-        offset_seconds = time_offset / 1000.0
-
-        print(f"[Time Sync] Server Time: {server_time_dt} | Local Time: {local_time_dt} | Offset: {offset_seconds} seconds")
-
+        offset_ms, source = sync_client(client, refresh=refresh)
+        print(f"[Time Sync] Offset: {offset_ms / 1000.0} seconds ({source})")
     except Exception as e:
         print(f"Failed to synchronize time: {e}")
         raise
@@ -49,16 +40,15 @@ def place_order_with_retry(client, symbol, side, order_quantity, max_retries=3):
                 quantity=order_quantity
             )
             return order
-        except BinanceAPIException as e:
+        except ExchangeAPIError as e:
             if e.code == -1021:  # Timestamp error
                 print(f"Attempt {attempt}: Timestamp error detected. Resynchronizing time...")
-                sync_server_time(client)
-                # Adding a longer sleep to ensure time sync takes effect
-                time.sleep(2)
+                # The offset in use was wrong: measure it again, it applies immediately
+                sync_server_time(client, refresh=True)
             else:
                 print(f"Binance API Exception on attempt {attempt}: {e.message} (Code: {e.code})")
                 raise
-        except BinanceRequestException as e:
+        except ExchangeRequestError as e:
             print(f"Binance Request Exception on attempt {attempt}: {e}")
             raise
         except Exception as e:
@@ -76,13 +66,13 @@ try:
     trading_pair = api_keys['pair']
 
     # Step 2: Initialize the Binance client
-    client = Client(api_key, api_secret)
+    client = BinanceClient(api_key, api_secret)
 
     # Synchronize time with Binance server
     sync_server_time(client)
 
     # Step 3: Extract the base asset from the trading pair
-    asset_to_sell = trading_pair[:3]
+    asset_to_sell, _ = split_pair(trading_pair)
 
     # Step 4: Fetch the balance from the margin account
     margin_account_info = client.get_margin_account()
@@ -95,35 +85,26 @@ try:
     if asset_balance <= 0:
         raise Exception(f"No {asset_to_sell} balance available to liquidate.")
 
-    # Step 5: Round down the balance using floor
-    asset_balance = math.floor(asset_balance)
+    # Step 5: Round the balance down to the symbol's LOT_SIZE step
+    asset_balance = round_quantity(trading_pair, asset_balance)
 
     if asset_balance <= 0:
         raise Exception(f"Rounded {asset_to_sell} balance is zero, no asset to sell.")
 
-    print(f"Ready to SELL {asset_balance} {asset_to_sell}")
+    # Split into 20 LOT_SIZE aligned slices, the last one takes the remainder
+    order_sizes = split_quantity(trading_pair, asset_balance, 20)
 
-    # Number of orders to split into
-    num_orders = 20
-    # Calculate the size of each order
-    order_size = asset_balance // num_orders
-    remainder = asset_balance % num_orders
-
-    if order_size <= 0:
+    if not order_sizes:
         raise Exception("Calculated order size is too small to execute multiple orders.")
 
-    # Step 6: Execute margin market sell orders in 20 parts
-    for i in range(1, num_orders + 1):
-        # For the last order, add the remainder if any
-        current_order_size = order_size + (remainder if i == num_orders else 0)
-        if current_order_size <= 0:
-            print(f"Skipping order {i} because the size is {current_order_size}.")
-            continue
+    num_orders = len(order_sizes)
+    print(f"Ready to SELL {asset_balance} {asset_to_sell}")
 
+    # Step 6: Execute margin market sell orders in 20 parts
+    for i, current_order_size in enumerate(order_sizes, start=1):
         print(f"Placing SELL order {i}/{num_orders} for {current_order_size} {asset_to_sell}...")
-        order = place_order_with_retry(client, trading_pair, 'SELL', current_order_size)
+        order = place_order_with_retry(client, trading_pair, 'SELL', format_quantity(current_order_size))
         print(f"Order {i} executed successfully. Order details: {order}")
-        time.sleep(1)  # small pause to respect rate limits
 
     # Optional: Wait or re-check if orders are filled (Market orders usually fill immediately)
     # ... (Optional code here)
@@ -144,7 +125,7 @@ try:
     if not repaid_anything:
         print("No debt to repay.")
 
-except BinanceAPIException as e:
+except ExchangeAPIError as e:
     if e.code == -1100:
         print("ApiError -1100, character error. [Possibly invalid symbol or insufficient balance]")
     else:
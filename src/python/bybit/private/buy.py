@@ -1,11 +1,13 @@
 import os
-import time
-import hmac
-import hashlib
-import requests
 import json5
 import json
 import math
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BybitClient, ExchangeAPIError
+from exchange.ws_orders import BybitWsProtocol, OrderTransport
 
 # -------------------- INITIAL SETUP --------------------
 home_dir = os.path.expanduser("~")
@@ -17,42 +19,16 @@ with open(credentials_file, 'r') as f:
 api_key = creds.get("key")
 api_secret = creds.get("secret")
 leverage = float(creds.get("margin", 1))  # desired leverage via borrowing
+order_transport = creds.get("order_transport", "rest")  # "ws" keeps orders on the trade websocket
 
-endpoint = "https://api.bybit.com"
-
-def sign_request(secret, params):
-    sorted_params = dict(sorted(params.items(), key=lambda x: x[0]))
-    param_str = "&".join([f"{k}={v}" for k, v in sorted_params.items()])
-    signature = hmac.new(
-        secret.encode('utf-8'),
-        param_str.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
-    return sorted_params, signature
+client = BybitClient(api_key, api_secret)
 
 # -------------------- FETCH BALANCE --------------------
-balance_path = "/v5/account/wallet-balance"
-balance_params = {
-    "accountType": "UNIFIED",
-    "api_key": api_key,
-    "timestamp": str(int(time.time() * 1000)),
-    "recvWindow": "5000"
-}
-sorted_balance_params, balance_signature = sign_request(api_secret, balance_params)
-balance_final_params = {**sorted_balance_params, "sign": balance_signature}
-
 print("Fetching balance...")
-balance_response = requests.get(endpoint + balance_path, params=balance_final_params)
 try:
-    balance_data = balance_response.json()
-except json.JSONDecodeError as e:
-    print("Failed to decode JSON for balance response.")
-    print("Status code:", balance_response.status_code)
-    print("Response text:", balance_response.text)
-    raise e
-
-if balance_data.get("retCode") != 0:
-    print("Error fetching balance:", balance_data)
+    balance_data = client.get_wallet_balance("UNIFIED")
+except ExchangeAPIError as e:
+    print("Error fetching balance:", e.payload or e.message)
     exit()
 
 usdt_balance = 0.0
@@ -72,50 +48,22 @@ print(f"USDT available: {usdt_balance}")
 
 # -------------------- FETCH CURRENT XRP PRICE --------------------
 symbol = "XRPUSDT"
-market_path = "/v5/market/tickers"
 
 def fetch_price(symbol):
-    # Try linear category first
-    market_params = {
-        "api_key": api_key,
-        "category": "linear",
-        "symbol": symbol,
-        "timestamp": str(int(time.time() * 1000)),
-        "recvWindow": "5000"
-    }
-    sorted_market_params, market_signature = sign_request(api_secret, market_params)
-    market_final_params = {**sorted_market_params, "sign": market_signature}
-
-    response = requests.get(endpoint + market_path, params=market_final_params)
+    # Try linear category first, then spot
     try:
-        data = response.json()
-    except json.JSONDecodeError as e:
-        print("Failed to decode JSON for market (linear) response.")
-        print("Status code:", response.status_code)
-        print("Response text:", response.text)
-        raise e
-
-    # If linear fails, try spot category
-    if data.get("retCode") != 0 or "list" not in data.get("result", {}) or len(data["result"]["list"]) == 0:
-        market_params["category"] = "spot"
-        sorted_market_params, market_signature = sign_request(api_secret, market_params)
-        market_final_params = {**sorted_market_params, "sign": market_signature}
-
-        response = requests.get(endpoint + market_path, params=market_final_params)
-        try:
-            data = response.json()
-        except json.JSONDecodeError as e:
-            print("Failed to decode JSON for market (spot) response.")
-            print("Status code:", response.status_code)
-            print("Response text:", response.text)
-            raise e
-
-    return data
+        data = client.get_tickers("linear", symbol)
+        if data.get("result", {}).get("list"):
+            return data
+    except ExchangeAPIError:
+        pass
+    return client.get_tickers("spot", symbol)
 
 print("Fetching XRP price...")
-market_data = fetch_price(symbol)
-if market_data.get("retCode") != 0:
-    print("Error fetching market price:", market_data)
+try:
+    market_data = fetch_price(symbol)
+except ExchangeAPIError as e:
+    print("Error fetching market price:", e.payload or e.message)
     exit()
 
 if "result" in market_data and "list" in market_data["result"] and len(market_data["result"]["list"]) > 0:
@@ -137,37 +85,22 @@ borrow_amount = desired_total - current_balance
 
 
 if borrow_amount > 0:
-    borrow_path = "/v5/crypto-loan/borrow"
     borrow_body = {
         "accountType": "UNIFIED",
-        "api_key": api_key,
         "coin": "USDT",
         "qty": str(borrow_amount),
-        "timestamp": str(int(time.time() * 1000))
     }
-    sorted_borrow_body, borrow_signature = sign_request(api_secret, borrow_body)
-    borrow_final_body = {**sorted_borrow_body, "sign": borrow_signature}
 
     print(f"Attempting to borrow {borrow_amount} USDT for margin...")
-    borrow_response = requests.post(endpoint + borrow_path, json=borrow_final_body)
-    print("Borrow status code:", borrow_response.status_code)
-    print("Borrow raw response text:", borrow_response.text)
-
     try:
-        borrow_data = borrow_response.json()
-    except json.JSONDecodeError as e:
-        print("Failed to decode JSON for borrow response.")
-        print("Status code:", borrow_response.status_code)
-        print("Response text:", borrow_response.text)
-        raise e
-
-    if borrow_data.get("retCode") != 0:
-        print("Error borrowing funds:", borrow_data)
+        borrow_data = client.post("/v5/crypto-loan/borrow", borrow_body, signed=True)
+        print("Borrow response:", json.dumps(borrow_data))
+    except ExchangeAPIError as e:
+        print("Error borrowing funds:", e.payload or e.message)
         # If the API returned a non-standard response, consider that borrow might not be available.
         exit()
-    else:
-        print(f"Borrowed {borrow_amount} USDT successfully!")
-        current_balance += borrow_amount
+    print(f"Borrowed {borrow_amount} USDT successfully!")
+    current_balance += borrow_amount
 else:
     print("No need to borrow funds, leverage is 1x or less.")
 
@@ -181,39 +114,34 @@ if qty <= 0:
 print(f"Calculated quantity to buy: {qty}")
 
 # -------------------- PLACE MARGIN ORDER --------------------
-order_path = "/v5/order/create"
-order_body = {
+def place_order_rest(order):
+    # Same v5 body as the websocket request; errors raise ExchangeAPIError
+    return client.place_order(**order)
+
+order = {
     "category": "spot",
     "symbol": symbol,
     "side": "Buy",
     "orderType": "Market",
     "timeInForce": "GTC",
     "qty": str(qty),
-    "tradeMode": "MARGIN",
-    "api_key": api_key,
-    "timestamp": str(int(time.time() * 1000)),
-    "recvWindow": "5000"
+    "isLeverage": 1
 }
-sorted_order_body, order_signature = sign_request(api_secret, order_body)
-order_final_body = {**sorted_order_body, "sign": order_signature}
 
-print("Placing margin order...")
-order_response = requests.post(endpoint + order_path, json=order_final_body)
-print("Order status code:", order_response.status_code)
-print("Order raw response text:", order_response.text)
+transport = OrderTransport(
+    place_order_rest,
+    protocol=BybitWsProtocol(api_key, api_secret),
+    mode=order_transport
+)
 
-try:
-    order_data = order_response.json()
-except json.JSONDecodeError as e:
-    print("Failed to decode JSON for order response.")
-    print("Status code:", order_response.status_code)
-    print("Response text:", order_response.text)
-    raise e
-
-if order_data.get("retCode") == 0:
+print(f"Placing margin order ({'websocket' if transport.uses_ws(margin=True) else 'REST'})...")
+order_data = transport.place_orders([order], margin=True)[0]
+transport.close()
+
+if isinstance(order_data, Exception):
+    print("Error placing margin order:", order_data)
+else:
     print("Margin order placed successfully!")
     print("Order response:", json.dumps(order_data, indent=2))
-else:
-    print("Error placing margin order:", order_data)
 
 # Optional: Implement repayment logic here.
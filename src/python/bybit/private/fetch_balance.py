@@ -1,9 +1,10 @@
 import os
-import time
-import hmac
-import hashlib
-import requests
+import sys
 import json5
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BybitClient
 
 # Set your home directory path accordingly
 home_dir = os.path.expanduser("~")
@@ -18,39 +19,6 @@ with open(credentials_file, 'r') as f:
 api_key = creds.get("key")
 api_secret = creds.get("secret")
 
-# Bybit V5 endpoints
-endpoint = "https://api.bybit.com"
-api_path = "/v5/account/wallet-balance"
-
-# Request parameters
-params = {
-    "accountType": "UNIFIED"  # e.g., UNIFIED, CONTRACT, SPOT
-}
-
-# Current timestamp in milliseconds
-timestamp = str(int(time.time() * 1000))
-
-# Prepare the query string with parameters sorted by key
-query_params = {
-    "accountType": params["accountType"],
-    "api_key": api_key,
-    "timestamp": timestamp
-}
-
-sorted_query = "&".join([f"{k}={query_params[k]}" for k in sorted(query_params.keys())])
-
-# Generate the HMAC SHA256 signature
-signature = hmac.new(
-    api_secret.encode('utf-8'),
-    sorted_query.encode('utf-8'),
-    hashlib.sha256
-).hexdigest()
-
-# Final URL with the signature
-url = f"{endpoint}{api_path}?{sorted_query}&sign={signature}"
-
-# Make the request
-headers = {"Content-Type": "application/json"}
-response = requests.get(url, headers=headers)
-
-print(response.json())
+# Bybit V5 wallet balance, signed by the shared client
+client = BybitClient(api_key, api_secret)
+print(client.get_wallet_balance("UNIFIED"))  # e.g., UNIFIED, CONTRACT, SPOT
@@ -1,6 +1,10 @@
 import os
+import sys
 import json5
-from pybit.unified_trading import HTTP
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from exchange.client import BybitClient
 
 # Load credentials
 home_dir = os.path.expanduser("~")
@@ -13,17 +17,17 @@ api_key = creds.get("key")
 api_secret = creds.get("secret")
 
 # Initialize client
-client = HTTP(api_key=api_key, api_secret=api_secret, testnet=False)
+client = BybitClient(api_key, api_secret)
 
 # Borrow 1 USDT
-# Using the "request" method to call the Bybit Unified Margin API endpoint directly
-response = client.request(
-    method="POST", 
-    path="/unified/v3/private/borrow/create-borrow-order",
-    data={
+# Calling the Bybit Unified Margin API endpoint directly
+response = client.post(
+    "/unified/v3/private/borrow/create-borrow-order",
+    {
         "currency": "USDT",
         "amount": "1"
-    }
+    },
+    signed=True
 )
 
 print("Borrow response:", response)
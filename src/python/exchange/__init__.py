@@ -0,0 +1,7 @@
+"""
+Shared exchange helpers used by the binance, mexc and bybit scripts.
+
+Scripts living in src/python/<exchange>/... make this package importable with:
+
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+"""
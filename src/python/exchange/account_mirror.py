@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Local mirror of the binance cross margin account.
+
+Run it as a long-lived process next to keep-fetching.py:
+
+    cd src/python && python3 -m exchange.account_mirror
+
+It takes one REST snapshot of /sapi/v1/margin/account, then follows the margin
+user data stream and applies balance deltas as they arrive. Borrowed amounts
+and interest are not part of the stream, so the mirror re-reads one REST
+snapshot every RECONCILE_INTERVAL seconds and shortly after any balanceUpdate
+(borrow, repay, transfer).
+
+The current state is written to src/dist/runtime/account_mirror.json. Scripts
+read it through read_margin_account(), which returns the same shape as the
+REST endpoint ({"userAssets": [...]}) or None when the mirror is not running,
+so every caller keeps its REST call as the fallback.
+"""
+
+import asyncio
+import json
+import time
+
+import json5
+import websockets
+
+from exchange import metrics
+from exchange.client import BinanceClient
+from exchange.push_hub import push
+from exchange.state import CONFIG_FILE, RUNTIME_DIR, read_json, write_json_atomic
+
+USER_STREAM_URL = "wss://stream.binance.com:9443/ws"
+MIRROR_FILE = RUNTIME_DIR / "account_mirror.json"
+
+RECONCILE_INTERVAL = 300      # seconds between REST snapshots
+RECONCILE_AFTER_UPDATE = 2    # seconds after a balanceUpdate before re-reading borrowed amounts
+KEEPALIVE_INTERVAL = 30 * 60  # listenKey must be refreshed within 60 minutes
+HEARTBEAT_INTERVAL = 5        # the file is rewritten at least this often
+MAX_AGE = 30                  # readers ignore a mirror that has not written for this long
+
+ASSET_FIELDS = ("free", "locked", "borrowed", "interest")
+
+
+# ------------------------------------------------------------------------------
+# READ API (used by the scripts)
+# ------------------------------------------------------------------------------
+def read_margin_account(max_age=MAX_AGE):
+    """
+    Return the mirrored margin account in the /sapi/v1/margin/account shape,
+    or None if the mirror is not running or stale.
+    """
+    data = read_json(MIRROR_FILE, max_age=max_age)
+    if data is None:
+        return None
+    return data.get("account")
+
+
+def find_asset(account_info, asset):
+    """Return the userAssets entry for asset, or None."""
+    return next((a for a in account_info.get("userAssets", []) if a["asset"] == asset), None)
+
+
+# ------------------------------------------------------------------------------
+# MIRROR PROCESS
+# ------------------------------------------------------------------------------
+class AccountMirror:
+    def __init__(self, api_key, api_secret, reconcile_interval=RECONCILE_INTERVAL):
+        self.client = BinanceClient(api_key, api_secret)
+        self.reconcile_interval = reconcile_interval
+
+        self.assets = {}          # asset -> {free, locked, borrowed, interest}
+        self.account_fields = {}  # everything in the snapshot besides userAssets
+        self.reconciled_at = 0.0
+        self.published_at = 0.0
+        self.reconcile_due = None
+
+    # -------------------------- REST --------------------------
+    def reconcile(self):
+        account = self.client.get_margin_account()
+        self.assets = {
+            a["asset"]: {field: float(a.get(field, 0)) for field in ASSET_FIELDS}
+            for a in account.get("userAssets", [])
+        }
+        self.account_fields = {k: v for k, v in account.items() if k != "userAssets"}
+        self.reconciled_at = time.time()
+        self.reconcile_due = None
+        self.publish("rest")
+
+    # ------------------------- STREAM -------------------------
+    def apply_event(self, event):
+        """Apply one user data stream event. Returns False if the stream must be reopened."""
+        event_type = event.get("e")
+
+        if event_type == "outboundAccountPosition":
+            for balance in event.get("B", []):
+                entry = self.assets.setdefault(balance["a"], dict.fromkeys(ASSET_FIELDS, 0.0))
+                entry["free"] = float(balance["f"])
+                entry["locked"] = float(balance["l"])
+            self.publish("stream")
+
+        elif event_type == "balanceUpdate":
+            # The new free balance arrives with the matching outboundAccountPosition,
+            # but borrow / repay also move 'borrowed', which only REST reports
+            self.reconcile_due = time.time() + RECONCILE_AFTER_UPDATE
+
+        elif event_type == "executionReport" and event.get("x") == "TRADE":
+            push("fill", {
+                "t": event.get("T", event.get("E", 0)) / 1000,
+                "symbol": event.get("s"),
+                "side": event.get("S"),
+                "price": float(event.get("L", 0)),
+                "qty": float(event.get("l", 0)),
+                "status": event.get("X"),
+                "order_id": event.get("i"),
+            })
+
+        elif event_type == "listenKeyExpired":
+            return False
+
+        return True
+
+    def to_account(self):
+        """Build the REST-shaped account dict from the mirrored balances."""
+        user_assets = []
+        for asset, entry in sorted(self.assets.items()):
+            net_asset = entry["free"] + entry["locked"] - entry["borrowed"] - entry["interest"]
+            user_assets.append({
+                "asset": asset,
+                **{field: f"{entry[field]:.8f}" for field in ASSET_FIELDS},
+                "netAsset": f"{net_asset:.8f}",
+            })
+        return {**self.account_fields, "userAssets": user_assets}
+
+    def publish(self, source):
+        now = time.time()
+        write_json_atomic(MIRROR_FILE, {
+            "updated_at": now,
+            "reconciled_at": self.reconciled_at,
+            "source": source,
+            "account": self.to_account(),
+        })
+        self.published_at = now
+
+    async def follow_stream(self, listen_key):
+        keepalive_at = time.time()
+        async with websockets.connect(f"{USER_STREAM_URL}/{listen_key}", ping_interval=20) as ws:
+            print("User data stream connected.")
+            while True:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    raw = None
+
+                if raw is not None and not self.apply_event(json.loads(raw)):
+                    print("listenKey expired, reconnecting.")
+                    return
+
+                now = time.time()
+                if (now - self.reconciled_at > self.reconcile_interval
+                        or (self.reconcile_due is not None and now >= self.reconcile_due)):
+                    await asyncio.to_thread(self.reconcile)
+                if now - keepalive_at > KEEPALIVE_INTERVAL:
+                    await self.client.acall("keepalive_margin_listen_key", listen_key)
+                    keepalive_at = now
+                if now - self.published_at > HEARTBEAT_INTERVAL:
+                    self.publish("heartbeat")
+
+    async def run(self):
+        while True:
+            try:
+                # Events may have been missed while disconnected
+                await asyncio.to_thread(self.reconcile)
+                listen_key = await self.client.acall("create_margin_listen_key")
+                await self.follow_stream(listen_key)
+            except Exception as e:
+                print(f"[ERROR] Account mirror: {e}")
+            metrics.increment("websocket_reconnects_total", stream="account_mirror")
+            await asyncio.sleep(1)
+
+
+def main():
+    with open(CONFIG_FILE, "r") as f:
+        config = json5.load(f)
+
+    mirror = AccountMirror(
+        config["key"],
+        config["secret"],
+        reconcile_interval=float(config.get("account_reconcile_seconds", RECONCILE_INTERVAL)),
+    )
+    print(f"Mirroring cross margin account to {MIRROR_FILE}")
+    asyncio.run(mirror.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark REST vs websocket order placement against the local stand-in.
+
+Starts exchange.standin in-process and places the same N market slices:
+  - REST:            one signed request per slice over the pooled BinanceClient
+  - WS sequential:   one slice at a time over the open websocket
+  - WS pipelined:    all slices written back to back, acks collected afterwards
+
+Usage (from src/python):
+    python3 -m exchange.bench_orders --orders 20 --latency-ms 30
+"""
+
+import argparse
+import time
+
+from exchange.client import BinanceClient
+from exchange.standin import start_rest, start_ws
+from exchange.ws_orders import BinanceWsProtocol, OrderTransport
+
+API_KEY = "standin-key"
+API_SECRET = "standin-secret"
+
+
+def rest_place_factory(base_url):
+    client = BinanceClient(API_KEY, API_SECRET, base_url=base_url)
+
+    def rest_place(order):
+        return client.create_margin_order(**order)
+    return rest_place
+
+
+def time_run(label, run, num_orders):
+    start = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    print(f"{label:<16} {elapsed * 1000:9.1f} ms total  {elapsed * 1000 / num_orders:8.2f} ms/order  failed={failed}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="REST vs websocket order placement benchmark.")
+    parser.add_argument("--orders", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--ws-port", type=int, default=18765)
+    parser.add_argument("--rest-port", type=int, default=18766)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    start_rest("127.0.0.1", args.rest_port, 1.0, latency)
+    start_ws("127.0.0.1", args.ws_port, 1.0, latency)
+
+    orders = [
+        {"symbol": "SUIUSDC", "side": "BUY", "type": "MARKET", "quoteOrderQty": 10}
+        for _ in range(args.orders)
+    ]
+    rest_place = rest_place_factory(f"http://127.0.0.1:{args.rest_port}")
+    protocol = BinanceWsProtocol(API_KEY, API_SECRET, url=f"ws://127.0.0.1:{args.ws_port}")
+
+    rest = OrderTransport(rest_place, mode="rest")
+    ws = OrderTransport(rest_place, protocol=protocol, mode="ws")
+    # Open the socket up front, the scripts pay this once per run
+    ws.place_orders(orders[:1])
+
+    print(f"{args.orders} orders, simulated latency {args.latency_ms:.1f} ms")
+    rest_time = time_run("REST", lambda: rest.place_orders(orders), args.orders)
+    time_run("WS sequential", lambda: [ws.place_orders([o])[0] for o in orders], args.orders)
+    ws_time = time_run("WS pipelined", lambda: ws.place_orders(orders), args.orders)
+    print(f"Pipelined speedup over REST: {rest_time / ws_time:.1f}x")
+    ws.close()
+
+
+if __name__ == "__main__":
+    main()
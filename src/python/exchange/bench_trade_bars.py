@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Replay benchmark for the trade-stream aggregator (exchange.trade_bars).
+
+Replays a stream recorded with `python3 -m exchange.trade_bars --record FILE`,
+or a synthetic one (random walk, bursty timestamps) when no file is given,
+through the same decode + aggregate + kline store path as the live process,
+with the stores written to a temporary folder.
+
+Usage (from src/python):
+    python3 -m exchange.bench_trade_bars --trades 1000000
+    python3 -m exchange.bench_trade_bars --replay trades.jsonl
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from exchange.trade_bars import INTERVALS, KlineStoreWriter, TradeAggregator
+
+
+def synthetic_stream(num_trades, rate=20000, start_ms=1_700_000_000_000, seed=1):
+    """Raw @trade messages, about `rate` trades per second of stream time."""
+    rng = random.Random(seed)
+    price = 4.0
+    t = start_ms / 1000
+    messages = []
+    for trade_id in range(num_trades):
+        t += rng.expovariate(rate)
+        t_ms = int(t * 1000)
+        price *= 1 + rng.gauss(0, 1e-4)
+        messages.append(json.dumps({
+            "e": "trade", "E": t_ms + 3, "s": "SUIUSDC", "t": trade_id,
+            "p": f"{price:.4f}", "q": f"{rng.uniform(1, 500):.1f}",
+            "T": t_ms, "m": rng.random() < 0.5, "M": True,
+        }))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade aggregator replay benchmark.")
+    parser.add_argument("--replay", help="JSON lines file recorded with exchange.trade_bars --record")
+    parser.add_argument("--trades", type=int, default=1_000_000, help="synthetic trades when not replaying")
+    parser.add_argument("--rate", type=int, default=20000, help="synthetic trades per second of stream time")
+    args = parser.parse_args()
+
+    if args.replay:
+        with open(args.replay, "r") as f:
+            messages = [line for line in f if line.strip()]
+        source = args.replay
+    else:
+        messages = synthetic_stream(args.trades, args.rate)
+        source = f"synthetic, {args.rate} trades/s"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writers = {seconds: KlineStoreWriter(Path(tmp) / f"bars-{seconds}s.csv") for seconds in INTERVALS}
+        aggregator = TradeAggregator(writers=writers, publish=False)
+        clock_ms = None
+
+        start = time.perf_counter()
+        for message in messages:
+            trade = json.loads(message)
+            aggregator.on_trade(trade)
+            # The live process checks the clock every 50 ms of wall time
+            if clock_ms is None or trade["T"] - clock_ms >= 50:
+                clock_ms = trade["T"]
+                aggregator.on_clock(clock_ms)
+        elapsed = time.perf_counter() - start
+        for writer in writers.values():
+            writer.close()
+
+    stream_seconds = (json.loads(messages[-1])["T"] - json.loads(messages[0])["T"]) / 1000 if messages else 0
+    print(f"{len(messages)} trades ({source}), {stream_seconds:.0f} s of stream")
+    print(f"{elapsed:.2f} s total, {len(messages) / elapsed:,.0f} trades/s, {elapsed / len(messages) * 1e6:.2f} us/trade")
+    for series in aggregator.series:
+        print(f"  {series.seconds:>3}s bars: {series.closed} closed, {series.late} late trades")
+
+
+if __name__ == "__main__":
+    main()
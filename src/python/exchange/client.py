@@ -0,0 +1,381 @@
+"""
+Pooled REST clients shared by the buy/sell/equity/borrow scripts.
+
+One client per exchange wraps
+  - a keep-alive requests.Session per exchange, shared by every client in the
+    process, so an order script pays one TLS handshake instead of one per call
+  - the HMAC key prepared once; each signature copies it and feeds the payload
+  - rate-limit accounting: the weight headers of every response are recorded
+    (and reported to exchange.metrics) and the next request waits for the
+    window to roll over once the soft limit is reached. A 429/418 (or bybit
+    retCode 10006) is written to src/dist/runtime/rate_limit_<exchange>.json,
+    so the next script run waits for the ban too instead of extending it.
+  - retries with exponential backoff for connection errors and 5xx answers,
+    only for GET/PUT/DELETE. A POST may already have reached the exchange (it
+    can be an order) and is only repeated after a rate-limit answer, which
+    means it was not executed.
+
+Timestamps come from exchange.server_clock, or from timestamp_offset when a
+script sets it (sync_client does). The shared clock measures binance, so
+MexcClient asks MEXC's own /api/v3/time once before its first signed request.
+
+BinanceClient keeps the python-binance method names the scripts already call
+(get_margin_account, create_margin_order, ...), and raises ExchangeAPIError
+with the same .code / .message attributes as BinanceAPIException.
+
+Every blocking call has an awaitable form, acall() and arequest(), which run it
+on a worker thread, so async code shares the same sessions and limits.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from exchange import metrics
+from exchange.server_clock import server_timestamp_ms
+from exchange.state import RUNTIME_DIR, read_json, write_json_atomic
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_RECV_WINDOW = 5000
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5       # seconds, doubled after every failed attempt
+MAX_RETRY_WAIT = 60      # longer bans are raised instead of waited out
+SOFT_LIMIT = 0.9         # fraction of a weight limit the client allows itself
+POOL_SIZE = 16
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class ExchangeAPIError(Exception):
+    """The exchange answered with an error code."""
+
+    def __init__(self, status_code, code, message, payload=None):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.payload = payload
+
+
+class ExchangeRequestError(Exception):
+    """The request failed before the exchange gave a usable answer."""
+
+
+def get_session(exchange):
+    """Return the process-wide keep-alive session for an exchange."""
+    with _sessions_lock:
+        session = _sessions.get(exchange)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[exchange] = session
+        return session
+
+
+# ------------------------------------------------------------------------------
+# RATE LIMITS
+# ------------------------------------------------------------------------------
+class RateLimiter:
+    """
+    Tracks when the next request may be sent. The client feeds it from the
+    response headers; bans are shared between processes through a state file.
+    """
+
+    def __init__(self, exchange):
+        self.state_file = RUNTIME_DIR / f"rate_limit_{exchange}.json"
+        self.not_before = 0.0
+        self.lock = threading.Lock()
+
+    def hold_until(self, until):
+        with self.lock:
+            self.not_before = max(self.not_before, until)
+
+    def ban(self, seconds):
+        until = time.time() + seconds
+        self.hold_until(until)
+        write_json_atomic(self.state_file, {"updated_at": time.time(), "banned_until": until})
+
+    def wait(self):
+        shared = read_json(self.state_file) or {}
+        until = max(self.not_before, float(shared.get("banned_until", 0)))
+        delay = until - time.time()
+        if delay > 0:
+            print(f"[Rate Limit] Waiting {delay:.1f}s")
+            time.sleep(delay)
+
+
+# ------------------------------------------------------------------------------
+# BASE CLIENT
+# ------------------------------------------------------------------------------
+class ExchangeClient:
+    exchange = None
+    base_url = None
+
+    def __init__(self, api_key=None, api_secret=None, base_url=None,
+                 recv_window=DEFAULT_RECV_WINDOW, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url or self.base_url
+        self.recv_window = recv_window
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.timestamp_offset = None  # ms; None uses the shared exchange clock
+        self.session = get_session(self.exchange)
+        self.limits = RateLimiter(self.exchange)
+        self._mac = hmac.new(api_secret.encode(), digestmod=hashlib.sha256) if api_secret else None
+
+    # ------------------------ SIGNING -------------------------
+    def sign(self, payload):
+        mac = self._mac.copy()
+        mac.update(payload.encode())
+        return mac.hexdigest()
+
+    def timestamp(self):
+        if self.timestamp_offset is None:
+            return server_timestamp_ms()
+        return int(time.time() * 1000 + self.timestamp_offset)
+
+    def prepare(self, method, params, signed):
+        """Return the keyword arguments for session.request()."""
+        raise NotImplementedError
+
+    # ------------------------ ANSWERS -------------------------
+    def track_limits(self, response):
+        """Record the rate-limit headers of a response."""
+
+    def rate_limited(self, response, data):
+        """Return seconds to back off if the exchange refused for rate limits, else None."""
+        if response.status_code in (418, 429):
+            return float(response.headers.get("Retry-After", 60))
+        return None
+
+    def check(self, response, data):
+        """Raise ExchangeAPIError for an error answer, otherwise return data."""
+        if response.status_code >= 400:
+            if isinstance(data, dict):
+                raise ExchangeAPIError(response.status_code, data.get("code"), data.get("msg"), data)
+            raise ExchangeAPIError(response.status_code, None, response.text)
+        return data
+
+    # ------------------------ REQUESTS ------------------------
+    def request(self, method, path, params=None, signed=False):
+        method = method.upper()
+        idempotent = method != "POST"
+        attempt = 0
+
+        while True:
+            attempt += 1
+            self.limits.wait()
+            kwargs = self.prepare(method, dict(params or {}), signed)
+            try:
+                response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                if idempotent and attempt <= self.max_retries:
+                    time.sleep(BACKOFF_BASE * 2 ** (attempt - 1))
+                    continue
+                raise ExchangeRequestError(f"{method} {path} failed: {e}") from e
+
+            self.track_limits(response)
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+
+            backoff = self.rate_limited(response, data)
+            if backoff is not None:
+                metrics.increment("rest_rate_limited_total", exchange=self.exchange)
+                self.limits.ban(backoff)
+                if attempt <= self.max_retries and backoff <= MAX_RETRY_WAIT:
+                    continue
+                code = data.get("code", data.get("retCode")) if isinstance(data, dict) else None
+                raise ExchangeAPIError(response.status_code, code, f"Rate limited for {backoff:.0f}s", data)
+
+            if response.status_code >= 500 and idempotent and attempt <= self.max_retries:
+                time.sleep(BACKOFF_BASE * 2 ** (attempt - 1))
+                continue
+
+            if data is None and response.status_code < 400:
+                raise ExchangeRequestError(f"{method} {path}: invalid JSON answer: {response.text[:200]}")
+            return self.check(response, data)
+
+    def get(self, path, params=None, signed=False):
+        return self.request("GET", path, params, signed)
+
+    def post(self, path, params=None, signed=False):
+        return self.request("POST", path, params, signed)
+
+    def put(self, path, params=None, signed=False):
+        return self.request("PUT", path, params, signed)
+
+    def delete(self, path, params=None, signed=False):
+        return self.request("DELETE", path, params, signed)
+
+    # ------------------------- ASYNC --------------------------
+    async def arequest(self, method, path, params=None, signed=False):
+        return await asyncio.to_thread(self.request, method, path, params, signed)
+
+    async def acall(self, name, *args, **kwargs):
+        """Await any client method, e.g. await client.acall("get_margin_account")."""
+        return await asyncio.to_thread(getattr(self, name), *args, **kwargs)
+
+
+# ------------------------------------------------------------------------------
+# BINANCE / MEXC (same signing scheme)
+# ------------------------------------------------------------------------------
+class BinanceClient(ExchangeClient):
+    exchange = "binance"
+    base_url = "https://api.binance.com"
+    key_header = "X-MBX-APIKEY"
+    # response header -> (limit, window seconds)
+    weight_limits = {
+        "X-MBX-USED-WEIGHT-1M": (6000, 60),
+        "X-SAPI-USED-IP-WEIGHT-1M": (12000, 60),
+        "X-SAPI-USED-UID-WEIGHT-1M": (180000, 60),
+    }
+
+    def prepare(self, method, params, signed):
+        headers = {self.key_header: self.api_key} if self.api_key else {}
+        if signed:
+            params["recvWindow"] = self.recv_window
+            params["timestamp"] = self.timestamp()
+            query = urlencode(params)
+            query = f"{query}&signature={self.sign(query)}"
+        else:
+            query = urlencode(params)
+        return {"headers": headers, "params": query}
+
+    def track_limits(self, response):
+        now = time.time()
+        for header, (limit, window) in self.weight_limits.items():
+            used = response.headers.get(header)
+            if used is None:
+                continue
+            metrics.set_gauge("rest_weight_used", int(used), window, exchange=self.exchange, limit=header)
+            metrics.set_gauge("rest_weight_limit", limit, exchange=self.exchange, limit=header)
+            if int(used) >= limit * SOFT_LIMIT:
+                self.limits.hold_until((now // window + 1) * window)
+
+    # ------------------------ MARKET --------------------------
+    def get_server_time(self):
+        return self.get("/api/v3/time")
+
+    def get_symbol_ticker(self, symbol):
+        return self.get("/api/v3/ticker/price", {"symbol": symbol})
+
+    def get_exchange_info(self, symbol=None):
+        return self.get("/api/v3/exchangeInfo", {"symbol": symbol} if symbol else None)
+
+    # ------------------------ MARGIN --------------------------
+    def get_margin_account(self):
+        return self.get("/sapi/v1/margin/account", signed=True)
+
+    def get_max_margin_loan(self, asset, **params):
+        return self.get("/sapi/v1/margin/maxBorrowable", {"asset": asset, **params}, signed=True)
+
+    def create_margin_order(self, **params):
+        return self.post("/sapi/v1/margin/order", params, signed=True)
+
+    def create_margin_loan(self, asset, amount, **params):
+        return self.post("/sapi/v1/margin/borrow-repay",
+                         {"asset": asset, "amount": amount, "isIsolated": "FALSE", "type": "BORROW", **params},
+                         signed=True)
+
+    def repay_margin_loan(self, asset, amount, **params):
+        return self.post("/sapi/v1/margin/borrow-repay",
+                         {"asset": asset, "amount": amount, "isIsolated": "FALSE", "type": "REPAY", **params},
+                         signed=True)
+
+    def create_margin_listen_key(self):
+        return self.post("/sapi/v1/userDataStream")["listenKey"]
+
+    def keepalive_margin_listen_key(self, listen_key):
+        return self.put("/sapi/v1/userDataStream", {"listenKey": listen_key})
+
+
+class MexcClient(BinanceClient):
+    exchange = "mexc"
+    base_url = "https://api.mexc.com"
+    key_header = "X-MEXC-APIKEY"
+    weight_limits = {}
+
+    def timestamp(self):
+        # exchange.server_clock measures binance; MEXC's offset is measured once per client
+        if self.timestamp_offset is None:
+            server_time = self.get_server_time()["serverTime"]
+            self.timestamp_offset = server_time - int(time.time() * 1000)
+        return super().timestamp()
+
+    def get_account(self):
+        return self.get("/api/v3/account", signed=True)
+
+
+# ------------------------------------------------------------------------------
+# BYBIT (v5 header signing)
+# ------------------------------------------------------------------------------
+class BybitClient(ExchangeClient):
+    exchange = "bybit"
+    base_url = "https://api.bybit.com"
+
+    def prepare(self, method, params, signed):
+        headers = {"Content-Type": "application/json"}
+        if method == "GET":
+            payload = urlencode(sorted(params.items()))
+            kwargs = {"params": payload}
+        else:
+            payload = json.dumps(params, separators=(",", ":"))
+            kwargs = {"data": payload}
+        if signed:
+            timestamp = str(self.timestamp())
+            recv_window = str(self.recv_window)
+            headers.update({
+                "X-BAPI-API-KEY": self.api_key,
+                "X-BAPI-TIMESTAMP": timestamp,
+                "X-BAPI-RECV-WINDOW": recv_window,
+                "X-BAPI-SIGN": self.sign(timestamp + self.api_key + recv_window + payload),
+            })
+        kwargs["headers"] = headers
+        return kwargs
+
+    def track_limits(self, response):
+        remaining = response.headers.get("X-Bapi-Limit-Status")
+        reset_ms = response.headers.get("X-Bapi-Limit-Reset-Timestamp")
+        limit = response.headers.get("X-Bapi-Limit")
+        if remaining is not None and limit is not None:
+            # bybit limits per endpoint and second, and reports what is left of it
+            endpoint = response.request.path_url.split("?", 1)[0]
+            metrics.set_gauge("rest_weight_used", int(limit) - int(remaining), 1, exchange=self.exchange,
+                              limit=endpoint)
+            metrics.set_gauge("rest_weight_limit", int(limit), exchange=self.exchange, limit=endpoint)
+        if remaining is not None and reset_ms is not None and int(remaining) <= 1:
+            self.limits.hold_until(int(reset_ms) / 1000)
+
+    def rate_limited(self, response, data):
+        if isinstance(data, dict) and data.get("retCode") == 10006:
+            reset_ms = response.headers.get("X-Bapi-Limit-Reset-Timestamp")
+            return max(int(reset_ms) / 1000 - time.time(), 1) if reset_ms else 1
+        return super().rate_limited(response, data)
+
+    def check(self, response, data):
+        if isinstance(data, dict) and data.get("retCode", 0) != 0:
+            raise ExchangeAPIError(response.status_code, data.get("retCode"), data.get("retMsg"), data)
+        if response.status_code >= 400:
+            raise ExchangeAPIError(response.status_code, None, response.text)
+        return data
+
+    def get_wallet_balance(self, account_type="UNIFIED"):
+        return self.get("/v5/account/wallet-balance", {"accountType": account_type}, signed=True)
+
+    def get_tickers(self, category, symbol):
+        return self.get("/v5/market/tickers", {"category": category, "symbol": symbol})
+
+    def place_order(self, **params):
+        return self.post("/v5/order/create", params, signed=True)
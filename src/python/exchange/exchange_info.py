@@ -0,0 +1,181 @@
+"""
+Cached binance exchange info, one entry per symbol.
+
+client.get_exchange_info() downloads every symbol on the exchange (several MB)
+just to check one of them. This cache asks /api/v3/exchangeInfo for the one
+symbol that is needed, keeps the fields the scripts use and stores them in
+src/dist/runtime/exchange_info.json. An entry is refreshed when it is older than
+the TTL; if the refresh fails the stale entry is still returned.
+
+Lookups are dict hits on the in-process copy of that file, so the buy/sell
+scripts and the simulators can round quantities to the real LOT_SIZE without
+extra calls.
+"""
+
+import time
+from decimal import Decimal, ROUND_DOWN
+
+from exchange.client import BinanceClient, ExchangeAPIError
+from exchange.state import RUNTIME_DIR, read_json, write_json_atomic
+
+CACHE_FILE = RUNTIME_DIR / "exchange_info.json"
+DEFAULT_TTL = 6 * 3600  # filters rarely change, status is what we really re-check
+QUOTE_ASSETS = ("USDC", "USDT", "FDUSD", "BTC", "ETH", "BNB")  # used when a symbol is not cached
+
+_symbols = None  # in-process copy of the cache file: symbol -> info dict
+
+
+# ------------------------------------------------------------------------------
+# CACHE
+# ------------------------------------------------------------------------------
+def _load():
+    global _symbols
+    if _symbols is None:
+        data = read_json(CACHE_FILE) or {}
+        _symbols = data.get("symbols", {})
+    return _symbols
+
+
+def _save():
+    write_json_atomic(CACHE_FILE, {"updated_at": time.time(), "symbols": _symbols})
+
+
+def parse_symbol(raw):
+    """Keep only the fields the scripts use from one exchangeInfo symbol entry."""
+    filters = {f["filterType"]: f for f in raw.get("filters", [])}
+    lot_size = filters.get("LOT_SIZE", {})
+    price_filter = filters.get("PRICE_FILTER", {})
+    # Binance replaced MIN_NOTIONAL with NOTIONAL on most symbols
+    notional = filters.get("NOTIONAL") or filters.get("MIN_NOTIONAL") or {}
+    return {
+        "symbol": raw["symbol"],
+        "status": raw.get("status"),
+        "base_asset": raw.get("baseAsset"),
+        "quote_asset": raw.get("quoteAsset"),
+        "base_precision": raw.get("baseAssetPrecision"),
+        "quote_precision": raw.get("quoteAssetPrecision", raw.get("quotePrecision")),
+        "step_size": lot_size.get("stepSize"),
+        "min_qty": lot_size.get("minQty"),
+        "max_qty": lot_size.get("maxQty"),
+        "tick_size": price_filter.get("tickSize"),
+        "min_notional": notional.get("minNotional"),
+        "fetched_at": time.time(),
+    }
+
+
+def fetch_symbol(symbol):
+    """Download exchange info for a single symbol. Returns None if it does not exist."""
+    try:
+        data = BinanceClient().get_exchange_info(symbol)
+    except ExchangeAPIError as e:
+        if e.code == -1121:  # Invalid symbol
+            return None
+        raise
+    symbols = data.get("symbols", [])
+    return parse_symbol(symbols[0]) if symbols else None
+
+
+def get_symbol_info(symbol, ttl=DEFAULT_TTL, refresh=True):
+    """
+    Return the cached info dict for symbol (see parse_symbol), refreshing it
+    from the exchange when missing or older than ttl seconds.
+    With refresh=False only the cache is consulted (used by the simulators).
+    """
+    symbol = symbol.upper()
+    symbols = _load()
+    entry = symbols.get(symbol)
+
+    if not refresh:
+        return entry
+    if entry is not None and time.time() - entry.get("fetched_at", 0) < ttl:
+        return entry
+
+    try:
+        fresh = fetch_symbol(symbol)
+    except Exception as e:
+        print(f"[WARNING] Could not refresh exchange info for {symbol}: {e}")
+        return entry
+
+    if fresh is None:
+        symbols.pop(symbol, None)
+    else:
+        symbols[symbol] = fresh
+    _save()
+    return fresh
+
+
+def split_pair(symbol, refresh=True):
+    """
+    Return (base_asset, quote_asset) for a pair like 'SUIUSDC', from the cached
+    exchange info, or by its quote suffix when the symbol is not known.
+    """
+    info = get_symbol_info(symbol, refresh=refresh)
+    if info and info.get("base_asset") and info.get("quote_asset"):
+        return info["base_asset"], info["quote_asset"]
+    symbol = symbol.upper()
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    raise ValueError(f"Cannot split trading pair '{symbol}' into base and quote assets.")
+
+
+# ------------------------------------------------------------------------------
+# ROUNDING
+# ------------------------------------------------------------------------------
+def round_step(value, step):
+    """Round value down to a multiple of step, exactly (Decimal)."""
+    value = Decimal(str(value))
+    step = Decimal(str(step))
+    if step <= 0:
+        return value
+    return (value / step).to_integral_value(rounding=ROUND_DOWN) * step
+
+
+def format_quantity(quantity):
+    """A quantity in plain decimal notation for an order (str(Decimal) gives '1E-7')."""
+    return format(Decimal(str(quantity)), "f")
+
+
+def round_quantity(symbol, quantity):
+    """
+    Round a base-asset quantity down to the symbol's LOT_SIZE step.
+    Falls back to whole units (the old math.floor) if the symbol is unknown.
+    """
+    info = get_symbol_info(symbol)
+    step = info.get("step_size") if info else None
+    return round_step(quantity, step or 1)
+
+
+def split_quantity(symbol, quantity, parts):
+    """
+    Split quantity into at most `parts` LOT_SIZE aligned slices. The last slice
+    takes the remainder. Slices below minQty are merged, so fewer slices may be
+    returned. Returns a list of Decimals.
+    """
+    info = get_symbol_info(symbol) or {}
+    step = Decimal(info.get("step_size") or 1)
+    min_qty = Decimal(info.get("min_qty") or 0)
+    total = round_step(quantity, step)
+    parts = max(int(parts), 1)
+
+    while parts > 1:
+        slice_size = round_step(total / parts, step)
+        if slice_size > 0 and slice_size >= min_qty:
+            break
+        parts -= 1
+
+    if parts == 1:
+        return [total] if total > 0 else []
+
+    slices = [slice_size] * (parts - 1)
+    slices.append(total - slice_size * (parts - 1))
+    return slices
+
+
+def max_orders_for_notional(symbol, total_quote, num_orders):
+    """Reduce num_orders until each quote slice meets the symbol's minimum notional."""
+    info = get_symbol_info(symbol) or {}
+    min_notional = float(info.get("min_notional") or 0)
+    while num_orders > 1 and total_quote / num_orders < min_notional:
+        num_orders -= 1
+    return num_orders
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Metrics exporter: data freshness, recompute latency and order execution health.
+
+Run it as a long-lived process next to keep-fetching.py:
+
+    cd src/python && python3 -m exchange.metrics
+
+and scrape it locally:
+
+    http://127.0.0.1:8022/metrics        Prometheus text format
+    http://127.0.0.1:8022/metrics.json   the same as JSON, with the health verdict
+    http://127.0.0.1:8022/health         200 or 503 with the stale checks
+
+Two kinds of data end up here. Files are read at scrape time, so they are
+right even when the exporter was restarted:
+
+    last kline       the last row of input_file (the kline store recompute.py
+                     reads): its close time and age
+    recompute        new records of src/dist/runtime/stage_metrics.jsonl
+                     (stage_metrics.py): cycle and stage durations, failures
+
+Events are sent by the producers like push_hub.push(): one UDP datagram to
+127.0.0.1, no disk I/O, nothing happens when the exporter is not running.
+
+    websocket_reconnects_total    keep-fetching.py, exchange.trade_bars,
+                                  exchange.stop_monitor, exchange.account_mirror
+    rest_weight_used / _limit     exchange.client, from the weight headers
+    rest_rate_limited_total       exchange.client, 429/418 answers
+    kline_close_to_signal_seconds dist/execute_orders.py, when it sees a new trade
+    signal_to_order_ack_seconds   the order scripts, first ack after the signal
+    order_slippage_percent        the order scripts, fill against the signal price
+
+Every name is exported with the "trader_" prefix. `--check` asks a running
+exporter for /health and prints the verdict (server_diag.sh uses it).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import sys
+import time
+import urllib.request
+
+import json5
+
+from exchange.state import CONFIG_FILE, RUNTIME_DIR
+
+METRICS_HOST = "127.0.0.1"
+HTTP_PORT = 8022           # scrapes
+EVENT_PORT = 8023          # UDP, producers
+PREFIX = "trader_"
+
+STAGE_METRICS_FILE = RUNTIME_DIR / "stage_metrics.jsonl"
+KLINE_STALE_SECONDS = 180  # default of "metrics_kline_stale_seconds"
+CYCLE_STALE_SECONDS = 120  # default of "metrics_cycle_stale_seconds"
+TAIL_BYTES = 4096          # end of the kline store read per scrape
+MAX_DATAGRAM = 65000
+
+# Environment handed from execute_orders.py to the order scripts it starts
+SIGNAL_TIME_ENV = "DIST_SIGNAL_TIME"
+SIGNAL_PRICE_ENV = "DIST_SIGNAL_PRICE"
+
+LATENCY_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 300)
+ACK_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+SLIPPAGE_BUCKETS = (-1, -0.5, -0.25, -0.1, -0.05, 0, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "last_kline_close_time_seconds": ("gauge", "Close time of the last kline in the store (unix seconds)", None),
+    "last_kline_age_seconds": ("gauge", "Seconds since the close of the last kline in the store", None),
+    "kline_stale": ("gauge", "1 when the last kline is older than the stale limit", None),
+    "websocket_reconnects_total": ("counter", "Websocket disconnects followed by a reconnect", None),
+    "recompute_duration_seconds": ("histogram", "Duration of a recompute.py cycle", LATENCY_BUCKETS),
+    "recompute_stage_duration_seconds": ("histogram", "Duration of a recompute.py stage", LATENCY_BUCKETS),
+    "recompute_stage_failures_total": ("counter", "Stages that exited with an error", None),
+    "recompute_over_budget_total": ("counter", "Cycles longer than the bucle.py budget", None),
+    "recompute_last_duration_seconds": ("gauge", "Duration of the last recompute.py cycle", None),
+    "recompute_last_finished_age_seconds": ("gauge", "Seconds since the last recompute.py cycle finished", None),
+    "recompute_stale": ("gauge", "1 when no cycle finished within the stale limit", None),
+    "kline_close_to_signal_seconds": ("histogram", "From the close of the signal's kline to execute_orders.py "
+                                                   "acting on it", LATENCY_BUCKETS),
+    "signal_to_order_ack_seconds": ("histogram", "From the signal to the exchange's first order ack", ACK_BUCKETS),
+    "order_slippage_percent": ("histogram", "Fill price against the signal price, positive = worse",
+                               SLIPPAGE_BUCKETS),
+    "rest_weight_used": ("gauge", "Request weight used in the current window", None),
+    "rest_weight_limit": ("gauge", "Request weight limit of the window", None),
+    "rest_rate_limited_total": ("counter", "Requests refused for rate limits (429/418)", None),
+    "metrics_events_total": ("counter", "Events received from the producers", None),
+}
+
+
+# ------------------------------------------------------------------------------
+# PRODUCER API
+# ------------------------------------------------------------------------------
+_socket = None
+_acked = False
+
+
+def _send(kind, name, value, labels, host=METRICS_HOST, port=EVENT_PORT):
+    """Send one event to the exporter. Never blocks and never raises."""
+    global _socket
+    try:
+        if _socket is None:
+            _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _socket.setblocking(False)
+        payload = json.dumps({"kind": kind, "name": name, "value": value, "labels": labels, "time": time.time()},
+                             separators=(",", ":")).encode()
+        if len(payload) <= MAX_DATAGRAM:
+            _socket.sendto(payload, (host, port))
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+def increment(name, amount=1, **labels):
+    _send("counter", name, amount, labels)
+
+
+def observe(name, value, **labels):
+    _send("histogram", name, value, labels)
+
+
+def set_gauge(name, value, window=None, **labels):
+    """A gauge; with `window` (seconds) it reads 0 once that window rolled over."""
+    _send("gauge", name, value, dict(labels, _window=window) if window else labels)
+
+
+def order_acked(side, response=None):
+    """
+    Record an acknowledged order of a script started by execute_orders.py:
+    the signal-to-ack latency (first ack of the script only) and, for a filled
+    order response, its slippage against the signal price.
+    """
+    global _acked
+    signal_time = os.environ.get(SIGNAL_TIME_ENV)
+    if not signal_time:
+        return
+    try:
+        if not _acked:
+            _acked = True
+            observe("signal_to_order_ack_seconds", time.time() - float(signal_time), side=side)
+        signal_price = float(os.environ.get(SIGNAL_PRICE_ENV) or 0)
+        executed = float((response or {}).get("executedQty", 0))
+        quote = float((response or {}).get("cummulativeQuoteQty", 0))
+    except (TypeError, ValueError):
+        return
+    if signal_price > 0 and executed > 0:
+        slippage = (quote / executed - signal_price) / signal_price * 100
+        observe("order_slippage_percent", slippage if side == "buy" else -slippage, side=side)
+
+
+# ------------------------------------------------------------------------------
+# EXPORTER
+# ------------------------------------------------------------------------------
+def label_key(labels):
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def format_labels(key, extra=()):
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    escape = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # label key -> [count per bucket..., +Inf count], sum
+
+    def observe(self, key, value):
+        counts, total = self.series.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self.series[key] = (counts, total + value)
+
+
+class KlineStore:
+    """Close time of the last row of the kline store, re-read only when the file changed."""
+
+    def __init__(self, path, interval=None):
+        self.path = path
+        self.interval = interval
+        self.stamp = None
+        self.close_time = None
+
+    def last_close(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != self.stamp:
+            self.stamp = (stat.st_size, stat.st_mtime_ns)
+            start = max(0, stat.st_size - TAIL_BYTES)
+            with open(self.path, "rb") as f:
+                f.seek(start)
+                lines = f.read().decode(errors="replace").splitlines()
+            if start:
+                # The first line is cut
+                lines = lines[1:]
+            times = []
+            for line in lines:
+                try:
+                    times.append(float(re.split(r"[|,]", line, 1)[0]))
+                except ValueError:
+                    continue
+            if times:
+                steps = sorted(b - a for a, b in zip(times, times[1:]) if b > a)
+                interval = self.interval or (steps[len(steps) // 2] if steps else 60)
+                # Rows carry the open time of their bar
+                self.close_time = times[-1] + interval
+        return self.close_time
+
+
+class StageMetricsTail:
+    """Follows stage_metrics.jsonl and hands every new cycle record to a callback."""
+
+    def __init__(self, path, on_record):
+        self.path = path
+        self.on_record = on_record
+        self.inode = None
+        self.offset = 0
+        self.last = None
+
+    def read(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        first = self.inode is None
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            # New or rotated file: on the first read only its last record counts
+            self.inode = stat.st_ino
+            self.offset = max(0, stat.st_size - 256 * 1024) if first else 0
+        if stat.st_size == self.offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(stat.st_size - self.offset)
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        lines = data[:end].splitlines()
+        if first:
+            lines = lines[-1:]
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self.last = record
+            if not first:
+                self.on_record(record)
+
+
+class MetricsExporter:
+    def __init__(self, config):
+        self.config = config
+        self.counters = {}     # name -> {label key: value}
+        self.gauges = {}       # name -> {label key: (value, time, window)}
+        self.histograms = {name: Histogram(buckets) for name, (kind, _, buckets) in METRICS.items()
+                           if kind == "histogram"}
+        self.kline_stale_after = float(config.get("metrics_kline_stale_seconds", KLINE_STALE_SECONDS))
+        self.cycle_stale_after = float(config.get("metrics_cycle_stale_seconds", CYCLE_STALE_SECONDS))
+        input_file = config.get("input_file")
+        self.store = KlineStore(CONFIG_FILE.parent / input_file, config.get("interval_seconds")) if input_file else None
+        self.cycles = StageMetricsTail(STAGE_METRICS_FILE, self.on_cycle)
+
+    # ------------------------- INGEST -------------------------
+    def add(self, name, amount=1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = label_key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def on_cycle(self, record):
+        """One new recompute.py cycle. Profiled cycles only count as failures, not as durations."""
+        profiled = any(stage.get("profiled") for stage in record["stages"])
+        if not profiled:
+            self.histograms["recompute_duration_seconds"].observe((), record["seconds"])
+        if record.get("over_budget"):
+            self.add("recompute_over_budget_total")
+        for stage in record["stages"]:
+            if not stage.get("profiled"):
+                self.histograms["recompute_stage_duration_seconds"].observe(
+                    label_key({"stage": stage["stage"]}), stage["seconds"])
+            if stage.get("status"):
+                self.add("recompute_stage_failures_total", stage=stage["stage"])
+
+    def datagram_received(self, data, addr):
+        try:
+            event = json.loads(data)
+            name, kind, value = event["name"], event["kind"], float(event["value"])
+            labels = dict(event.get("labels") or {})
+        except (ValueError, KeyError, TypeError):
+            return
+        if METRICS.get(name, (None,))[0] != kind or not math.isfinite(value):
+            return
+        self.add("metrics_events_total")
+        if kind == "counter":
+            self.add(name, value, **labels)
+        elif kind == "histogram":
+            self.histograms[name].observe(label_key(labels), value)
+        else:
+            window = labels.pop("_window", None)
+            self.gauges.setdefault(name, {})[label_key(labels)] = (value, float(event.get("time", time.time())),
+                                                                   window)
+
+    # -------------------------- VIEW --------------------------
+    def collect(self):
+        """{name: [(label key, value)]} of the counters and gauges, with the file-based ones read now."""
+        now = time.time()
+        self.cycles.read()
+        values = {name: list(series.items()) for name, series in self.counters.items()}
+        for name, series in self.gauges.items():
+            # A weight reported in an earlier window says nothing about the current one
+            values[name] = [(key, value if not window or now // window == reported // window else 0)
+                            for key, (value, reported, window) in series.items()]
+
+        close_time = self.store.last_close() if self.store else None
+        if close_time is not None:
+            values["last_kline_close_time_seconds"] = [((), close_time)]
+            values["last_kline_age_seconds"] = [((), round(now - close_time, 3))]
+        values["kline_stale"] = [((), int(close_time is None or now - close_time > self.kline_stale_after))]
+
+        last = self.cycles.last
+        finished = last["started_ts"] + last["seconds"] if last else None
+        if last:
+            values["recompute_last_duration_seconds"] = [((), last["seconds"])]
+            values["recompute_last_finished_age_seconds"] = [((), round(now - finished, 3))]
+        values["recompute_stale"] = [((), int(finished is None or now - finished > self.cycle_stale_after))]
+        return values
+
+    def health(self, values):
+        problems = []
+        if values["kline_stale"][0][1]:
+            age = values.get("last_kline_age_seconds")
+            problems.append(f"no new kline in the store for {age[0][1]:.0f} s" if age else "no kline store")
+        if values["recompute_stale"][0][1]:
+            age = values.get("recompute_last_finished_age_seconds")
+            problems.append(f"no recompute cycle for {age[0][1]:.0f} s" if age else "no recompute cycle yet")
+        return {"ok": not problems, "problems": problems}
+
+    def prometheus(self):
+        values = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            full = PREFIX + name
+            if kind == "histogram":
+                series = self.histograms[name].series
+                if not series:
+                    continue
+                lines += [f"# HELP {full} {help_text}", f"# TYPE {full} histogram"]
+                for key, (counts, total) in sorted(series.items()):
+                    for bound, count in zip([*map(str, buckets), "+Inf"], counts):
+                        lines.append(f"{full}_bucket{format_labels(key, [('le', bound)])} {count}")
+                    lines.append(f"{full}_sum{format_labels(key)} {format_value(total)}")
+                    lines.append(f"{full}_count{format_labels(key)} {counts[-1]}")
+            elif values.get(name):
+                lines += [f"# HELP {full} {help_text}", f"# TYPE {full} {kind}"]
+                lines += [f"{full}{format_labels(key)} {format_value(value)}" for key, value in sorted(values[name])]
+        return "\n".join(lines) + "\n"
+
+    def json(self):
+        values = self.collect()
+        metrics = {}
+        for name, (kind, _, buckets) in METRICS.items():
+            if kind == "histogram":
+                series = [{"labels": dict(key), "count": counts[-1], "sum": round(total, 6),
+                           "buckets": dict(zip([*map(str, buckets), "+Inf"], counts))}
+                          for key, (counts, total) in sorted(self.histograms[name].series.items())]
+            else:
+                series = [{"labels": dict(key), "value": value} for key, value in sorted(values.get(name, []))]
+            if series:
+                metrics[PREFIX + name] = {"type": kind, "series": series}
+        return {"generated_at": round(time.time(), 3), "health": self.health(values), "metrics": metrics}
+
+    # --------------------------- HTTP ---------------------------
+    async def handle_http(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request_line[1].split("?", 1)[0].rstrip("/") if len(request_line) >= 2 else None
+            status = "200 OK"
+            if path == "/metrics":
+                body, content_type = self.prometheus(), "text/plain; version=0.0.4"
+            elif path == "/metrics.json":
+                body, content_type = json.dumps(self.json()), "application/json"
+            elif path == "/health":
+                health = self.health(self.collect())
+                status = "200 OK" if health["ok"] else "503 Service Unavailable"
+                body, content_type = json.dumps(health), "application/json"
+            else:
+                status, body, content_type = "404 Not Found", "", "text/plain"
+            payload = body.encode()
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+                         f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def run(self, host=METRICS_HOST, http_port=HTTP_PORT, event_port=EVENT_PORT):
+        loop = asyncio.get_running_loop()
+        exporter = self
+
+        class Ingest(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                exporter.datagram_received(data, addr)
+
+        transport, _ = await loop.create_datagram_endpoint(Ingest, local_addr=(host, event_port))
+        server = await asyncio.start_server(self.handle_http, host, http_port)
+        print(f"Metrics: producers udp://{host}:{event_port}, scrapes http://{host}:{http_port}/metrics")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            transport.close()
+
+
+def check(host=METRICS_HOST, port=HTTP_PORT):
+    """Print the health of a running exporter; returns the exit status."""
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics.json", timeout=5) as response:
+            report = json.load(response)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Metrics exporter not reachable on {host}:{port} ({e})")
+        return 2
+    metrics = report["metrics"]
+
+    def value(name, **labels):
+        series = metrics.get(PREFIX + name, {}).get("series", [])
+        return next((s["value"] for s in series if s["labels"] == labels), None)
+
+    kline_age = value("last_kline_age_seconds")
+    cycle_age = value("recompute_last_finished_age_seconds")
+    print(f"Last kline closed {kline_age:.0f} s ago" if kline_age is not None else "Last kline: none")
+    if cycle_age is not None:
+        print(f"Last recompute finished {cycle_age:.0f} s ago, took {value('recompute_last_duration_seconds'):.1f} s")
+    reconnects = metrics.get(PREFIX + "websocket_reconnects_total", {}).get("series", [])
+    if reconnects:
+        print("Websocket reconnects: " + ", ".join(f"{s['labels'].get('stream')} {s['value']:g}" for s in reconnects))
+    if report["health"]["ok"]:
+        print("Healthy")
+        return 0
+    for problem in report["health"]["problems"]:
+        print(f"[ERROR] {problem}")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve freshness, latency and execution metrics.")
+    parser.add_argument("--check", action="store_true", help="print the health of the running exporter and exit")
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(check(port=args.port))
+
+    with open(CONFIG_FILE, "r") as f:
+        config = json5.load(f)
+    asyncio.run(MetricsExporter(config).run(http_port=args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Server-sent events hub: live klines, trades, signals, fills and equity.
+
+Run it as a long-lived process next to keep-fetching.py:
+
+    cd src/python && python3 -m exchange.push_hub
+
+Producers call push(channel, data). It sends one UDP datagram to the hub on
+127.0.0.1 and returns at once: no disk I/O, no connection, and nothing
+happens when the hub is not running. Current producers:
+
+    kline    keep-fetching.py         every kline update (k.x marks a closed candle)
+    trade    view/daytrade/get_realtime.py   every trade of the daytrade pair
+    bar      exchange.trade_bars      every closed 1s / 5s / 1m bar built from trades
+    fill     exchange.account_mirror  executionReport trades of the margin account
+    signal   dist/push_updates.py     the last trade decision after each recompute
+    equity   dist/push_updates.py     equity after each recompute
+
+Browsers open an EventSource on /api/events?channels=kline,equity (Caddy
+proxies it here). Each client has a bounded queue; a client that cannot keep
+up loses its oldest events instead of slowing the hub or the other clients.
+A new client first gets the latest event of each of its channels, or, with
+Last-Event-ID after a reconnect, the recent events it missed.
+"""
+
+import asyncio
+import itertools
+import json
+import socket
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlparse
+
+HUB_HOST = "127.0.0.1"
+PUBLISH_PORT = 8021        # UDP, producers
+SSE_PORT = 8020            # HTTP, browsers (through Caddy)
+EVENTS_PATH = "/api/events"
+
+CLIENT_QUEUE_SIZE = 256    # events buffered per client before the oldest are dropped
+REPLAY_SIZE = 512          # recent events kept for Last-Event-ID
+HEARTBEAT_INTERVAL = 15    # seconds, keeps proxies from closing an idle stream
+RETRY_MS = 2000            # EventSource reconnect delay
+MAX_DATAGRAM = 65000
+
+
+# ------------------------------------------------------------------------------
+# PRODUCER API
+# ------------------------------------------------------------------------------
+_socket = None
+
+
+def push(channel, data, host=HUB_HOST, port=PUBLISH_PORT):
+    """Send one event to the hub. Never blocks and never raises."""
+    global _socket
+    try:
+        if _socket is None:
+            _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _socket.setblocking(False)
+        payload = json.dumps({"channel": channel, "data": data, "time": time.time()}, separators=(",", ":")).encode()
+        if len(payload) <= MAX_DATAGRAM:
+            _socket.sendto(payload, (host, port))
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+# ------------------------------------------------------------------------------
+# HUB
+# ------------------------------------------------------------------------------
+class Client:
+    def __init__(self, channels):
+        self.channels = channels  # None = every channel
+        self.queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, channel):
+        return self.channels is None or channel in self.channels
+
+    def offer(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class PushHub:
+    def __init__(self):
+        self.clients = set()
+        self.ids = itertools.count(1)
+        self.recent = deque(maxlen=REPLAY_SIZE)  # (id, channel, encoded event)
+        self.latest = {}                         # channel -> (id, channel, encoded event)
+        self.received = 0
+
+    def publish(self, channel, data):
+        event_id = next(self.ids)
+        encoded = f"id: {event_id}\nevent: {channel}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+        event = (event_id, channel, encoded)
+        self.recent.append(event)
+        self.latest[channel] = event
+        self.received += 1
+        for client in self.clients:
+            if client.wants(channel):
+                client.offer(encoded)
+
+    def backlog(self, client, last_event_id):
+        """Events a new client starts with."""
+        if last_event_id is not None and self.recent and self.recent[0][0] <= last_event_id + 1:
+            return [encoded for event_id, channel, encoded in self.recent
+                    if event_id > last_event_id and client.wants(channel)]
+        events = sorted(event for event in self.latest.values() if client.wants(event[1]))
+        return [encoded for _, _, encoded in events]
+
+    # ------------------------- INGEST -------------------------
+    def datagram_received(self, data, addr):
+        try:
+            message = json.loads(data)
+            self.publish(str(message["channel"]), message.get("data"))
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    # --------------------------- SSE ---------------------------
+    async def handle_http(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            url = urlparse(request_line[1]) if len(request_line) >= 2 else None
+            if url is None or request_line[0] != "GET" or url.path.rstrip("/") != EVENTS_PATH:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                await writer.drain()
+                return
+
+            channels = {c for value in parse_qs(url.query).get("channels", []) for c in value.split(",") if c}
+            client = Client(channels or None)
+            try:
+                last_event_id = int(headers.get("last-event-id", ""))
+            except ValueError:
+                last_event_id = None
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: keep-alive\r\n"
+                b"X-Accel-Buffering: no\r\n\r\n"
+                + f"retry: {RETRY_MS}\n\n".encode()
+                + b"".join(self.backlog(client, last_event_id))
+            )
+            await writer.drain()
+
+            self.clients.add(client)
+            try:
+                while True:
+                    try:
+                        event = await asyncio.wait_for(client.queue.get(), HEARTBEAT_INTERVAL)
+                    except asyncio.TimeoutError:
+                        event = b": ping\n\n"
+                    # Send whatever queued up meanwhile in one write
+                    chunks = [event]
+                    while not client.queue.empty():
+                        chunks.append(client.queue.get_nowait())
+                    writer.write(b"".join(chunks))
+                    await writer.drain()
+            finally:
+                self.clients.discard(client)
+                if client.dropped:
+                    print(f"[WARNING] A slow client lost {client.dropped} events")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(60)
+            print(f"[Push hub] {len(self.clients)} clients, {self.received} events in the last minute")
+            self.received = 0
+
+    async def run(self, host=HUB_HOST, sse_port=SSE_PORT, publish_port=PUBLISH_PORT):
+        loop = asyncio.get_running_loop()
+        hub = self
+
+        class Ingest(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                hub.datagram_received(data, addr)
+
+        transport, _ = await loop.create_datagram_endpoint(Ingest, local_addr=(host, publish_port))
+        server = await asyncio.start_server(self.handle_http, host, sse_port)
+        print(f"Push hub: producers udp://{host}:{publish_port}, browsers http://{host}:{sse_port}{EVENTS_PATH}")
+        try:
+            async with server:
+                await asyncio.gather(server.serve_forever(), self.report())
+        finally:
+            transport.close()
+
+
+def main():
+    asyncio.run(PushHub().run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Shared exchange clock offset.
+
+Run it as a long-lived process next to keep-fetching.py:
+
+    cd src/python && python3 -m exchange.server_clock
+
+Every SAMPLE_INTERVAL seconds it asks /api/v3/time BURST_SIZE times and keeps
+the sample with the smallest round-trip (NTP-style clock filter: the fastest
+exchange has the least asymmetric delay). From the recent filtered samples it
+fits the drift of the local clock against the server, and publishes
+
+    offset_ms        server time - local time at sampled_at
+    drift_ms_per_s   how fast that offset changes
+    rtt_ms           round-trip of the chosen sample
+
+to src/dist/runtime/server_clock.json. Signing code calls server_timestamp_ms()
+or sync_client(client) and never waits on a time sync; only when the service
+is not running does sync_client() fall back to one REST call.
+"""
+
+import time
+from collections import deque
+
+from exchange.state import RUNTIME_DIR, read_json, write_json_atomic
+
+CLOCK_FILE = RUNTIME_DIR / "server_clock.json"
+SHARED_SOURCE = "shared clock"
+
+SAMPLE_INTERVAL = 60   # seconds between bursts
+BURST_SIZE = 8         # requests per burst, the lowest round-trip wins
+HISTORY_SIZE = 30      # filtered samples used for the drift fit
+MIN_DRIFT_SAMPLES = 5
+MAX_AGE = 5 * SAMPLE_INTERVAL
+
+
+# ------------------------------------------------------------------------------
+# READ API (used by the signing code)
+# ------------------------------------------------------------------------------
+def current_offset_ms(max_age=MAX_AGE):
+    """
+    Server minus local time in ms, extrapolated with the measured drift,
+    or None if the clock service is not running.
+    """
+    data = read_json(CLOCK_FILE, max_age=max_age)
+    if data is None:
+        return None
+    elapsed = time.time() - data["sampled_at"]
+    return data["offset_ms"] + data.get("drift_ms_per_s", 0.0) * elapsed
+
+
+def server_timestamp_ms():
+    """Current exchange time in ms, using the shared offset when available."""
+    return int(time.time() * 1000 + (current_offset_ms() or 0))
+
+
+def sync_client(client, refresh=False):
+    """
+    Apply the exchange clock offset to a python-binance client.
+    Uses the shared offset, or one REST call if the service is not running or
+    refresh is set (after a -1021 the shared value is not trusted).
+    Returns (offset_ms, source).
+    """
+    offset = None if refresh else current_offset_ms()
+    source = SHARED_SOURCE
+    if offset is None:
+        server_time = client.get_server_time()["serverTime"]
+        offset = server_time - int(time.time() * 1000)
+        source = "server"
+    offset = int(offset)
+    # python-binance adds timestamp_offset to every signed request
+    client.timestamp_offset = offset
+    client.time_offset = offset
+    return offset, source
+
+
+# ------------------------------------------------------------------------------
+# SAMPLING SERVICE
+# ------------------------------------------------------------------------------
+def sample_once(client):
+    """One request: returns (rtt_ms, offset_ms, local midpoint in seconds)."""
+    t0 = time.time()
+    server_ms = client.get_server_time()["serverTime"]
+    t1 = time.time()
+    midpoint = (t0 + t1) / 2
+    return (t1 - t0) * 1000, server_ms - midpoint * 1000, midpoint
+
+
+def sample_burst(client, burst_size=BURST_SIZE):
+    """Return the sample with the smallest round-trip of one burst."""
+    samples = []
+    for _ in range(burst_size):
+        try:
+            samples.append(sample_once(client))
+        except Exception as e:
+            print(f"[WARNING] Clock sample failed: {e}")
+    return min(samples) if samples else None
+
+
+def fit_drift(history):
+    """Least-squares slope of offset_ms over local seconds."""
+    if len(history) < MIN_DRIFT_SAMPLES:
+        return 0.0
+    n = len(history)
+    mean_t = sum(t for t, _ in history) / n
+    mean_o = sum(o for _, o in history) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in history)
+    if var_t == 0:
+        return 0.0
+    return sum((t - mean_t) * (o - mean_o) for t, o in history) / var_t
+
+
+def main():
+    # Imported here: exchange.client itself reads the offset from this module
+    from exchange.client import BinanceClient
+
+    # No retries, a retried sample would only be discarded for its round-trip
+    client = BinanceClient(max_retries=0, timeout=5)
+    history = deque(maxlen=HISTORY_SIZE)
+    print(f"Publishing the exchange clock offset to {CLOCK_FILE}")
+
+    while True:
+        sample = sample_burst(client)
+        if sample is not None:
+            rtt_ms, offset_ms, sampled_at = sample
+            history.append((sampled_at, offset_ms))
+            drift = fit_drift(history)
+            write_json_atomic(CLOCK_FILE, {
+                "updated_at": time.time(),
+                "sampled_at": sampled_at,
+                "offset_ms": offset_ms,
+                "drift_ms_per_s": drift,
+                "rtt_ms": rtt_ms,
+                "samples": len(history),
+            })
+            print(f"[Time Sync] Offset: {offset_ms:.1f} ms | RTT: {rtt_ms:.1f} ms | Drift: {drift * 1000:.3f} ms/1000s")
+        time.sleep(SAMPLE_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the exchange order endpoints.
+
+Echoes an immediate FILLED response for
+  - binance WS API 'order.place' and REST POST /sapi/v1/margin/order
+  - bybit trade websocket 'auth' / 'order.create' and REST POST /v5/order/create
+
+so the order transport can be exercised and benchmarked without touching a
+real account. Every fill is priced at --price; --latency-ms delays each reply
+to mimic the network round trip to the exchange.
+
+Usage (from src/python):
+    python3 -m exchange.standin --ws-port 8765 --rest-port 8766
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import websockets
+
+_order_ids = itertools.count(1)
+
+
+def fill_order(order, price):
+    """Build a binance-style FILLED response for a MARKET order."""
+    if order.get("quoteOrderQty") is not None:
+        quote_qty = float(order["quoteOrderQty"])
+        executed_qty = quote_qty / price
+    else:
+        executed_qty = float(order.get("quantity", order.get("qty", 0)))
+        quote_qty = executed_qty * price
+    return {
+        "symbol": order.get("symbol"),
+        "orderId": next(_order_ids),
+        "clientOrderId": order.get("newClientOrderId", ""),
+        "transactTime": int(time.time() * 1000),
+        "side": order.get("side"),
+        "type": order.get("type", "MARKET"),
+        "status": "FILLED",
+        "executedQty": f"{executed_qty:.8f}",
+        "cummulativeQuoteQty": f"{quote_qty:.8f}",
+    }
+
+
+# ------------------------------------------------------------------------------
+# WEBSOCKET STAND-IN
+# ------------------------------------------------------------------------------
+def make_ws_handler(price, latency):
+    async def reply_later(ws, message):
+        if latency:
+            await asyncio.sleep(latency)
+        try:
+            await ws.send(json.dumps(message))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def handler(ws, path=None):
+        async for raw in ws:
+            request = json.loads(raw)
+            if request.get("op") == "auth":
+                reply = {"retCode": 0, "retMsg": "OK", "op": "auth"}
+            elif request.get("op") == "order.create":
+                order = request["args"][0]
+                fill = fill_order(order, price)
+                reply = {
+                    "reqId": request.get("reqId"),
+                    "retCode": 0,
+                    "retMsg": "OK",
+                    "op": "order.create",
+                    "data": {"orderId": str(fill["orderId"]), "orderLinkId": order.get("orderLinkId", "")},
+                }
+            elif request.get("method") == "order.place":
+                reply = {"id": request.get("id"), "status": 200, "result": fill_order(request["params"], price)}
+            else:
+                reply = {"id": request.get("id"), "status": 400, "error": {"code": -1, "msg": "unknown request"}}
+            # Replies are scheduled independently so pipelined requests overlap
+            asyncio.create_task(reply_later(ws, reply))
+
+    return handler
+
+
+async def serve_ws(host, port, price, latency, ready=None):
+    async with websockets.serve(make_ws_handler(price, latency), host, port):
+        if ready is not None:
+            ready.set()
+        await asyncio.Future()
+
+
+# ------------------------------------------------------------------------------
+# REST STAND-IN
+# ------------------------------------------------------------------------------
+def make_rest_handler(price, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode() if length else ""
+            if latency:
+                time.sleep(latency)
+
+            if url.path == "/v5/order/create":
+                order = json.loads(body or "{}")
+                fill = fill_order(order, price)
+                response = {"retCode": 0, "retMsg": "OK", "result": {"orderId": str(fill["orderId"])}}
+            else:
+                order = dict(parse_qsl(url.query))
+                order.update(parse_qsl(body))
+                response = fill_order(order, price)
+
+            payload = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_rest(host, port, price, latency):
+    """Start the REST stand-in on a daemon thread and return the server."""
+    server = ThreadingHTTPServer((host, port), make_rest_handler(price, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_ws(host, port, price, latency):
+    """Start the websocket stand-in on its own event loop thread."""
+    ready = threading.Event()
+    loop = asyncio.new_event_loop()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve_ws(host, port, price, latency, ready))
+
+    threading.Thread(target=run, daemon=True).start()
+    if not ready.wait(timeout=5):
+        raise RuntimeError("Websocket stand-in did not start")
+    return loop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in that echoes fills for order requests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ws-port", type=int, default=8765)
+    parser.add_argument("--rest-port", type=int, default=8766)
+    parser.add_argument("--price", type=float, default=1.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    start_rest(args.host, args.rest_port, args.price, latency)
+    print(f"REST stand-in on http://{args.host}:{args.rest_port}")
+    print(f"WS stand-in on ws://{args.host}:{args.ws_port}")
+    asyncio.run(serve_ws(args.host, args.ws_port, args.price, latency))
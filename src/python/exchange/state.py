@@ -0,0 +1,46 @@
+"""
+Small helpers for the state files the long-running helpers publish.
+
+Files live in src/dist/runtime/ (next to apikey-crypto.json) and are always
+replaced atomically, so a reader never sees a half-written file.
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[2]
+CONFIG_FILE = SRC_DIR / "dist" / "apikey-crypto.json"
+RUNTIME_DIR = SRC_DIR / "dist" / "runtime"
+
+
+def write_json_atomic(path, data):
+    """Write data as JSON to a temp file in the same folder and rename it into place."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_json(path, max_age=None, time_key="updated_at"):
+    """
+    Read a state file. Returns None if it is missing, unreadable, or older than
+    max_age seconds according to its time_key field.
+    """
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if max_age is not None and time.time() - float(data.get(time_key, 0)) > max_age:
+        return None
+    return data
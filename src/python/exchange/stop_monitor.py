@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Intrabar trailing stop: tests the stop on every trade instead of on 1m closes.
+
+Run it as a long-lived process next to keep-fetching.py:
+
+    cd src/python && python3 -m exchange.stop_monitor
+
+compute_trades_trailsl_localmin.py only sees minute closes, and only when
+bucle.py runs, so a wick through the stop inside the minute is acted on late
+or not at all. This process holds the live position (entry, running max,
+sl_percentage) and follows <pair>@trade; each trade costs at most two
+comparisons.
+
+The position lives in src/dist/runtime/stop_position.json. execute_orders.py
+writes it after each successful buy ("long") and sell ("flat"); the monitor picks the
+change up within CLOCK_TICK. When a trade reaches the stop the monitor
+pushes a 'signal' event and, with "stop_monitor_live": true in the config,
+starts the exchange's sell script right away on a worker thread. Once the
+script exits 0 it marks the position flat (closed_by "stop_monitor") and
+execute_orders.py skips the strategy's own sell for that position; when the
+sell fails the position stays long and the stop is re-armed.
+Without the key it only logs and pushes the signal (dry run) and leaves the
+position file alone, so the strategy's sell still goes out.
+
+Replay a stream recorded with `python3 -m exchange.trade_bars --record FILE`
+(or a synthetic one) to measure CPU per tick and the reaction latency from
+receiving the crossing trade to handing the sell to the executor:
+
+    python3 -m exchange.stop_monitor --replay trades.jsonl --sl 0.3
+    python3 -m exchange.stop_monitor --synthetic 1000000 --sl 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import json5
+import websockets
+
+from exchange import metrics
+from exchange.push_hub import push
+from exchange.server_clock import current_offset_ms
+from exchange.state import CONFIG_FILE, RUNTIME_DIR, SRC_DIR, read_json, write_json_atomic
+from exchange.trade_bars import TRADE_STREAM_URL
+
+POSITION_FILE = RUNTIME_DIR / "stop_position.json"
+DIST_DIR = SRC_DIR / "dist"
+SELL_SCRIPT = "../python/{exchange}/private/sell20_beta2.py"  # relative to src/dist, like execute_orders.py
+
+CLOCK_TICK = 0.5        # seconds between position file checks
+PEAK_SAVE_INTERVAL = 1  # seconds between saves of a new running max
+SELL_RETRY_DELAY = 5    # seconds before a failed stop sell re-arms the stop
+
+
+# ------------------------------------------------------------------------------
+# POSITION FILE (also used by execute_orders.py)
+# ------------------------------------------------------------------------------
+def read_position():
+    """The current position, or None when no buy was recorded yet."""
+    return read_json(POSITION_FILE)
+
+
+def write_position(state, **fields):
+    """Replace the position with state ('long' or 'flat') and fields."""
+    write_json_atomic(POSITION_FILE, {"state": state, **fields, "updated_at": time.time()})
+
+
+def position_fields(position):
+    """The fields of a position read back from the file, to write it again."""
+    return {k: v for k, v in position.items() if k not in ("state", "updated_at")}
+
+
+# ------------------------------------------------------------------------------
+# ENGINE
+# ------------------------------------------------------------------------------
+class StopEngine:
+    """Running max and stop price of one long position; on_price is O(1)."""
+
+    __slots__ = ("on_trigger", "armed", "entry_time", "entry_price", "sl_percentage", "factor", "peak", "stop")
+
+    def __init__(self, on_trigger):
+        self.on_trigger = on_trigger
+        self.disarm()
+
+    def arm(self, sl_percentage, entry_price=None, entry_time=None, peak=None):
+        """Follow a long position. Without an entry price the first trade sets it."""
+        self.armed = True
+        self.entry_time = entry_time
+        self.entry_price = entry_price
+        self.sl_percentage = sl_percentage
+        self.factor = 1 - sl_percentage / 100
+        self.peak = max(p for p in (peak, entry_price, 0.0) if p is not None)
+        self.stop = self.peak * self.factor
+
+    def disarm(self):
+        self.armed = False
+        self.entry_time = self.entry_price = self.sl_percentage = None
+        self.factor = self.peak = self.stop = 0.0
+
+    def on_price(self, price, t_ms, received_ns=None):
+        """Feed one trade. Returns True when it triggered the stop."""
+        if not self.armed:
+            return False
+        if price > self.peak:
+            self.peak = price
+            self.stop = price * self.factor
+            if self.entry_price is None:
+                self.entry_price = price
+            return False
+        if price <= self.stop:
+            self.armed = False
+            self.on_trigger(self, price, t_ms, received_ns)
+            return True
+        return False
+
+
+class SellExecutor:
+    """
+    Hands a triggered stop to the exchange's sell script. The script runs on a
+    worker thread, so the trade stream is never blocked while it sells.
+    """
+
+    def __init__(self, exchange, live=False):
+        self.script = SELL_SCRIPT.format(exchange=exchange)
+        self.live = live
+
+    def __call__(self, engine, price, t_ms, received_ns=None):
+        started = time.perf_counter_ns()
+        position = dict(entry_time=engine.entry_time, entry_price=engine.entry_price, peak=engine.peak,
+                        sl_percentage=engine.sl_percentage)
+        if self.live:
+            threading.Thread(target=self.sell, args=(position, price, t_ms), daemon=True).start()
+        reaction_us = (started - received_ns) / 1000 if received_ns else None
+        push("signal", {"t": int(t_ms / 1000), "action": "sell", "reason": "tsl-live", "price": price})
+
+        age_ms = time.time() * 1000 + (current_offset_ms() or 0) - t_ms
+        reaction = f", reaction {reaction_us:.0f} us" if reaction_us is not None else ""
+        print(f"{'SELL' if self.live else '[dry run] sell'} at {price} (peak {engine.peak}, "
+              f"stop {engine.stop:.6g}), trade {age_ms:.0f} ms old{reaction}")
+
+    def sell(self, position, price, t_ms):
+        """
+        Run the sell script and record its outcome. Only a successful sell marks
+        the position flat (closed_by "stop_monitor"); after a failure the position
+        is written back as long, which re-arms the stop and leaves the strategy's
+        own sell to execute_orders.py.
+        """
+        try:
+            status = subprocess.run([sys.executable, self.script], cwd=DIST_DIR).returncode
+        except OSError as e:
+            print(f"[ERROR] Could not start {self.script}: {e}")
+            status = None
+
+        if status != 0:
+            print(f"[ERROR] Stop sell failed (status {status}), re-arming the stop in {SELL_RETRY_DELAY} s")
+            time.sleep(SELL_RETRY_DELAY)
+
+        current = read_position() or {}
+        # execute_orders.py may have closed or replaced the position meanwhile
+        if current.get("state") != "long" or current.get("entry_time") != position["entry_time"]:
+            return
+        if status == 0:
+            write_position("flat", **position, exit_price=price, exit_time=t_ms / 1000, closed_by="stop_monitor")
+            print("Stop sell done, position flat")
+        else:
+            peak = max(position["peak"], current.get("peak") or 0)
+            write_position("long", **{**position_fields(current), "peak": peak})
+
+
+# ------------------------------------------------------------------------------
+# LIVE
+# ------------------------------------------------------------------------------
+class StopMonitor:
+    def __init__(self, engine, default_sl):
+        self.engine = engine
+        self.default_sl = default_sl
+        self.position_mtime = None
+        self.saved_peak = None
+        self.saved_at = 0.0
+
+    def sync_position(self):
+        """Arm or disarm the engine when execute_orders.py changed the position file."""
+        try:
+            mtime = os.stat(POSITION_FILE).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self.position_mtime:
+            return
+        self.position_mtime = mtime
+        position = read_position() or {}
+        engine = self.engine
+
+        if position.get("state") == "long":
+            if engine.armed and engine.entry_time == position.get("entry_time"):
+                return  # our own peak save
+            sl = float(position.get("sl_percentage") or self.default_sl)
+            engine.arm(sl, position.get("entry_price"), position.get("entry_time"), position.get("peak"))
+            self.saved_peak = engine.peak
+            print(f"Armed: entry {engine.entry_price} at {engine.entry_time}, stop {sl}% below the running max")
+        elif engine.armed:
+            engine.disarm()
+            print("Disarmed: the position is flat")
+
+    def save_peak(self):
+        """Keep the running max on disk, so a restart does not lower the stop."""
+        engine = self.engine
+        if not engine.armed or engine.peak == self.saved_peak or time.time() - self.saved_at < PEAK_SAVE_INTERVAL:
+            return
+        position = read_position() or {}
+        # execute_orders.py may have closed or replaced the position meanwhile
+        if position.get("state") != "long" or position.get("entry_time") != engine.entry_time:
+            return
+        write_position("long", **{**position_fields(position), "peak": engine.peak, "entry_price": engine.entry_price})
+        self.position_mtime = os.stat(POSITION_FILE).st_mtime_ns
+        self.saved_peak = engine.peak
+        self.saved_at = time.time()
+
+    async def follow(self, symbol):
+        url = TRADE_STREAM_URL.format(symbol=symbol.lower())
+        engine = self.engine
+
+        async def clock():
+            while True:
+                self.sync_position()
+                self.save_peak()
+                await asyncio.sleep(CLOCK_TICK)
+
+        clock_task = asyncio.create_task(clock())
+        try:
+            while True:
+                try:
+                    async with websockets.connect(url, ping_interval=20, max_queue=None) as ws:
+                        print(f"Trade stream connected: {url}")
+                        async for message in ws:
+                            received_ns = time.perf_counter_ns()
+                            trade = json.loads(message)
+                            engine.on_price(float(trade["p"]), trade["T"], received_ns)
+                except (websockets.ConnectionClosed, OSError) as e:
+                    print(f"[WARNING] Trade stream closed ({e}), reconnecting")
+                metrics.increment("websocket_reconnects_total", stream="stop_monitor")
+                await asyncio.sleep(1)
+        finally:
+            clock_task.cancel()
+
+
+# ------------------------------------------------------------------------------
+# REPLAY
+# ------------------------------------------------------------------------------
+def replay(messages, sl_percentage, rearm_after=1):
+    """
+    Run recorded @trade messages through the engine, re-arming `rearm_after`
+    trades after each trigger. The executor only records the reaction time.
+    """
+    reactions = []
+
+    def record(engine, price, t_ms, received_ns):
+        reactions.append(time.perf_counter_ns() - received_ns)
+
+    engine = StopEngine(record)
+    engine.arm(sl_percentage)
+    rearm_at = None
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for i, message in enumerate(messages):
+        received_ns = time.perf_counter_ns()
+        trade = json.loads(message)
+        if rearm_at == i:
+            engine.arm(sl_percentage)
+            rearm_at = None
+        if engine.on_price(float(trade["p"]), trade["T"], received_ns):
+            rearm_at = i + rearm_after
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return reactions, cpu, wall
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_replay(args):
+    if args.replay:
+        with open(args.replay, "r") as f:
+            messages = [line for line in f if line.strip()]
+        source = args.replay
+    else:
+        from exchange.bench_trade_bars import synthetic_stream
+        messages = synthetic_stream(args.synthetic)
+        source = "synthetic"
+
+    reactions, cpu, wall = replay(messages, args.sl, args.rearm_after)
+    ticks = len(messages)
+    print(f"{ticks} trades ({source}), sl_percentage {args.sl}, {len(reactions)} stops triggered")
+    print(f"CPU {cpu / ticks * 1e6:.2f} us/tick (decode + engine), wall {wall / ticks * 1e6:.2f} us/tick, "
+          f"{ticks / wall:,.0f} ticks/s")
+    if reactions:
+        reactions.sort()
+        print(f"Reaction (trade received -> sell handed over): p50 {percentile(reactions, 0.5) / 1000:.1f} us, "
+              f"p99 {percentile(reactions, 0.99) / 1000:.1f} us, max {reactions[-1] / 1000:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intrabar trailing stop on the binance trade stream.")
+    parser.add_argument("--replay", help="replay a JSON lines file recorded with exchange.trade_bars --record")
+    parser.add_argument("--synthetic", type=int, help="replay this many synthetic trades")
+    parser.add_argument("--sl", type=float, help="sl_percentage for the replay (default: config)")
+    parser.add_argument("--rearm-after", type=int, default=1, help="replay: trades after a trigger before re-arming")
+    args = parser.parse_args()
+
+    with open(CONFIG_FILE, "r") as f:
+        config = json5.load(f)
+    sl_percentage = float(config["sl_percentage"])
+
+    if args.replay or args.synthetic:
+        args.sl = args.sl if args.sl is not None else sl_percentage
+        run_replay(args)
+        return
+
+    live = bool(config.get("stop_monitor_live", False))
+    engine = StopEngine(SellExecutor(config["exchange"].lower(), live=live))
+    monitor = StopMonitor(engine, sl_percentage)
+    monitor.sync_position()
+    print(f"Stop monitor for {config['pair']}, default stop {sl_percentage}%, "
+          f"{'live sells' if live else 'dry run (stop_monitor_live is off)'}")
+    asyncio.run(monitor.follow(config["pair"]))
+
+
+if __name__ == "__main__":
+    main()
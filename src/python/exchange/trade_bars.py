@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Build 1s / 5s / 1m OHLCV bars from the full binance trade stream.
+
+Run it as a long-lived process next to keep-fetching.py:
+
+    cd src/python && python3 -m exchange.trade_bars [--record trades.jsonl]
+
+Every trade of <pair>@trade is folded into the open bar of each interval; no
+message is skipped. A bar is closed by the first trade of the next bar or, at
+the latest, by the local clock (corrected with the shared exchange clock
+offset) `trade_bar_grace_ms` after its boundary, instead of waiting for
+binance's own kline with x=true. Trades that arrive after their bar was
+closed are counted as late and dropped.
+
+Closed bars are kept per interval in fixed-size ring arrays and appended to
+the kline store in keep-fetching.py's format ('|' separated, no header):
+
+    src/assets/<pair>-realtime.csv      1m  (only with "kline_source": "trades")
+    src/assets/<pair>-realtime-5s.csv   5s
+    src/assets/<pair>-realtime-1s.csv   1s
+
+and pushed to the dashboards as 'bar' events (exchange.push_hub). Intervals
+without trades get a flat bar at the previous close, like binance klines; the
+first bar of each interval is partial and never written.
+
+--record saves the raw stream as JSON lines for exchange.bench_trade_bars.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from array import array
+
+import json5
+import websockets
+
+from exchange import metrics
+from exchange.push_hub import push
+from exchange.server_clock import current_offset_ms
+from exchange.state import CONFIG_FILE, SRC_DIR
+
+TRADE_STREAM_URL = "wss://stream.binance.com:9443/ws/{symbol}@trade"
+ASSETS_DIR = SRC_DIR / "assets"
+
+INTERVALS = (1, 5, 60)        # bar lengths in seconds
+CAPACITY = 4096               # closed bars kept in memory per interval
+DEFAULT_GRACE_MS = 250        # wait this long after a boundary for in-flight trades
+CLOCK_TICK = 0.05             # seconds between clock checks
+FIELDS = ("open", "high", "low", "close", "volume", "quote_volume", "taker_base", "taker_quote", "trades")
+
+
+class BarSeries:
+    """Bars of one interval: the open bar in plain attributes, closed bars in ring arrays."""
+
+    def __init__(self, seconds, capacity=CAPACITY, on_close=None):
+        self.seconds = seconds
+        self.ms = seconds * 1000
+        self.capacity = capacity
+        self.on_close = on_close
+        self.times = array("q", bytes(8 * capacity))
+        self.columns = {field: array("d", bytes(8 * capacity)) for field in FIELDS}
+        self.closed = 0          # bars closed so far; the newest is at (closed - 1) % capacity
+        self.late = 0
+        self.start = None        # open bar start, ms
+        self.partial = True      # the first bar starts mid-interval
+        self._reset(0.0)
+
+    def _reset(self, close):
+        self.o = self.h = self.l = self.c = close
+        self.v = self.qv = self.tb = self.tq = 0.0
+        self.n = 0
+
+    def add(self, t_ms, price, qty, taker_buy):
+        start = t_ms - t_ms % self.ms
+        if start != self.start:
+            if self.start is None:
+                self.start = start
+            elif start < self.start:
+                self.late += 1
+                return
+            else:
+                self.roll(start)
+
+        if self.n == 0:
+            self.o = self.h = self.l = price
+        elif price > self.h:
+            self.h = price
+        elif price < self.l:
+            self.l = price
+        self.c = price
+        quote = price * qty
+        self.v += qty
+        self.qv += quote
+        if taker_buy:
+            self.tb += qty
+            self.tq += quote
+        self.n += 1
+
+    def close_due(self, now_ms, grace_ms):
+        """Close the open bar (and flat bars after it) once now_ms is grace_ms past their end."""
+        if self.start is None:
+            return
+        target = now_ms - grace_ms
+        target -= target % self.ms
+        if target > self.start:
+            self.roll(target)
+
+    def roll(self, start):
+        """Close the open bar, fill flat bars up to start, open the bar at start."""
+        gap = (start - self.start) // self.ms
+        self._close()
+        if gap > self.capacity:
+            # Long outage: no point in thousands of flat bars, start over
+            self.start = start
+            self.partial = True
+            self._reset(self.c)
+            return
+        for _ in range(gap - 1):
+            self.start += self.ms
+            self._reset(self.c)
+            self._close()
+        self.start = start
+        self._reset(self.c)
+
+    def _close(self):
+        if self.partial:
+            self.partial = False
+            return
+        i = self.closed % self.capacity
+        self.times[i] = self.start // 1000
+        for field, value in zip(FIELDS, (self.o, self.h, self.l, self.c, self.v, self.qv, self.tb, self.tq, self.n)):
+            self.columns[field][i] = value
+        self.closed += 1
+        if self.on_close is not None:
+            self.on_close(self, i)
+
+    def row(self, i):
+        return (int(self.times[i]),) + tuple(self.columns[field][i] for field in FIELDS)
+
+
+class KlineStoreWriter:
+    """Appends closed bars to a kline CSV in keep-fetching.py's '|' format."""
+
+    def __init__(self, path):
+        self.path = path
+        self.last_time = self._last_time()
+        self.file = open(path, "a")
+
+    def _last_time(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, 2)
+                f.seek(max(f.tell() - 512, 0))
+                lines = f.read().decode(errors="replace").strip().splitlines()
+            return int(float(lines[-1].split("|")[0])) if lines else 0
+        except (OSError, ValueError):
+            return 0
+
+    def __call__(self, series, i):
+        t, o, h, l, c, v, qv, tb, tq, n = series.row(i)
+        # The history fetch of keep-fetching.py may already hold this bar
+        if t <= self.last_time:
+            return
+        self.file.write(f"{t}|{o}|{h}|{l}|{c}|{v}|{qv}|{tb}|{tq}|{int(n)}\n")
+        self.file.flush()
+        self.last_time = t
+
+    def close(self):
+        self.file.close()
+
+
+class TradeAggregator:
+    def __init__(self, intervals=INTERVALS, grace_ms=DEFAULT_GRACE_MS, writers=None, publish=True):
+        self.grace_ms = grace_ms
+        self.trades = 0
+        self.series = []
+        for seconds in intervals:
+            callbacks = [w for w in [(writers or {}).get(seconds)] if w is not None]
+            if publish:
+                callbacks.append(self.publish_bar)
+            self.series.append(BarSeries(seconds, on_close=self._fan_out(callbacks)))
+
+    @staticmethod
+    def _fan_out(callbacks):
+        def on_close(series, i):
+            for callback in callbacks:
+                callback(series, i)
+        return on_close
+
+    @staticmethod
+    def publish_bar(series, i):
+        t, o, h, l, c, v, qv, tb, tq, n = series.row(i)
+        push("bar", {"interval": series.seconds, "t": t, "o": o, "h": h, "l": l, "c": c, "v": v, "n": int(n)})
+
+    def on_trade(self, trade):
+        """One decoded @trade message."""
+        t_ms = trade["T"]
+        price = float(trade["p"])
+        qty = float(trade["q"])
+        taker_buy = not trade["m"]  # buyer is not the maker: the taker bought
+        for series in self.series:
+            series.add(t_ms, price, qty, taker_buy)
+        self.trades += 1
+
+    def on_clock(self, now_ms):
+        for series in self.series:
+            series.close_due(now_ms, self.grace_ms)
+
+
+def exchange_now_ms():
+    return int(time.time() * 1000 + (current_offset_ms() or 0))
+
+
+async def follow(symbol, aggregator, record=None):
+    url = TRADE_STREAM_URL.format(symbol=symbol.lower())
+
+    async def clock():
+        while True:
+            await asyncio.sleep(CLOCK_TICK)
+            aggregator.on_clock(exchange_now_ms())
+
+    clock_task = asyncio.create_task(clock())
+    try:
+        while True:
+            try:
+                async with websockets.connect(url, ping_interval=20, max_queue=None) as ws:
+                    print(f"Trade stream connected: {url}")
+                    async for message in ws:
+                        aggregator.on_trade(json.loads(message))
+                        if record is not None:
+                            record.write(message if isinstance(message, str) else message.decode())
+                            record.write("\n")
+            except (websockets.ConnectionClosed, OSError) as e:
+                print(f"[WARNING] Trade stream closed ({e}), reconnecting")
+            metrics.increment("websocket_reconnects_total", stream="trade_bars")
+            await asyncio.sleep(1)
+    finally:
+        clock_task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build 1s/5s/1m bars from the binance trade stream.")
+    parser.add_argument("--record", help="also save the raw trade stream to this JSON lines file")
+    args = parser.parse_args()
+
+    with open(CONFIG_FILE, "r") as f:
+        config = json5.load(f)
+    symbol = config["pair"].lower()
+    grace_ms = int(config.get("trade_bar_grace_ms", DEFAULT_GRACE_MS))
+
+    writers = {
+        1: KlineStoreWriter(ASSETS_DIR / f"{symbol}-realtime-1s.csv"),
+        5: KlineStoreWriter(ASSETS_DIR / f"{symbol}-realtime-5s.csv"),
+    }
+    # keep-fetching.py owns the minute store unless the config hands it over
+    if config.get("kline_source", "kline") == "trades":
+        writers[60] = KlineStoreWriter(ASSETS_DIR / f"{symbol}-realtime.csv")
+
+    aggregator = TradeAggregator(grace_ms=grace_ms, writers=writers)
+    record = open(args.record, "a") if args.record else None
+    print(f"Aggregating {symbol} trades into {', '.join(f'{s}s' for s in INTERVALS)} bars, grace {grace_ms} ms")
+    try:
+        asyncio.run(follow(symbol, aggregator, record))
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if record is not None:
+            record.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Order placement over the exchange WebSocket APIs.
+
+One authenticated websocket stays open for the lifetime of an order script.
+All slices of a split order are written to the socket back to back and the
+acks are matched to their requests by id afterwards (pipelining), instead of
+paying signing + a fresh HTTPS request + a 1s sleep per slice.
+
+Anything that cannot go over the websocket falls back to the REST callable
+handed in by the script:
+  - transport disabled in the config ("order_transport": "rest", the default)
+  - the exchange's WS API cannot carry the order (binance margin orders)
+  - connection/auth failures and orders the exchange rejected on the socket
+
+Orders that were written to the socket but never acknowledged are NOT resent
+over REST, because they may already have been filled. They come back as
+WsOrderError so the script can report them.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import threading
+import time
+from urllib.parse import urlencode
+
+import websockets
+
+from exchange.server_clock import server_timestamp_ms
+
+BINANCE_WS_API_URL = "wss://ws-api.binance.com:443/ws-api/v3"
+BYBIT_WS_TRADE_URL = "wss://stream.bybit.com/v5/trade"
+
+DEFAULT_TIMEOUT = 5.0
+
+
+class WsOrderError(Exception):
+    """Raised for orders that could not be confirmed over the websocket."""
+
+
+# ------------------------------------------------------------------------------
+# PROTOCOL ADAPTERS
+# ------------------------------------------------------------------------------
+class BinanceWsProtocol:
+    """
+    Binance WebSocket API (ws-api/v3), method 'order.place'.
+    HMAC keys cannot use session.logon, so every request carries its own signature.
+    The WS API only places spot orders, margin orders always go over REST.
+    Without an explicit time_offset_ms the shared exchange.server_clock offset is used.
+    """
+    name = "binance"
+    supports_margin = False
+
+    def __init__(self, api_key, api_secret, url=BINANCE_WS_API_URL, recv_window=5000, time_offset_ms=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.url = url
+        self.recv_window = recv_window
+        self.time_offset_ms = time_offset_ms
+
+    def auth_message(self):
+        return None
+
+    def check_auth(self, reply):
+        pass
+
+    def order_message(self, req_id, order):
+        params = dict(order)
+        params["apiKey"] = self.api_key
+        params["recvWindow"] = self.recv_window
+        if self.time_offset_ms is None:
+            params["timestamp"] = server_timestamp_ms()
+        else:
+            params["timestamp"] = int(time.time() * 1000 + self.time_offset_ms)
+        # The WS API signs the parameters sorted by name
+        payload = urlencode(sorted(params.items()))
+        params["signature"] = hmac.new(
+            self.api_secret.encode(), payload.encode(), hashlib.sha256
+        ).hexdigest()
+        return {"id": req_id, "method": "order.place", "params": params}
+
+    def reply_id(self, reply):
+        return reply.get("id")
+
+    def parse_reply(self, reply):
+        if reply.get("status") == 200:
+            return reply.get("result", {})
+        error = reply.get("error", {})
+        raise WsOrderError(f"{error.get('msg', reply)} (Code: {error.get('code')})")
+
+
+class BybitWsProtocol:
+    """
+    Bybit v5 trade websocket, op 'order.create'.
+    The connection is authenticated once, requests only carry a timestamp header.
+    """
+    name = "bybit"
+    supports_margin = True
+
+    def __init__(self, api_key, api_secret, url=BYBIT_WS_TRADE_URL, recv_window=5000, time_offset_ms=0):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.url = url
+        self.recv_window = recv_window
+        self.time_offset_ms = time_offset_ms
+
+    def auth_message(self):
+        expires = int((time.time() + 10) * 1000 + self.time_offset_ms)
+        signature = hmac.new(
+            self.api_secret.encode(), f"GET/realtime{expires}".encode(), hashlib.sha256
+        ).hexdigest()
+        return {"op": "auth", "args": [self.api_key, expires, signature]}
+
+    def check_auth(self, reply):
+        if reply.get("retCode") != 0:
+            raise WsOrderError(f"Bybit websocket auth failed: {reply}")
+
+    def order_message(self, req_id, order):
+        return {
+            "reqId": req_id,
+            "header": {
+                "X-BAPI-TIMESTAMP": str(int(time.time() * 1000 + self.time_offset_ms)),
+                "X-BAPI-RECV-WINDOW": str(self.recv_window),
+            },
+            "op": "order.create",
+            "args": [dict(order)],
+        }
+
+    def reply_id(self, reply):
+        return reply.get("reqId")
+
+    def parse_reply(self, reply):
+        if reply.get("retCode") == 0:
+            return reply.get("data", {})
+        raise WsOrderError(f"{reply.get('retMsg', reply)} (Code: {reply.get('retCode')})")
+
+
+# ------------------------------------------------------------------------------
+# ASYNC SESSION
+# ------------------------------------------------------------------------------
+class WsOrderSession:
+    """
+    A single websocket connection with request/response correlation.
+
+    place_orders() writes every order before awaiting any ack and returns one
+    (state, value) tuple per order, in order:
+      ("ok", result)         acknowledged by the exchange
+      ("rejected", error)    answered with an error, the order was not placed
+      ("unsent", error)      never written to the socket
+      ("unknown", error)     written, but no ack before the timeout / disconnect
+    """
+
+    _session_ids = itertools.count(1)
+
+    def __init__(self, protocol, timeout=DEFAULT_TIMEOUT):
+        self.protocol = protocol
+        self.timeout = timeout
+        self._ws = None
+        self._reader = None
+        self._pending = {}
+        self._request_ids = itertools.count(1)
+        self._prefix = f"o{next(self._session_ids)}-{int(time.time())}"
+
+    @property
+    def connected(self):
+        return self._ws is not None and self._reader is not None and not self._reader.done()
+
+    async def connect(self):
+        self._ws = await asyncio.wait_for(
+            websockets.connect(self.protocol.url, ping_interval=20), self.timeout
+        )
+        auth = self.protocol.auth_message()
+        if auth is not None:
+            await self._ws.send(json.dumps(auth))
+            reply = json.loads(await asyncio.wait_for(self._ws.recv(), self.timeout))
+            self.protocol.check_auth(reply)
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        try:
+            async for raw in self._ws:
+                reply = json.loads(raw)
+                future = self._pending.pop(str(self.protocol.reply_id(reply)), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Order websocket closed before ack"))
+            self._pending.clear()
+
+    async def place_orders(self, orders):
+        if not self.connected:
+            await self.connect()
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        outcomes = [None] * len(orders)
+
+        for index, order in enumerate(orders):
+            req_id = f"{self._prefix}-{next(self._request_ids)}"
+            future = loop.create_future()
+            self._pending[req_id] = future
+            try:
+                await self._ws.send(json.dumps(self.protocol.order_message(req_id, order)))
+            except Exception as e:
+                self._pending.pop(req_id, None)
+                outcomes[index] = ("unsent", e)
+                continue
+            futures.append((index, future))
+
+        for index, future in futures:
+            try:
+                reply = await asyncio.wait_for(future, self.timeout)
+            except Exception as e:
+                outcomes[index] = ("unknown", e)
+                continue
+            try:
+                outcomes[index] = ("ok", self.protocol.parse_reply(reply))
+            except WsOrderError as e:
+                outcomes[index] = ("rejected", e)
+
+        return outcomes
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+        self._ws = None
+        self._reader = None
+
+
+# ------------------------------------------------------------------------------
+# SYNC FACADE FOR THE ORDER SCRIPTS
+# ------------------------------------------------------------------------------
+class OrderTransport:
+    """
+    Blocking wrapper around WsOrderSession for the (synchronous) order scripts.
+
+    mode:       "ws" to use the websocket, anything else keeps plain REST
+    protocol:   BinanceWsProtocol / BybitWsProtocol instance (or None)
+    rest_place: callable(order_dict) -> response dict, the existing REST path
+    """
+
+    def __init__(self, rest_place, protocol=None, mode="rest", timeout=DEFAULT_TIMEOUT):
+        self.rest_place = rest_place
+        self.protocol = protocol
+        self.mode = mode
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._session = None
+
+    def uses_ws(self, margin=False):
+        if self.mode != "ws" or self.protocol is None:
+            return False
+        return self.protocol.supports_margin or not margin
+
+    def _run(self, coro):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+            self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def place_orders(self, orders, margin=False):
+        """
+        Place all orders and return one entry per order: the exchange response
+        dict, or the Exception raised for that order.
+        """
+        if not self.uses_ws(margin):
+            if self.mode == "ws" and margin:
+                print(f"[INFO] {self.protocol.name} WebSocket API has no margin orders, using REST.")
+            return [self._place_rest(order) for order in orders]
+
+        if self._session is None:
+            self._session = WsOrderSession(self.protocol, self.timeout)
+        try:
+            outcomes = self._run(self._session.place_orders(orders))
+        except Exception as e:
+            print(f"[WARNING] Order websocket unavailable ({e}), falling back to REST.")
+            outcomes = [("unsent", e)] * len(orders)
+
+        results = []
+        for order, (state, value) in zip(orders, outcomes):
+            if state == "ok":
+                results.append(value)
+            elif state == "unknown":
+                print(f"[ERROR] No ack for order {order}: {value}. Not resending, check the account.")
+                results.append(WsOrderError(f"Order not acknowledged: {value}"))
+            else:
+                print(f"[WARNING] Order {state} on websocket ({value}), retrying over REST.")
+                results.append(self._place_rest(order))
+        return results
+
+    def _place_rest(self, order):
+        try:
+            return self.rest_place(order)
+        except Exception as e:
+            return e
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._session is not None:
+            try:
+                self._run(self._session.close())
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=self.timeout)
+        self._loop = None
+        self._session = None
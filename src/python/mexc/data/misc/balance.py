@@ -1,11 +1,11 @@
-import requests
-import time
-import hashlib
-import hmac
+import sys
 from pathlib import Path
 import json5
 import json
 
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from exchange.client import ExchangeAPIError, MexcClient
+
 # Load API keys
 home_dir = Path.home()
 with open(f"{home_dir}/CRYPTO-Trader/src/dist/apikey-crypto.json", "r") as file:
@@ -14,46 +14,24 @@ with open(f"{home_dir}/CRYPTO-Trader/src/dist/apikey-crypto.json", "r") as file:
 API_KEY = config.get("key")
 SECRET_KEY = config.get("secret")
 
-# 📥 Endpoint for account info
-url = 'https://api.mexc.com/api/v3/sub-account/asset'
-
-# 📅 Generate timestamp
-timestamp = int(time.time() * 1000)
+# 📥 Endpoint for the sub-account assets
+path = '/api/v3/sub-account/asset'
 
-# 🔗 Build the query string with the new parameters
 account_type = "SPOT"
 sub_account = "pablito1234"
-query_string = f'timestamp={timestamp}&accountType={account_type}&subAccount={sub_account}'
-
-# 🖊️ Sign the request
-signature = hmac.new(
-    SECRET_KEY.encode('utf-8'),
-    query_string.encode('utf-8'),
-    hashlib.sha256
-).hexdigest()
-
-# 📦 Add the signature to the query string
-query_string += f'&signature={signature}'
-
-# 📤 Make the request
-headers = {
-    'X-MEXC-APIKEY': API_KEY
-}
-
-# Send the request with the query string parameters
 params = {
-    'timestamp': timestamp,
     'accountType': account_type,
     'subAccount': sub_account,
-    'signature': signature
 }
 
-response = requests.get(url, headers=headers, params=params)
+# 📤 Make the signed request (timestamp and signature are added by the client)
+client = MexcClient(API_KEY, SECRET_KEY)
 
 # 📋 Print the response
-if response.status_code == 200:
+try:
+    data = client.get(path, params, signed=True)
     print("Account Info:")
-    print(json.dumps(response.json(), indent=4, sort_keys=True))
-else:
-    print(f"Error: {response.status_code}")
-    print(response.text)
+    print(json.dumps(data, indent=4, sort_keys=True))
+except ExchangeAPIError as e:
+    print(f"Error: {e.status_code}")
+    print(e.payload or e.message)
@@ -4,9 +4,28 @@ function getQueryParam(param) {
     return urlParams.get(param);
 }
 
+// Output manifest written by dist/publish.py: { generation, files: { name: { hash, size } } }
+let outputManifest = null;
+
+function loadOutputManifest() {
+    // Revalidated every load, a 304 when nothing was published since
+    return fetch('./output/manifest.json', { cache: 'no-cache' })
+        .then(response => (response.ok ? response.json() : null))
+        .catch(() => null)
+        .then(manifest => { outputManifest = manifest; });
+}
+
+// URL of an output file: immutable ?v=<content hash> when the manifest lists it,
+// otherwise cache-busted (no publish stage, e.g. a plain local http server)
+function outputURL(name) {
+    const entry = outputManifest && outputManifest.files[name];
+    return entry ? `./output/${name}?v=${entry.hash}` : `./output/${name}?` + Math.random();
+}
+
 function setTitleWithPairName() {
-    // First, fetch the pair name
-    fetch('./output/pairname.txt?' + Math.random())
+    // First, fetch the output manifest and the pair name
+    loadOutputManifest()
+        .then(() => fetch(outputURL('pairname.txt')))
         .then(response => response.text())
         .then(pairName => {
             trimmedPairName = pairName.trim();
@@ -14,7 +33,7 @@ function setTitleWithPairName() {
             // Only proceed if pairName is not empty
             if (trimmedPairName) {
                 // Now fetch the equity value
-                return fetch('./output/equity.txt?' + Math.random());
+                return fetch(outputURL('equity.txt'));
             } else {
                 // If no pair name, stop here
                 throw new Error('Pair name is empty');
@@ -114,135 +133,362 @@ function plotData(logarithmic = false) {
     // Decide which portfolio file to load based on &bnb=1
     const bnbParam = getQueryParam('bnb');
     const portfolioFile = (bnbParam === '1') ? 'portfolio_bnb.txt' : 'portfolio.txt';
+    const portfolioColumn = (bnbParam === '1') ? 'portfolio_bnb' : 'portfolio';
 
-    // Parse each file concurrently
-    const parsePromises = [];
+    // ---------------------------
+    //  Binary bundle (series.json + series.bin, written by dist/series_bundle.py)
+    // ---------------------------
+    const TYPED_ARRAYS = {
+        int32: Int32Array,
+        float32: Float32Array,
+        uint8: Uint8Array,
+        uint16: Uint16Array
+    };
+
+    function loadBundle() {
+        return fetch(outputURL('series.json'))
+            .then(response => {
+                if (!response.ok) throw new Error(`series.json: HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(header => fetch(`./output/series.bin?v=${header.generation}`)
+                .then(response => {
+                    if (!response.ok) throw new Error(`series.bin: HTTP ${response.status}`);
+                    return response.arrayBuffer();
+                })
+                .then(buffer => {
+                    // The bundle may have been replaced between both requests
+                    if (buffer.byteLength !== header.byte_length) {
+                        throw new Error('series.bin does not match series.json');
+                    }
+                    readBundle(header, buffer);
+                })
+            );
+    }
 
-    // TRADES
-    parsePromises.push(
-        parseCSV('./output/trades.txt?' + Math.random(), (data) => {
-            data.forEach(row => {
-                if (row.length < 3) return;
-                const [timestamp, action, reason] = row;
-                if (typeof timestamp === 'number' && action && reason) {
-                    rawTrades.push({ timestamp, action, reason });
-                }
-            });
-        })
-    );
+    function bundleColumn(header, buffer, name) {
+        const column = header.columns[name];
+        if (!column) return null;
+        return new TYPED_ARRAYS[column.dtype](buffer, column.offset, column.length);
+    }
 
-    // PORTFOLIO (use portfolioFile determined above)
-    parsePromises.push(
-        parseCSV(`./output/${portfolioFile}?` + Math.random(), (data) => {
-            data.forEach(row => {
-                if (row.length < 2) return;
-                const [timestamp, value] = row;
-                if (typeof timestamp === 'number' && value !== undefined) {
-                    timestampsPortfolio.push(timestamp);
-                    valuesPortfolio.push(value);
+    function readBundle(header, buffer) {
+        const t0 = header.t0;
+        const time = bundleColumn(header, buffer, 'time');
+
+        // Columns share the time axis, NaN marks timestamps a series has no point for
+        function fill(name, timestamps, values) {
+            const column = bundleColumn(header, buffer, name);
+            if (!column) return;
+            for (let i = 0; i < column.length; i++) {
+                if (!Number.isNaN(column[i])) {
+                    timestamps.push(t0 + time[i]);
+                    values.push(column[i]);
                 }
-            });
-        })
-    );
+            }
+        }
 
-    // UNTOUCHED PORTFOLIO
-    parsePromises.push(
-        parseCSV('./output/untouched_portfolio.txt?' + Math.random(), (data) => {
-            data.forEach(row => {
-                if (row.length < 2) return;
-                const [timestamp, value] = row;
-                if (typeof timestamp === 'number' && value !== undefined) {
-                    timestampsUntouchedPortfolio.push(timestamp);
-                    valuesUntouchedPortfolio.push(value);
-                }
+        fill(portfolioColumn, timestampsPortfolio, valuesPortfolio);
+        fill('untouched_portfolio', timestampsUntouchedPortfolio, valuesUntouchedPortfolio);
+        if (loadEMA) fill('expma', timestampsEMA, valuesEMA);
+        if (loadEMAMicro) fill('expma_micro', timestampsEMAMicro, valuesEMAMicro);
+        if (slopeDisplayInterval > 0) fill('ema_slopes', timestampsSlopes, slopes);
+        if (loadAsset) fill('asset', timestampsAsset, valuesAsset);
+        if (showMargin) fill('margin', timestampsMargin, valuesMargin);
+
+        const tradeTimes = bundleColumn(header, buffer, 'trades_time');
+        const tradeActions = bundleColumn(header, buffer, 'trades_action');
+        const tradeReasons = bundleColumn(header, buffer, 'trades_reason');
+        for (let i = 0; i < tradeTimes.length; i++) {
+            rawTrades.push({
+                timestamp: t0 + tradeTimes[i],
+                action: header.trades.actions[tradeActions[i]],
+                reason: header.trades.reasons[tradeReasons[i]]
             });
-        })
-    );
+        }
+    }
 
-    // EMA (conditional)
-    if (loadEMA) {
-        parsePromises.push(
-            parseCSV('./output/expma.txt?' + Math.random(), (data) => {
-                data.forEach(row => {
-                    if (row.length < 2) return;
-                    const [timestamp, value] = row;
-                    if (typeof timestamp === 'number' && value !== undefined) {
-                        timestampsEMA.push(timestamp);
-                        valuesEMA.push(value);
-                    }
-                });
-            })
-        );
+    // ---------------------------
+    //  Zoomable sources: the series API (dist/series_server.py) or, with
+    //  &pyramid=1, the static tiles written by dist/compute_pyramid.py.
+    //  Both send at most a few points per pixel and are asked again on zoom.
+    // ---------------------------
+    const pyramidMode = (getQueryParam('pyramid') === '1');
+    const SERIES_API = '/api/series';
+    // { start, end, loadRange(from, to) -> Promise({ name: { timestamps, values } }) }
+    let zoomSource = null;
+    // Series refetched on zoom: chart trace name -> series name
+    const zoomTraces = {
+        'Asset Price': 'asset',
+        'Portfolio Value': portfolioColumn,
+        'Untouched Portfolio': 'untouched_portfolio',
+        'EMA': 'expma'
+    };
+
+    function zoomMaxPoints() {
+        // About two points per horizontal pixel
+        return 2 * (document.getElementById('chart').clientWidth || 1000);
     }
 
-    // EMA MICRO (conditional)
-    if (loadEMAMicro) {
-        parsePromises.push(
-            parseCSV('./output/expma_micro.txt?' + Math.random(), (data) => {
-                data.forEach(row => {
-                    if (row.length < 2) return;
-                    const [timestamp, value] = row;
-                    if (typeof timestamp === 'number' && value !== undefined) {
-                        timestampsEMAMicro.push(timestamp);
-                        valuesEMAMicro.push(value);
+    function pyramidSource() {
+        return loadPyramidManifest(outputURL('pyramid/manifest.json')).then(manifest => ({
+            start: manifest.start,
+            end: manifest.end,
+            loadRange: (from, to) => loadPyramidRange(manifest, from, to, zoomMaxPoints())
+                .then(({ series }) => series)
+        }));
+    }
+
+    function seriesApiSource() {
+        return fetch(SERIES_API)
+            .then(response => {
+                if (!response.ok) throw new Error(`series API: HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(meta => {
+                const names = Object.values(zoomTraces).filter(name => meta.series.includes(name));
+                return {
+                    start: meta.start,
+                    end: meta.end,
+                    loadRange: (from, to) => {
+                        const query = `series=${names.join(',')}&from=${Math.floor(from)}&to=${Math.ceil(to)}`
+                            + `&points=${zoomMaxPoints()}`;
+                        return fetch(`${SERIES_API}?${query}`)
+                            .then(response => {
+                                if (!response.ok) throw new Error(`series API: HTTP ${response.status}`);
+                                return response.json();
+                            })
+                            .then(answer => {
+                                // null marks timestamps a series has no point for
+                                const series = {};
+                                names.forEach(name => {
+                                    const timestamps = [];
+                                    const values = [];
+                                    answer.series[name].forEach((value, i) => {
+                                        if (value === null) return;
+                                        timestamps.push(answer.time[i]);
+                                        values.push(value);
+                                    });
+                                    series[name] = { timestamps, values };
+                                });
+                                return series;
+                            });
                     }
-                });
+                };
+            });
+    }
+
+    function loadZoomable(sourcePromise) {
+        return sourcePromise
+            .then(source => {
+                zoomSource = source;
+                return source.loadRange(source.start, source.end);
             })
-        );
+            .then(series => {
+                function fill(name, timestamps, values) {
+                    if (!series[name]) return;
+                    timestamps.push(...series[name].timestamps);
+                    values.push(...series[name].values);
+                }
+                fill(portfolioColumn, timestampsPortfolio, valuesPortfolio);
+                fill('untouched_portfolio', timestampsUntouchedPortfolio, valuesUntouchedPortfolio);
+                if (loadEMA) fill('expma', timestampsEMA, valuesEMA);
+                if (loadAsset) fill('asset', timestampsAsset, valuesAsset);
+            })
+            .then(() => loadCSVTrades());
     }
 
-    // SLOPES (conditional)
-    if (slopeDisplayInterval > 0) {
-        parsePromises.push(
-            parseCSV('./output/ema_slopes.txt?' + Math.random(), (data) => {
-                data.forEach(row => {
-                    if (row.length < 2) return;
-                    const [timestamp, slopeValue] = row;
-                    if (typeof timestamp === 'number' && slopeValue !== undefined) {
-                        timestampsSlopes.push(timestamp);
-                        slopes.push(slopeValue);
-                    }
+    // Plotly reports ranges as local 'YYYY-MM-DD HH:MM:SS' strings
+    function rangeToSeconds(value) {
+        return new Date(String(value).replace(' ', 'T')).getTime() / 1000;
+    }
+
+    let zoomRequest = 0;
+    function onZoomRelayout(event) {
+        let from, to;
+        if (event['xaxis.autorange']) {
+            from = zoomSource.start;
+            to = zoomSource.end;
+        } else if (event['xaxis.range[0]'] !== undefined) {
+            from = rangeToSeconds(event['xaxis.range[0]']);
+            to = rangeToSeconds(event['xaxis.range[1]']);
+        } else if (event['xaxis.range']) {
+            from = rangeToSeconds(event['xaxis.range'][0]);
+            to = rangeToSeconds(event['xaxis.range'][1]);
+        } else {
+            return;  // y-only zoom, legend clicks...
+        }
+
+        const request = ++zoomRequest;
+        zoomSource.loadRange(from, to)
+            .then(series => {
+                if (request !== zoomRequest) return;  // superseded by a newer zoom
+                const chart = document.getElementById('chart');
+                const xs = [], ys = [], indices = [];
+                chart.data.forEach((trace, index) => {
+                    const data = series[zoomTraces[trace.name]];
+                    if (!data) return;
+                    xs.push(data.timestamps.map(ts => new Date(ts * 1000)));
+                    ys.push(data.values);
+                    indices.push(index);
                 });
+                if (indices.length > 0) {
+                    Plotly.restyle(chart, { x: xs, y: ys }, indices);
+                }
             })
-        );
+            .catch(err => console.error('Error loading the zoomed range:', err));
+    }
+
+    // ---------------------------
+    //  CSV files (fallback)
+    // ---------------------------
+    function loadCSVTrades() {
+        return parseCSV(outputURL('trades.txt'), (data) => {
+            data.forEach(row => {
+                if (row.length < 3) return;
+                const [timestamp, action, reason] = row;
+                if (typeof timestamp === 'number' && action && reason) {
+                    rawTrades.push({ timestamp, action, reason });
+                }
+            });
+        });
     }
 
-    // ASSET (conditional)
-    if (loadAsset) {
+    function loadCSVFiles() {
+        // Parse each file concurrently
+        const parsePromises = [];
+
+        // TRADES
+        parsePromises.push(loadCSVTrades());
+
+        // PORTFOLIO (use portfolioFile determined above)
         parsePromises.push(
-            parseCSV('./output/asset.txt?' + Math.random(), (data) => {
+            parseCSV(outputURL(portfolioFile), (data) => {
                 data.forEach(row => {
                     if (row.length < 2) return;
                     const [timestamp, value] = row;
                     if (typeof timestamp === 'number' && value !== undefined) {
-                        timestampsAsset.push(timestamp);
-                        valuesAsset.push(value);
+                        timestampsPortfolio.push(timestamp);
+                        valuesPortfolio.push(value);
                     }
                 });
             })
         );
-    }
 
-    // MARGIN (conditional)
-    if (showMargin) {
+        // UNTOUCHED PORTFOLIO
         parsePromises.push(
-            parseCSV('./output/margin.txt?' + Math.random(), (data) => {
+            parseCSV(outputURL('untouched_portfolio.txt'), (data) => {
                 data.forEach(row => {
                     if (row.length < 2) return;
                     const [timestamp, value] = row;
                     if (typeof timestamp === 'number' && value !== undefined) {
-                        timestampsMargin.push(timestamp);
-                        valuesMargin.push(value);
+                        timestampsUntouchedPortfolio.push(timestamp);
+                        valuesUntouchedPortfolio.push(value);
                     }
                 });
             })
         );
+
+        // EMA (conditional)
+        if (loadEMA) {
+            parsePromises.push(
+                parseCSV(outputURL('expma.txt'), (data) => {
+                    data.forEach(row => {
+                        if (row.length < 2) return;
+                        const [timestamp, value] = row;
+                        if (typeof timestamp === 'number' && value !== undefined) {
+                            timestampsEMA.push(timestamp);
+                            valuesEMA.push(value);
+                        }
+                    });
+                })
+            );
+        }
+
+        // EMA MICRO (conditional)
+        if (loadEMAMicro) {
+            parsePromises.push(
+                parseCSV(outputURL('expma_micro.txt'), (data) => {
+                    data.forEach(row => {
+                        if (row.length < 2) return;
+                        const [timestamp, value] = row;
+                        if (typeof timestamp === 'number' && value !== undefined) {
+                            timestampsEMAMicro.push(timestamp);
+                            valuesEMAMicro.push(value);
+                        }
+                    });
+                })
+            );
+        }
+
+        // SLOPES (conditional)
+        if (slopeDisplayInterval > 0) {
+            parsePromises.push(
+                parseCSV(outputURL('ema_slopes.txt'), (data) => {
+                    data.forEach(row => {
+                        if (row.length < 2) return;
+                        const [timestamp, slopeValue] = row;
+                        if (typeof timestamp === 'number' && slopeValue !== undefined) {
+                            timestampsSlopes.push(timestamp);
+                            slopes.push(slopeValue);
+                        }
+                    });
+                })
+            );
+        }
+
+        // ASSET (conditional)
+        if (loadAsset) {
+            parsePromises.push(
+                parseCSV(outputURL('asset.txt'), (data) => {
+                    data.forEach(row => {
+                        if (row.length < 2) return;
+                        const [timestamp, value] = row;
+                        if (typeof timestamp === 'number' && value !== undefined) {
+                            timestampsAsset.push(timestamp);
+                            valuesAsset.push(value);
+                        }
+                    });
+                })
+            );
+        }
+
+        // MARGIN (conditional)
+        if (showMargin) {
+            parsePromises.push(
+                parseCSV(outputURL('margin.txt'), (data) => {
+                    data.forEach(row => {
+                        if (row.length < 2) return;
+                        const [timestamp, value] = row;
+                        if (typeof timestamp === 'number' && value !== undefined) {
+                            timestampsMargin.push(timestamp);
+                            valuesMargin.push(value);
+                        }
+                    });
+                })
+            );
+        }
+
+        return Promise.all(parsePromises);
     }
 
     // ---------------------------
-    //  Fetch all files concurrently
+    //  Load from the series API (or the pyramid), else the bundle, else all CSV files concurrently
     // ---------------------------
-    Promise.all(parsePromises)
+    const loadSeries = loadZoomable(pyramidMode ? pyramidSource() : seriesApiSource())
+        .catch(err => {
+            console.warn('Zoomable source unavailable, loading the bundle:', err);
+            zoomSource = null;
+            resetSeries();
+            return loadBundle();
+        });
+
+    loadSeries
+        .catch(err => {
+            resetSeries();
+            console.warn('Series bundle unavailable, loading CSV files:', err);
+            return loadCSVFiles();
+        })
         .then(() => {
             applyThresholdChecks();
             matchTradesToPortfolio();
@@ -250,6 +496,15 @@ function plotData(logarithmic = false) {
         })
         .catch(err => console.error('Error loading data:', err));
 
+    // Drop what a failed loader may have filled in before the next one runs
+    function resetSeries() {
+        [timestampsAsset, valuesAsset, timestampsPortfolio, valuesPortfolio,
+         timestampsUntouchedPortfolio, valuesUntouchedPortfolio, timestampsEMA, valuesEMA,
+         timestampsEMAMicro, valuesEMAMicro, timestampsSlopes, slopes,
+         timestampsMargin, valuesMargin].forEach(array => { array.length = 0; });
+        rawTrades = [];
+    }
+
     function applyThresholdChecks() {
         thresholds.forEach(threshold => {
             let thresholdTimestamp = null;
@@ -282,10 +537,26 @@ function plotData(logarithmic = false) {
         });
     }
 
+    // First index with timestampsPortfolio[index] >= timestamp (timestamps are sorted)
+    function lowerBound(timestamp) {
+        let lo = 0;
+        let hi = timestampsPortfolio.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >>> 1;
+            if (timestampsPortfolio[mid] < timestamp) lo = mid + 1;
+            else hi = mid;
+        }
+        return lo;
+    }
+
     function matchTradesToPortfolio() {
         rawTrades.forEach(trade => {
             const { timestamp, action, reason } = trade;
-            const idx = timestampsPortfolio.indexOf(timestamp);
+            let idx = lowerBound(timestamp);
+            if (idx >= timestampsPortfolio.length || timestampsPortfolio[idx] !== timestamp) {
+                // Decimated series only have bucket starts: use the bucket holding the trade
+                idx = (zoomSource && idx > 0) ? idx - 1 : -1;
+            }
             if (idx !== -1) {
                 const value = valuesPortfolio[idx];
                 if (action === 'buy') {
@@ -475,7 +746,63 @@ function plotData(logarithmic = false) {
             plotGlPixelRatio: 5
         };
 
-        Plotly.newPlot('chart', traces, layout, config);
+        Plotly.newPlot('chart', traces, layout, config).then(chart => {
+            if (zoomSource) {
+                chart.on('plotly_relayout', onZoomRelayout);
+            }
+            followLiveUpdates(chart);
+        });
+    }
+
+    // ---------------------------
+    //  Live candles, equity and signals from the push hub (exchange/push_hub.py)
+    // ---------------------------
+    function followLiveUpdates(chart) {
+        const source = new EventSource('/api/events?channels=kline,equity,signal');
+        let lastPortfolio = null;
+
+        function traceIndex(name) {
+            return chart.data.findIndex(trace => trace.name === name);
+        }
+
+        function extend(name, ts, value) {
+            const index = traceIndex(name);
+            if (index === -1) return;
+            const x = chart.data[index].x;
+            // Replays after a reconnect may repeat the last point
+            if (x.length > 0 && new Date(x[x.length - 1]).getTime() >= ts * 1000) return;
+            Plotly.extendTraces(chart, { x: [[new Date(ts * 1000)]], y: [[value]] }, [index]);
+        }
+
+        source.addEventListener('kline', event => {
+            const kline = JSON.parse(event.data);
+            if (kline.x) extend('Asset Price', kline.t, kline.c);
+        });
+
+        source.addEventListener('equity', event => {
+            const update = JSON.parse(event.data);
+            if (update.portfolio !== undefined && bnbParam !== '1') {
+                lastPortfolio = update.portfolio;
+                extend('Portfolio Value', update.t, update.portfolio);
+            }
+            if (update.equity) {
+                titleContents = `PRODUCTION - ${trimmedPairName} -- Equity. $${update.equity}`;
+                document.title = `${trimmedPairName} -- $${update.equity}`;
+                Plotly.relayout(chart, { title: titleContents });
+            }
+        });
+
+        source.addEventListener('signal', event => {
+            const signal = JSON.parse(event.data);
+            if (lastPortfolio === null) return;
+            extend(signal.action === 'buy' ? 'Buy Trades' : 'Sell Trades', signal.t, lastPortfolio);
+        });
+
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                console.warn('Push hub unavailable, the chart updates on reload only');
+            }
+        };
     }
 }
 
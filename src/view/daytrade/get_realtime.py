@@ -1,7 +1,12 @@
 import asyncio
-import websockets
 import json
-import time
+import sys
+from pathlib import Path
+
+import websockets
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "python"))
+from exchange.push_hub import push
 
 # Binance WebSocket URL for the 'suiusdc' pair
 BINANCE_WS_URL = "wss://stream.binance.com:9443/ws/suiusdc@trade"
@@ -9,37 +14,44 @@ BINANCE_WS_URL = "wss://stream.binance.com:9443/ws/suiusdc@trade"
 # File where the timestamp and value will be written
 OUTPUT_FILE = "realtime.txt"
 
-# Function to write the timestamp and value to the file
-def write_to_file(timestamp, value):
-    with open(OUTPUT_FILE, "a") as file:
-        file.write(f"{timestamp}: {value}\n")
+# Flush the file at most this often; every trade is pushed right away
+FLUSH_INTERVAL = 1.0
+
 
 # Function to handle the WebSocket connection and listen for updates
-async def listen_binance():
+async def listen_binance(file):
     async with websockets.connect(BINANCE_WS_URL) as ws:
-        while True:
-            # Receive the message from the WebSocket
-            message = await ws.recv()
+        loop = asyncio.get_running_loop()
+        flushed_at = loop.time()
+        async for message in ws:
             data = json.loads(message)
 
-            # Extract the trade price from the message
-            price = data['p']  # 'p' is the price of the trade
+            # Trade time (ms) and price of every trade, none are skipped
+            timestamp = data['T'] / 1000
+            price = float(data['p'])
 
-            # Get the current timestamp in Unix format
-            timestamp = int(time.time())  # Unix timestamp in seconds
+            # Straight to the open dashboards
+            push("trade", {"t": timestamp, "p": price})
 
-            # Write the timestamp and price to the file
-            write_to_file(timestamp, price)
+            # The file is kept open, rows are buffered and flushed once a second
+            file.write(f"{timestamp:.3f},{price}\n")
+            if loop.time() - flushed_at >= FLUSH_INTERVAL:
+                file.flush()
+                flushed_at = loop.time()
+                print(f"Timestamp: {timestamp:.3f}, Price: {price}")
 
-            # Print progress in the terminal
-            print(f"Timestamp: {timestamp}, Price: {price}")
 
-            # Wait for 1 second before querying again
+# Main function to start the WebSocket listener, reconnecting when it drops
+async def main():
+    with open(OUTPUT_FILE, "a") as file:
+        while True:
+            try:
+                await listen_binance(file)
+            except (websockets.ConnectionClosed, OSError) as e:
+                print(f"WebSocket closed ({e}), reconnecting")
+            file.flush()
             await asyncio.sleep(1)
 
-# Main function to start the WebSocket listener
-async def main():
-    await listen_binance()
 
 # Run the main function using asyncio
 if __name__ == "__main__":
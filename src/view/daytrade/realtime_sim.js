@@ -14,7 +14,7 @@ function plotData() {
             lines.forEach(line => {
                 const row = line.split(',');
                 if (row.length < 2) return;
-                const timestamp = parseInt(row[0].trim(), 10);
+                const timestamp = parseFloat(row[0].trim());  // seconds, ms precision
                 const value = parseFloat(row[1].trim());
                 if (!isNaN(timestamp) && !isNaN(value)) {
                     timestampsRealtime.push(timestamp);
@@ -69,7 +69,41 @@ function plotData() {
             plotGlPixelRatio: 5  // try 2 or 3 depending on your performance needs
         };
 
-        Plotly.newPlot('chart', traces, layout, config);
+        Plotly.newPlot('chart', traces, layout, config).then(followTrades);
+    }
+
+    // ---------------------------
+    //  Live trades from the push hub (exchange/push_hub.py), no polling
+    // ---------------------------
+    const MAX_LIVE_POINTS = 20000;  // oldest points scroll out of the chart
+
+    function followTrades() {
+        const source = new EventSource('/api/events?channels=trade');
+        let pendingX = [];
+        let pendingY = [];
+
+        source.addEventListener('trade', event => {
+            const trade = JSON.parse(event.data);
+            pendingX.push(new Date(trade.t * 1000));
+            pendingY.push(trade.p);
+        });
+
+        // Trades can arrive faster than the screen refreshes: draw them once per frame
+        function draw() {
+            if (pendingX.length > 0) {
+                Plotly.extendTraces('chart', { x: [pendingX], y: [pendingY] }, [0], MAX_LIVE_POINTS);
+                pendingX = [];
+                pendingY = [];
+            }
+            requestAnimationFrame(draw);
+        }
+        requestAnimationFrame(draw);
+
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                console.warn('Push hub unavailable, showing realtime.txt only');
+            }
+        };
     }
 }
 
@@ -0,0 +1,96 @@
+// Zoom pyramid reader for the tiles written by dist/compute_pyramid.py
+//
+// pyramid/manifest.json lists the levels (finest first) and their tiles.
+// A tile L<level>/<id>.bin holds int32 seconds since the tile start, then per
+// series one float32 column (level 0) or a min and a max column (envelopes).
+
+const PYRAMID_DIR = './output/pyramid/';
+
+// Parsed tiles by level/id/crc, a rewritten tile has a new crc
+const pyramidTileCache = new Map();
+
+function loadPyramidManifest(url) {
+    return fetch(url)
+        .then(response => {
+            if (!response.ok) throw new Error(`pyramid manifest: HTTP ${response.status}`);
+            return response.json();
+        });
+}
+
+// Finest level that draws [from, to] (unix seconds) in at most maxPoints points
+function pickPyramidLevel(manifest, from, to, maxPoints) {
+    const span = Math.max(to - from, 1);
+    for (const level of manifest.levels) {
+        const perBucket = level.kind === 'envelope' ? 2 : 1;
+        if (span / level.bucket_seconds * perBucket <= maxPoints) {
+            return level;
+        }
+    }
+    return manifest.levels[manifest.levels.length - 1];
+}
+
+function fetchPyramidTile(manifest, level, tileId) {
+    const tile = level.tiles[tileId];
+    const key = `${level.level}/${tileId}/${tile.crc}`;
+    if (pyramidTileCache.has(key)) {
+        return pyramidTileCache.get(key);
+    }
+
+    const columnsPerSeries = level.kind === 'envelope' ? 2 : 1;
+    const promise = fetch(`${PYRAMID_DIR}L${level.level}/${tileId}.bin?v=${tile.crc}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`pyramid tile ${key}: HTTP ${response.status}`);
+            return response.arrayBuffer();
+        })
+        .then(buffer => {
+            const n = tile.points;
+            const columns = [];
+            for (let i = 0; i < manifest.series.length * columnsPerSeries; i++) {
+                columns.push(new Float32Array(buffer, 4 * n * (i + 1), n));
+            }
+            return { start: tile.start, time: new Int32Array(buffer, 0, n), columns };
+        });
+    // A failed tile is fetched again next time
+    promise.catch(() => pyramidTileCache.delete(key));
+    pyramidTileCache.set(key, promise);
+    return promise;
+}
+
+// Returns { level, series: { name: { timestamps, values } } } for the tiles
+// overlapping [from, to]. Envelopes give two points per bucket (min, then max)
+// at the bucket start; NaN (no data) is skipped like in the bundle reader.
+function loadPyramidRange(manifest, from, to, maxPoints) {
+    const level = pickPyramidLevel(manifest, from, to, maxPoints);
+    const tileIds = Object.keys(level.tiles)
+        .filter(id => {
+            const start = level.tiles[id].start;
+            return start <= to && start + level.tile_seconds > from;
+        })
+        .sort((a, b) => level.tiles[a].start - level.tiles[b].start);
+
+    return Promise.all(tileIds.map(id => fetchPyramidTile(manifest, level, id)))
+        .then(tiles => {
+            const envelope = level.kind === 'envelope';
+            const series = {};
+            manifest.series.forEach((name, s) => {
+                const timestamps = [];
+                const values = [];
+                tiles.forEach(tile => {
+                    const lo = envelope ? tile.columns[2 * s] : tile.columns[s];
+                    const hi = envelope ? tile.columns[2 * s + 1] : null;
+                    for (let i = 0; i < tile.time.length; i++) {
+                        const t = tile.start + tile.time[i];
+                        if (Number.isNaN(lo[i])) continue;
+                        timestamps.push(t);
+                        values.push(lo[i]);
+                        if (envelope && hi[i] !== lo[i]) {
+                            timestamps.push(t);
+                            values.push(hi[i]);
+                        }
+                    }
+                });
+                series[name] = { timestamps, values };
+            });
+            return { level, series };
+        });
+}
@@ -35,6 +35,41 @@ cd "src/python/binance/data/"
 ./keep-fetching.py > ../../../start_protocol/keep_fetching.log & disown $!
 cd ../../../../
 
+echo ""
+echo "starting the margin account mirror"
+rm ./src/start_protocol/account_mirror.log
+cd ./src/python
+nohup python3 -m exchange.account_mirror > ../start_protocol/account_mirror.log 2>&1 &
+cd ../../
+
+echo ""
+echo "starting the exchange clock"
+rm ./src/start_protocol/server_clock.log
+cd ./src/python
+nohup python3 -m exchange.server_clock > ../start_protocol/server_clock.log 2>&1 &
+cd ../../
+
+echo ""
+echo "starting the push hub"
+rm ./src/start_protocol/push_hub.log
+cd ./src/python
+nohup python3 -m exchange.push_hub > ../start_protocol/push_hub.log 2>&1 &
+cd ../../
+
+echo ""
+echo "starting the metrics exporter"
+rm ./src/start_protocol/metrics.log
+cd ./src/python
+nohup python3 -m exchange.metrics > ../start_protocol/metrics.log 2>&1 &
+cd ../../
+
+echo ""
+echo "starting the series API"
+rm ./src/start_protocol/series_server.log
+cd ./src/dist
+nohup python3 ./series_server.py > ../start_protocol/series_server.log 2>&1 &
+cd ../../
+
 echo "Waiting for 100 seconds with a progress bar..."
 # Progress bar for 100 seconds
 total=30
@@ -50,6 +85,20 @@ done
 echo ""
 echo ""
 
+echo "starting the trade bar aggregator"
+rm ./src/start_protocol/trade_bars.log
+cd ./src/python
+nohup python3 -m exchange.trade_bars > ../start_protocol/trade_bars.log 2>&1 &
+cd ../../
+
+echo ""
+echo "starting the intrabar stop monitor"
+rm ./src/start_protocol/stop_monitor.log
+cd ./src/python
+nohup python3 -m exchange.stop_monitor > ../start_protocol/stop_monitor.log 2>&1 &
+cd ../../
+
+echo ""
 echo "starting the recompute bucle"
 rm ./src/start_protocol/bucle.log
 cd ./src/dist
@@ -7,6 +7,12 @@ echo ""
 
 pkill -f "python3 ./bucle.py"
 pkill -f "python3 ./keep-fetching.py"
+pkill -f "exchange.account_mirror"
+pkill -f "exchange.server_clock"
+pkill -f "python3 ./series_server.py"
+pkill -f "exchange.push_hub"
+pkill -f "exchange.trade_bars"
+pkill -f "exchange.stop_monitor"
 
 python3 /home/g1pablo_escaida1/CRYPTO-Trader/src/python/binance/private/sell20_beta2.py
 